@@ -6,6 +6,7 @@ the Flask application instance.
 """
 import os
 import logging
+import click
 from flask import Flask, jsonify
 from flask_cors import CORS
 from pymongo import MongoClient
@@ -55,6 +56,7 @@ def configure_app(app, test_config=None):
         MONGO_URI=os.getenv('MONGO_URI', 'mongodb://localhost:27017/bizfindr'),
         API_BASE_URL=os.getenv('API_BASE_URL', 'https://data.ct.gov/resource/n7gp-d28j.json'),
         API_KEY=os.getenv('API_KEY'),
+        ADMIN_API_KEY=os.getenv('ADMIN_API_KEY'),
         DEBUG=os.getenv('FLASK_DEBUG', 'false').lower() == 'true',
         TESTING=test_config is not None
     )
@@ -81,7 +83,20 @@ def initialize_extensions(app):
     # Initialize MongoDB client
     app.mongo = MongoClient(app.config['MONGO_URI'])
     app.db = app.mongo[app.config.get('MONGO_DB_NAME', 'bizfindr')]
-    
+
+    # Initialize the Redis cache, shared with the admin API and query profiling
+    from .core.cache import init_cache
+    init_cache(app)
+
+    # Rate limits and API key quotas; installed before other request hooks
+    # so limits apply before any of them can answer a request
+    from .core.rate_limiting import init_rate_limiting
+    init_rate_limiting(app)
+
+    # Conditional requests (ETag/Last-Modified, 304s and Cache-Control)
+    from .middleware.conditional import setup_conditional_requests
+    setup_conditional_requests(app)
+
     # Configure logging
     if not app.debug and not app.testing:
         configure_logging(app)
@@ -170,6 +185,101 @@ def register_commands(app):
         else:
             print('Failed to initialize database.')
     
+    @app.cli.command('export-registrations')
+    @click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']),
+                  default='ndjson', help='Export format.')
+    @click.option('--output', '-o', type=click.Path(dir_okay=False),
+                  help='File to write (default: standard output).')
+    @click.option('--resume', is_flag=True,
+                  help='Append to --output after its last complete row.')
+    @click.option('--cursor', help='Cursor token to resume after.')
+    @click.option('--q', help='Full-text search query.')
+    @click.option('--business-type', help='Filter by business type.')
+    @click.option('--status', help='Filter by status.')
+    @click.option('--date-from', help='Filter by start date (YYYY-MM-DD).')
+    @click.option('--date-to', help='Filter by end date (YYYY-MM-DD).')
+    @click.option('--name', help='Filter by business name prefix (case-sensitive).')
+    def export_registrations_command(fmt, output, resume, cursor, **filters):
+        """Stream registrations to a file as NDJSON or CSV."""
+        from .core.errors.handlers import ValidationError
+        from .services.export_service import export_registrations, prepare_resume
+        
+        if resume:
+            if not output:
+                raise click.UsageError('--resume requires --output')
+            if os.path.exists(output):
+                cursor = prepare_resume(output, fmt)
+        appending = resume and os.path.exists(output) and os.path.getsize(output) > 0
+        
+        try:
+            chunks = export_registrations(
+                fmt, cursor=cursor, header=not appending, **filters
+            )
+        except ValidationError as e:
+            raise click.UsageError(
+                '; '.join(f'{name}: {error}' for name, error in e.errors.items())
+            )
+        if not output:
+            for chunk in chunks:
+                click.echo(chunk, nl=False)
+            return
+        
+        with open(output, 'a' if appending else 'w', encoding='utf-8', newline='') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        click.echo(f'Exported registrations to {output}.', err=True)
+    
+    @app.cli.command('advise-indexes')
+    @click.option('--days', type=int, default=7,
+                  help='Days of recorded query shapes to use.')
+    @click.option('--min-count', type=int, default=10,
+                  help='Ignore shapes seen fewer times.')
+    @click.option('--create', is_flag=True, help='Create the suggested indexes.')
+    def advise_indexes_command(days, min_count, create):
+        """Suggest registration indexes from the query shapes seen in traffic."""
+        from .core.index_advisor import advise, create_suggested_indexes
+        from .core.query_profiler import get_query_shape_stats
+        
+        stats = get_query_shape_stats(days)
+        if stats is None:
+            raise click.ClickException(
+                'Query shape statistics are unavailable; is Redis running?'
+            )
+        if not stats:
+            click.echo('No query shapes recorded yet; '
+                       'enable QUERY_PROFILING and let traffic run.')
+            return
+        
+        report = advise(app.db.registrations, stats, min_count=min_count)
+        
+        def format_keys(keys):
+            return ', '.join(f'{field} {direction}' for field, direction in keys)
+        
+        def format_usage(entry):
+            return f"{entry['count']} queries, {entry['total_ms']:.0f} ms"
+        
+        if report['suggested']:
+            click.echo('Suggested indexes:')
+        else:
+            click.echo('Every analysed query shape is served by an index.')
+        for entry in report['suggested']:
+            click.echo(f"  [{format_keys(entry['keys'])}]  {format_usage(entry)}")
+        for entry in report['served']:
+            click.echo(f"Served by {entry['name']}: {format_usage(entry)}")
+        if report['skipped']:
+            click.echo(f"Skipped {len(report['skipped'])} shapes with no indexable "
+                       f"fields (such as text searches).")
+        if report['unused'] is None:
+            click.echo('Index usage ($indexStats) is unavailable.')
+        for entry in report['unused'] or []:
+            click.echo(f"Unused since {entry['since']}: "
+                       f"{entry['name']} [{format_keys(entry['key'])}]")
+        
+        if create and report['suggested']:
+            registrations = app.db.registrations
+            for name in create_suggested_indexes(registrations, report['suggested']):
+                click.echo(f'Created index {name}.')
+    
     @app.cli.command('fetch-data')
     def fetch_data_command():
         """Fetch data from the CT.gov API."""
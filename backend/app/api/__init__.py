@@ -3,11 +3,35 @@ API Blueprint for BizFindr application.
 
 This module defines the main API blueprint and registers all API routes.
 """
-from flask import Blueprint, current_app, request, jsonify
+from flask import (
+    Blueprint, Response, current_app, request, jsonify, stream_with_context
+)
 from flask_restx import Api, Resource, fields, reqparse
 from functools import wraps
 import logging
 
+from pymongo.errors import ExecutionTimeout
+
+from app.api.serializers import json_response, serialize
+from app.core.config import settings
+from app.core.errors.handlers import ValidationError
+from app.core.counts import AUTO, COUNT_MODES
+from app.core.indexes import DEFAULT_SORT, SORT_OPTIONS
+from app.core.pagination import InvalidCursor
+from app.services.export_service import (
+    CONTENT_TYPES,
+    EXPORT_FORMATS,
+    NDJSON,
+    export_registrations,
+)
+from app.services.registration_service import (
+    get_latest_registration_date,
+    get_registration,
+    get_registrations,
+    list_registrations,
+    search_registrations,
+)
+
 # Create API Blueprint
 bp = Blueprint('api', __name__)
 
@@ -25,6 +49,10 @@ api = Api(
 # Namespace for all API routes
 ns = api.namespace('v1', description='API version 1')
 
+# Admin namespace (cache statistics and maintenance)
+from app.api.admin import ns as admin_ns  # noqa: E402
+api.add_namespace(admin_ns)
+
 # Health check endpoint
 @ns.route('/health')
 class HealthCheck(Resource):
@@ -43,8 +71,18 @@ class HealthCheck(Resource):
 pagination_model = api.model('Pagination', {
     'page': fields.Integer(description='Current page number'),
     'per_page': fields.Integer(description='Number of items per page'),
-    'total_pages': fields.Integer(description='Total number of pages'),
-    'total_items': fields.Integer(description='Total number of items')
+    'total_pages': fields.Integer(
+        description='Total number of pages; null when not counted'),
+    'total_items': fields.Integer(
+        description='Total number of items; null when not counted'),
+    'count_strategy': fields.String(
+        description='How total_items was counted: '
+                    'estimated, cached, exact or has_more'),
+    'has_more': fields.Boolean(description='Whether there is a next page'),
+    'next_cursor': fields.String(
+        description='Cursor for the next page, if there is one'),
+    'prev_cursor': fields.String(
+        description='Cursor for the previous page, if there is one')
 })
 
 registration_model = api.model('Registration', {
@@ -64,10 +102,33 @@ registration_model = api.model('Registration', {
     'updated_at': fields.DateTime(description='When the record was last updated')
 })
 
+registration_list_model = api.model('RegistrationList', {
+    'data': fields.List(fields.Nested(registration_model)),
+    'pagination': fields.Nested(pagination_model)
+})
+
+search_results_model = api.model('SearchResults', {
+    'data': fields.List(fields.Nested(registration_model)),
+    'meta': fields.Raw(description='Search metadata')
+})
+
+batch_request_model = api.model('RegistrationBatchRequest', {
+    'ids': fields.List(fields.String, required=True,
+                       description='Registration IDs to look up')
+})
+
 # Request parsers
 pagination_parser = reqparse.RequestParser()
 pagination_parser.add_argument('page', type=int, default=1, help='Page number')
 pagination_parser.add_argument('per_page', type=int, default=20, help='Items per page')
+pagination_parser.add_argument('cursor', type=str,
+                               help='Cursor from a previous page; use instead of page '
+                                    'for deep pages')
+pagination_parser.add_argument('count', type=str, choices=COUNT_MODES, default=AUTO,
+                               help='auto to include totals, has_more to skip counting')
+pagination_parser.add_argument('fields', type=str,
+                               help='Comma-separated fields to return, e.g. '
+                                    'registration_id,business_name,address.city')
 
 search_parser = pagination_parser.copy()
 search_parser.add_argument('q', type=str, help='Search query')
@@ -75,9 +136,26 @@ search_parser.add_argument('business_type', type=str, help='Filter by business t
 search_parser.add_argument('status', type=str, help='Filter by status')
 search_parser.add_argument('date_from', type=str, help='Filter by start date (YYYY-MM-DD)')
 search_parser.add_argument('date_to', type=str, help='Filter by end date (YYYY-MM-DD)')
-search_parser.add_argument('sort', type=str, default='date_registration', help='Field to sort by')
+search_parser.add_argument('name', type=str,
+                           help='Filter by business name prefix (case-sensitive)')
+search_parser.add_argument('sort', type=str, choices=tuple(SORT_OPTIONS),
+                           default=DEFAULT_SORT, help='Field to sort by')
 search_parser.add_argument('order', type=str, choices=('asc', 'desc'), default='desc', help='Sort order')
 
+export_parser = reqparse.RequestParser()
+export_parser.add_argument('format', type=str, choices=EXPORT_FORMATS, default=NDJSON,
+                           help='Export format')
+export_parser.add_argument('cursor', type=str,
+                           help='Cursor to resume an interrupted export')
+export_parser.add_argument('q', type=str, help='Search query')
+export_parser.add_argument('business_type', type=str, help='Filter by business type')
+export_parser.add_argument('status', type=str, help='Filter by status')
+export_parser.add_argument('date_from', type=str,
+                           help='Filter by start date (YYYY-MM-DD)')
+export_parser.add_argument('date_to', type=str, help='Filter by end date (YYYY-MM-DD)')
+export_parser.add_argument('name', type=str,
+                           help='Filter by business name prefix (case-sensitive)')
+
 def api_key_required(f):
     """Decorator to require API key authentication."""
     @wraps(f)
@@ -88,14 +166,64 @@ def api_key_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def parse_fields(value):
+    """Validate a ``fields`` parameter against the registration model.
+    
+    Args:
+        value (str): Comma-separated field names; nested fields use dots
+            (``address.city``)
+        
+    Returns:
+        list: Sorted field paths, or None to return every field
+        
+    Raises:
+        ValueError: If a field is not part of the registration model
+    """
+    if not value:
+        return None
+    
+    allowed = set()
+    for name, field in registration_model.items():
+        allowed.add(name)
+        if isinstance(field, fields.Nested):
+            allowed.update(f'{name}.{sub}' for sub in field.nested)
+    
+    requested = {path.strip() for path in value.split(',') if path.strip()}
+    unknown = sorted(requested - allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # A parent field already includes its subfields
+    return sorted(
+        path for path in requested
+        if not any(path.startswith(f'{other}.') for other in requested)
+    ) or None
+
+def fields_mask(paths):
+    """Build a marshalling mask that keeps the selected fields of ``data``.
+    
+    Args:
+        paths (list): Field paths from :func:`parse_fields`, or None
+        
+    Returns:
+        str: A Flask-RESTX mask, or None to marshal every field
+    """
+    if not paths:
+        return None
+    selected = {}
+    for path in paths:
+        name, _, sub = path.partition('.')
+        selected.setdefault(name, [])
+        if sub:
+            selected[name].append(sub)
+    inner = ','.join(f"{name}{{{','.join(subs)}}}" if subs else name
+                     for name, subs in selected.items())
+    return f'data{{{inner}}},*'
+
 @ns.route('/registrations')
 class RegistrationList(Resource):
     @ns.doc('list_registrations')
     @ns.expect(pagination_parser)
-    @ns.marshal_with(api.model('RegistrationList', {
-        'data': fields.List(fields.Nested(registration_model)),
-        'pagination': fields.Nested(pagination_model)
-    }))
+    @ns.response(200, 'Success', registration_list_model)
     @api_key_required
     def get(self):
         """List all business registrations with pagination."""
@@ -104,30 +232,36 @@ class RegistrationList(Resource):
         per_page = args['per_page']
         
         try:
-            # Calculate skip value for pagination
-            skip = (page - 1) * per_page
-            
-            # Get total count of registrations
-            total = current_app.db.registrations.count_documents({})
-            total_pages = (total + per_page - 1) // per_page
-            
-            # Get paginated registrations
-            registrations = list(current_app.db.registrations
-                              .find({}, {'_id': 0})
-                              .sort('date_registration', -1)
-                              .skip(skip)
-                              .limit(per_page))
+            selected = parse_fields(args['fields'])
+        except ValueError as e:
+            api.abort(400, str(e))
+        
+        try:
+            # Get paginated registrations and the total count
+            result = list_registrations(page=page, per_page=per_page,
+                                        cursor=args['cursor'], count=args['count'],
+                                        fields=selected)
+            total = result['total']
+            total_pages = None if total is None else (total + per_page - 1) // per_page
             
-            return {
-                'data': registrations,
+            return json_response(serialize({
+                'data': result['data'],
                 'pagination': {
                     'page': page,
                     'per_page': per_page,
                     'total_pages': total_pages,
-                    'total_items': total
+                    'total_items': total,
+                    'count_strategy': result['count_strategy'],
+                    'has_more': result['has_more'],
+                    'next_cursor': result['next_cursor'],
+                    'prev_cursor': result['prev_cursor']
                 }
-            }
+            }, registration_list_model, mask=fields_mask(selected)))
             
+        except InvalidCursor as e:
+            api.abort(400, str(e))
+        except ExecutionTimeout:
+            api.abort(503, 'The query took too long; try again later')
         except Exception as e:
             current_app.logger.error(f'Error fetching registrations: {str(e)}')
             return {'error': 'internal_error', 'message': 'Failed to fetch registrations'}, 500
@@ -136,72 +270,117 @@ class RegistrationList(Resource):
 class RegistrationSearch(Resource):
     @ns.doc('search_registrations')
     @ns.expect(search_parser)
-    @ns.marshal_with(api.model('SearchResults', {
-        'data': fields.List(fields.Nested(registration_model)),
-        'meta': fields.Raw(description='Search metadata')
-    }))
+    @ns.response(200, 'Success', search_results_model)
     @api_key_required
     def get(self):
         """Search business registrations with filters."""
         args = search_parser.parse_args()
         
         try:
-            # Build query
-            query = {}
-            
-            # Text search
-            if args['q']:
-                query['$text'] = {'$search': args['q']}
-            
-            # Filters
-            if args['business_type']:
-                query['business_type'] = args['business_type']
-            
-            if args['status']:
-                query['status'] = args['status']
-            
-            # Date range filter
-            date_query = {}
-            if args['date_from']:
-                date_query['$gte'] = f"{args['date_from']}T00:00:00"
-            if args['date_to']:
-                date_query['$lte'] = f"{args['date_to']}T23:59:59"
-            if date_query:
-                query['date_registration'] = date_query
-            
-            # Pagination
+            args['fields'] = parse_fields(args['fields'])
+        except ValueError as e:
+            api.abort(400, str(e))
+        
+        try:
             page = args['page']
             per_page = args['per_page']
-            skip = (page - 1) * per_page
-            
-            # Get total count
-            total = current_app.db.registrations.count_documents(query)
-            
-            # Sort
-            sort_order = -1 if args['order'] == 'desc' else 1
-            sort_field = args['sort'] or 'date_registration'
             
-            # Execute query
-            registrations = list(current_app.db.registrations
-                              .find(query, {'_id': 0})
-                              .sort(sort_field, sort_order)
-                              .skip(skip)
-                              .limit(per_page))
+            result = search_registrations(**args)
             
-            return {
-                'data': registrations,
+            return json_response(serialize({
+                'data': result['data'],
                 'meta': {
-                    'total': total,
+                    'total': result['total'],
+                    'count_strategy': result['count_strategy'],
+                    'has_more': result['has_more'],
                     'page': page,
                     'per_page': per_page,
-                    'query': {k: v for k, v in args.items() if v is not None}
+                    'next_cursor': result['next_cursor'],
+                    'prev_cursor': result['prev_cursor'],
+                    'query': {k: v for k, v in args.items()
+                              if v is not None and k not in ('cursor', 'count')}
                 }
-            }
+            }, search_results_model, mask=fields_mask(args['fields'])))
             
+        except InvalidCursor as e:
+            api.abort(400, str(e))
+        except ValidationError as e:
+            api.abort(400, e.message, errors=e.errors)
+        except ExecutionTimeout:
+            api.abort(503, 'The search took too long; narrow the filters')
         except Exception as e:
             current_app.logger.error(f'Error searching registrations: {str(e)}')
             return {'error': 'internal_error', 'message': 'Search failed'}, 500
 
+@ns.route('/registrations/export')
+class RegistrationExport(Resource):
+    @ns.doc('export_registrations')
+    @ns.expect(export_parser)
+    @ns.produces(list(CONTENT_TYPES.values()))
+    @api_key_required
+    def get(self):
+        """Stream all registrations matching the filters as NDJSON or CSV.
+        
+        Rows are ordered by registration ID, so an interrupted export can
+        resume from a cursor for the last ID received (``flask
+        export-registrations --resume`` builds one from a partial file).
+        """
+        args = export_parser.parse_args()
+        fmt = args.pop('format')
+        
+        try:
+            chunks = export_registrations(fmt, **args)
+        except InvalidCursor as e:
+            api.abort(400, str(e))
+        except ValidationError as e:
+            api.abort(400, e.message, errors=e.errors)
+        
+        response = Response(stream_with_context(chunks), mimetype=CONTENT_TYPES[fmt])
+        response.headers['Content-Disposition'] = (
+            f'attachment; filename=registrations.{fmt}'
+        )
+        # Let proxies pass chunks through instead of buffering the export
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
+@ns.route('/registrations/batch')
+class RegistrationBatch(Resource):
+    @ns.doc('get_registrations_batch')
+    @ns.expect(batch_request_model)
+    @ns.response(400, 'Invalid list of IDs')
+    @api_key_required
+    def post(self):
+        """Get several registrations by ID in one request.
+        
+        Results are keyed by registration ID; IDs that do not exist map to
+        null and are also listed under ``missing``.
+        """
+        payload = request.get_json(silent=True) or {}
+        ids = payload.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, str) and i for i in ids):
+            api.abort(400, 'ids must be a list of registration IDs')
+        if len(ids) > settings.BATCH_LOOKUP_MAX_IDS:
+            api.abort(400, f'At most {settings.BATCH_LOOKUP_MAX_IDS} IDs '
+                           'can be requested at once')
+        
+        try:
+            registrations = get_registrations(ids)
+            
+            return {
+                'data': {
+                    registration_id: (api.marshal(registration, registration_model)
+                                      if registration else None)
+                    for registration_id, registration in registrations.items()
+                },
+                'missing': [registration_id
+                            for registration_id, registration in registrations.items()
+                            if registration is None]
+            }
+            
+        except Exception as e:
+            current_app.logger.error(f'Error fetching registration batch: {str(e)}')
+            return {'error': 'internal_error', 'message': 'Failed to fetch registrations'}, 500
+
 @ns.route('/registrations/<string:registration_id>')
 @ns.param('registration_id', 'The registration identifier')
 @ns.response(404, 'Registration not found')
@@ -212,10 +391,7 @@ class Registration(Resource):
     def get(self, registration_id):
         """Get a specific registration by ID."""
         try:
-            registration = current_app.db.registrations.find_one(
-                {'registration_id': registration_id},
-                {'_id': 0}
-            )
+            registration = get_registration(registration_id)
             
             if registration is None:
                 api.abort(404, 'Registration not found')
@@ -236,16 +412,7 @@ class LatestRegistrationDate(Resource):
     def get(self):
         """Get the date of the most recent registration in the database."""
         try:
-            latest = current_app.db.registrations.find_one(
-                {},
-                {'date_registration': 1, '_id': 0},
-                sort=[('date_registration', -1)]
-            )
-            
-            if not latest or 'date_registration' not in latest:
-                return {'latest_date': None}
-                
-            return {'latest_date': latest['date_registration']}
+            return {'latest_date': get_latest_registration_date()}
             
         except Exception as e:
             current_app.logger.error(f'Error fetching latest registration date: {str(e)}')
@@ -0,0 +1,202 @@
+"""
+Admin API for BizFindr.
+
+Operational endpoints for inspecting and managing the cache and for
+reading the slow query log. All routes require the ``X-Admin-Key`` header
+to match the ``ADMIN_API_KEY`` setting and are disabled when it is not
+configured.
+"""
+import hmac
+from functools import wraps
+
+from flask import current_app, request
+from flask_restx import Namespace, Resource, reqparse
+from pymongo.errors import PyMongoError
+
+from app.core.cache import flush_namespace, sample_key_usage
+from app.core.cache_stats import cache_stats
+from app.core.query_profiler import explain_logged_query, worst_query_shapes
+from app.core.rate_limiting import get_quota_usage
+
+ns = Namespace('admin', description='Administrative operations')
+
+key_sample_parser = reqparse.RequestParser()
+key_sample_parser.add_argument(
+    'sample', type=int, default=1000, help='Number of keys to sample'
+)
+key_sample_parser.add_argument(
+    'top', type=int, default=20, help='Number of largest keys to return'
+)
+
+quota_usage_parser = reqparse.RequestParser()
+quota_usage_parser.add_argument(
+    'days', type=int, default=1, help='Number of days to sum, including today'
+)
+quota_usage_parser.add_argument(
+    'top', type=int, default=20, help='Number of keys to return'
+)
+
+slow_query_parser = reqparse.RequestParser()
+slow_query_parser.add_argument(
+    'top', type=int, default=20, help='Number of query shapes to return'
+)
+slow_query_parser.add_argument(
+    'hours', type=int, help='Only include queries from the last N hours'
+)
+
+# Upper bound on sampled keys per request; MEMORY USAGE is one command per key
+MAX_KEY_SAMPLE = 10000
+
+
+def admin_key_required(f):
+    """Decorator to require the admin API key."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        admin_key = current_app.config.get('ADMIN_API_KEY')
+        if not admin_key:
+            return {'error': 'forbidden', 'message': 'Admin API is disabled'}, 403
+        provided = request.headers.get('X-Admin-Key', '')
+        if not hmac.compare_digest(provided.encode('utf-8'), admin_key.encode('utf-8')):
+            return {
+                'error': 'unauthorized',
+                'message': 'Missing or invalid admin key',
+            }, 401
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+@ns.route('/cache/stats')
+class CacheStats(Resource):
+    @ns.doc('cache_stats')
+    @admin_key_required
+    def get(self):
+        """Get hit, miss, error, latency and value size statistics per key prefix.
+
+        Counters cover this worker process since it started.
+        """
+        return {'prefixes': cache_stats.snapshot()}
+
+
+@ns.route('/cache/keys')
+class CacheKeys(Resource):
+    @ns.doc('cache_keys')
+    @ns.expect(key_sample_parser)
+    @admin_key_required
+    def get(self):
+        """Estimate memory use per prefix and list the largest sampled keys."""
+        args = key_sample_parser.parse_args()
+        sample = max(1, min(args['sample'], MAX_KEY_SAMPLE))
+        usage = sample_key_usage(sample_size=sample, top=max(0, args['top']))
+        if usage is None:
+            return {
+                'error': 'service_unavailable',
+                'message': 'Cache is unavailable',
+            }, 503
+        return usage
+
+
+@ns.route('/cache/namespaces/<string:prefix>')
+@ns.param('prefix', 'The cache key prefix to flush')
+class CacheNamespace(Resource):
+    @ns.doc('flush_cache_namespace')
+    @admin_key_required
+    def delete(self, prefix):
+        """Delete every cache entry under a key prefix."""
+        deleted = flush_namespace(prefix)
+        if deleted is None:
+            return {
+                'error': 'service_unavailable',
+                'message': 'Cache is unavailable',
+            }, 503
+        return {'prefix': prefix, 'deleted': deleted}
+
+
+@ns.route('/quotas')
+class QuotaUsageList(Resource):
+    @ns.doc('quota_usage')
+    @ns.expect(quota_usage_parser)
+    @admin_key_required
+    def get(self):
+        """List the API keys that used the most quota units."""
+        args = quota_usage_parser.parse_args()
+        usage = get_quota_usage(days=max(1, args['days']), top=max(0, args['top']))
+        if usage is None:
+            return {
+                'error': 'service_unavailable',
+                'message': 'Cache is unavailable',
+            }, 503
+        return {'keys': usage}
+
+
+@ns.route('/quotas/<string:key_id>')
+@ns.param('key_id', 'The API key identifier, as listed by /admin/quotas')
+class QuotaUsage(Resource):
+    @ns.doc('quota_usage_for_key')
+    @ns.expect(quota_usage_parser)
+    @admin_key_required
+    def get(self, key_id):
+        """Get the quota units used by one API key."""
+        args = quota_usage_parser.parse_args()
+        usage = get_quota_usage(key_id=key_id, days=max(1, args['days']), top=1)
+        if usage is None:
+            return {
+                'error': 'service_unavailable',
+                'message': 'Cache is unavailable',
+            }, 503
+        if not usage:
+            return {'key_id': key_id, 'units': 0, 'by_day': {}}
+        return usage[0]
+
+
+@ns.route('/slow-queries')
+class SlowQueryShapes(Resource):
+    @ns.doc('slow_query_shapes')
+    @ns.expect(slow_query_parser)
+    @admin_key_required
+    def get(self):
+        """List the query shapes that spent the most time in the slow query log.
+
+        Queries are only logged while ``QUERY_PROFILING`` is enabled.
+        """
+        args = slow_query_parser.parse_args()
+        try:
+            shapes = worst_query_shapes(
+                current_app.db, top=max(0, args['top']), hours=args['hours']
+            )
+        except PyMongoError as e:
+            current_app.logger.error(f'Error reading the slow query log: {e}')
+            return {
+                'error': 'service_unavailable',
+                'message': 'Database is unavailable',
+            }, 503
+        return {'shapes': shapes}
+
+
+@ns.route('/slow-queries/<string:entry_id>/explain')
+@ns.param(
+    'entry_id', 'A slow query log entry, e.g. example_id from /admin/slow-queries'
+)
+class SlowQueryExplain(Resource):
+    @ns.doc('explain_slow_query')
+    @admin_key_required
+    def post(self, entry_id):
+        """Re-run a logged query with explain("executionStats").
+
+        Returns the documents and index keys examined and the winning plan.
+        """
+        try:
+            result = explain_logged_query(current_app.db, entry_id)
+        except PyMongoError as e:
+            current_app.logger.error(f'Error explaining slow query {entry_id}: {e}')
+            return {
+                'error': 'service_unavailable',
+                'message': 'Could not explain the query',
+            }, 503
+        if result is None:
+            return {
+                'error': 'not_found',
+                'message': 'No such slow query log entry',
+            }, 404
+        return result
@@ -14,7 +14,6 @@ api_router = APIRouter()
 
 # Business endpoints
 @api_router.get("/businesses/", response_model=List[Business])
-@cached(timeout=300, key_prefix="list_businesses")
 async def list_businesses(
     skip: int = 0,
     limit: int = 100,
@@ -34,7 +33,6 @@ async def list_businesses(
 
 
 @api_router.get("/businesses/{business_id}", response_model=Business)
-@cached(timeout=300, key_prefix="get_business")
 async def get_business(
     business_id: str,
     business_service: BusinessService = Depends(BusinessService)
@@ -133,7 +131,6 @@ async def delete_business(
 
 # Search endpoint
 @api_router.get("/search/", response_model=List[Business])
-@cached(timeout=300, key_prefix="search_businesses")
 async def search_businesses(
     query: str,
     skip: int = 0,
@@ -156,7 +153,9 @@ async def search_businesses(
 
 # Statistics endpoint
 @api_router.get("/statistics/")
-@cached(timeout=3600, key_prefix="get_business_statistics")
+@cached(
+    timeout=3600, key_prefix="get_business_statistics", ignore=("business_service",)
+)
 async def get_business_statistics(
     business_service: BusinessService = Depends(BusinessService)
 ):
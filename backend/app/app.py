@@ -9,9 +9,11 @@ from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
 
 from app.core.cache import init_cache
+from app.core.circuit_breaker import redis_breaker
 from app.core.config import settings
 from app.core.logging import configure_logging
-from app.core.rate_limiting import init_rate_limiting, apply_rate_limits
+from app.core.metrics import init_metrics
+from app.core.rate_limiting import init_rate_limiting
 from app.api.v1.api import api_router as api_v1_router
 from app.middleware import setup_middleware
 
@@ -56,13 +58,15 @@ def create_app(test_config: Optional[Dict[str, Any]] = None) -> Flask:
     # Initialize Redis cache
     init_cache(app)
     
-    # Set up middleware
-    setup_middleware(app)
+    # Expose Prometheus metrics
+    init_metrics(app)
     
-    # Initialize rate limiting
+    # Initialize rate limiting; registered first so limits apply before
+    # any middleware can answer a request (e.g. with a 304)
     init_rate_limiting(app)
-    if not app.config.get('TESTING'):
-        apply_rate_limits(app)
+    
+    # Set up middleware
+    setup_middleware(app)
     
     # Register blueprints
     app.register_blueprint(api_v1_router, url_prefix=f"{settings.API_PREFIX}/v1")
@@ -75,6 +79,7 @@ def create_app(test_config: Optional[Dict[str, Any]] = None) -> Flask:
             "status": "ok",
             "environment": settings.ENVIRONMENT,
             "version": settings.VERSION,
+            "redis": redis_breaker.state,
         })
     
     # Error handlers
@@ -1,15 +1,26 @@
 """
 Redis cache configuration and utilities for BizFindr.
 """
-import json
+import inspect
 import logging
+import sqlite3
+import threading
+import time
 from functools import wraps
-from typing import Any, Callable, Optional, TypeVar, cast
+from typing import Any, Callable, Dict, List, Optional, TypeVar, Union, cast
 
 import redis
-from flask import current_app
+from flask import current_app, has_app_context
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
 
+from app.core.cache_keys import CacheKey, function_key, make_key
+from app.core.cache_stats import HIT, MISS, ERROR, cache_stats, key_prefix
+from app.core.circuit_breaker import allow_redis_request, redis_breaker
+from app.core.codecs import MISSING, CodecError, dumps, loads
 from app.core.config import settings
+from app.core.disk_cache import get_disk_cache
+from app.core.sharding import ShardedRedis
 
 # Type variable for generic function typing
 F = TypeVar('F', bound=Callable[..., Any])
@@ -17,26 +28,66 @@ F = TypeVar('F', bound=Callable[..., Any])
 # Initialize logger
 logger = logging.getLogger(__name__)
 
-# Global Redis connection pool
+# Global Redis connection pool, or sharded client when REDIS_CACHE_NODES is set
 _redis_pool = None
+_sharded_client = None
 
+# Data version counters, bumped by ingestion after each successful write
+DATA_VERSION_KEY = 'data_version:{namespace}'
+# Raises a data version counter to at least ARGV[1] (seeding a missing
+# counter with ARGV[2] when there is no floor) and returns it; never lowers it
+RAISE_VERSION_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]))
+local floor = tonumber(ARGV[1])
+if current == nil then
+    if floor == 0 then floor = tonumber(ARGV[2]) end
+elseif current >= floor then
+    return current
+end
+redis.call('SET', KEYS[1], floor)
+return floor
+"""
+# Mongo copy of the counters, which outlives Redis restarts
+DATA_VERSIONS_COLLECTION = 'data_versions'
+_data_versions: Dict[str, tuple] = {}
+_data_versions_lock = threading.Lock()
+
+# Keys per SCAN call and per UNLINK batch
+SCAN_BATCH_SIZE = 500
+
+
+def _pool_options() -> Dict[str, Any]:
+    return dict(
+        decode_responses=False,
+        max_connections=20,
+        socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        # Failures are handled by the circuit breaker instead of retries
+        retry_on_timeout=False
+    )
 
-def get_redis_connection() -> redis.Redis:
+
+def get_redis_connection() -> Union[redis.Redis, ShardedRedis]:
     """Get a Redis connection from the pool.
     
+    When ``REDIS_CACHE_NODES`` lists several Redis URLs, keys are sharded
+    over them with consistent hashing (see :mod:`app.core.sharding`).
+    
     Returns:
-        redis.Redis: Redis connection instance
+        Union[redis.Redis, ShardedRedis]: Redis connection instance
     """
-    global _redis_pool
+    global _redis_pool, _sharded_client
+    
+    nodes = [url.strip() for url in settings.REDIS_CACHE_NODES.split(',')
+             if url.strip()]
+    if nodes:
+        if _sharded_client is None:
+            _sharded_client = ShardedRedis.from_urls(nodes, **_pool_options())
+        return _sharded_client
     
     if _redis_pool is None:
         _redis_pool = redis.ConnectionPool.from_url(
-            settings.REDIS_URL,
-            decode_responses=True,
-            max_connections=20,
-            socket_connect_timeout=5,
-            socket_timeout=5,
-            retry_on_timeout=True
+            settings.REDIS_URL, **_pool_options()
         )
     
     return redis.Redis(connection_pool=_redis_pool)
@@ -49,86 +100,540 @@ def init_cache(app) -> None:
         app: Flask application instance
     """
     with app.app_context():
+        # Keep the connection even if Redis is down at startup; the circuit
+        # breaker skips it until a probe succeeds.
+        redis_conn = get_redis_connection()
+        app.extensions['redis'] = redis_conn
         try:
             # Test the connection
-            redis_conn = get_redis_connection()
             redis_conn.ping()
-            app.extensions['redis'] = redis_conn
+            redis_breaker.record_success()
             logger.info("Redis cache initialized successfully")
         except redis.RedisError as e:
+            redis_breaker.record_failure()
             logger.error(f"Failed to initialize Redis cache: {e}")
-            app.extensions['redis'] = None
 
 
 def get_cache() -> Optional[redis.Redis]:
     """Get the Redis cache instance from the current app context.
     
+    Callers that get a connection must report the outcome of their call to
+    ``redis_breaker``.
+    
     Returns:
         Optional[redis.Redis]: Redis instance or None if not initialized
+            or the Redis circuit breaker is open (a sharded client is
+            returned while any of its nodes is up)
     """
     if not hasattr(current_app, 'extensions') or 'redis' not in current_app.extensions:
         return None
-    return current_app.extensions['redis']
+    cache = current_app.extensions['redis']
+    if cache is None or not allow_redis_request(cache):
+        return None
+    return cache
 
 
-def cache_key(prefix: str, *args, **kwargs) -> str:
+def cache_key(prefix: str, *args, **kwargs) -> CacheKey:
     """Generate a cache key from the given prefix and arguments.
     
+    Arguments are canonicalized (see :mod:`app.core.cache_keys`) and keys
+    longer than ``CACHE_KEY_MAX_LENGTH`` are hashed.
+    
     Args:
         prefix: Cache key prefix
         *args: Positional arguments to include in the key
         **kwargs: Keyword arguments to include in the key
         
     Returns:
-        str: Generated cache key
+        CacheKey: Generated cache key
+    """
+    return make_key(prefix, *args, **kwargs)
+
+
+def cache_get(key: str, cache: Optional[redis.Redis] = None) -> Any:
+    """Get and decode a value from the cache.
+    
+    Args:
+        key: Cache key
+        cache: Optional Redis connection (default: current app cache)
+        
+    Returns:
+        The cached value, ``MISSING`` for a negative cache entry, or None
+        on a miss or cache error
+    """
+    cache = cache if cache is not None else get_cache()
+    if cache is None:
+        return None
+    
+    prefix = key_prefix(key)
+    started = time.perf_counter()
+    try:
+        cached_value = cache.get(key)
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        cache_stats.record_get(prefix, ERROR)
+        logger.error(f"Cache error for key {key}: {e}")
+        return None
+    elapsed = time.perf_counter() - started
+    
+    if cached_value is None:
+        cache_stats.record_get(prefix, MISS, elapsed)
+        return None
+    try:
+        value = loads(cached_value)
+    except CodecError as e:
+        cache_stats.record_get(prefix, ERROR, elapsed)
+        logger.error(f"Cache error for key {key}: {e}")
+        return None
+    cache_stats.record_get(prefix, HIT, elapsed)
+    logger.debug(f"Cache hit for key: {key}")
+    return value
+
+
+def cache_set(key: str, value: Any, timeout: int,
+              cache: Optional[redis.Redis] = None) -> bool:
+    """Encode and store a value in the cache.
+    
+    Args:
+        key: Cache key
+        value: Value to store
+        timeout: Cache timeout in seconds
+        cache: Optional Redis connection (default: current app cache)
+        
+    Returns:
+        bool: True if the value was stored
+    """
+    cache = cache if cache is not None else get_cache()
+    if cache is None:
+        return False
+    
+    prefix = key_prefix(key)
+    try:
+        data = dumps(value)
+        started = time.perf_counter()
+        cache.setex(key, timeout, data)
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        cache_stats.record_error(prefix)
+        logger.error(f"Cache error for key {key}: {e}")
+        return False
+    except CodecError as e:
+        cache_stats.record_error(prefix)
+        logger.error(f"Cache error for key {key}: {e}")
+        return False
+    cache_stats.record_set(prefix, len(data), time.perf_counter() - started)
+    return True
+
+
+def cache_get_many(keys: List[str], cache: Optional[redis.Redis] = None) -> List[Any]:
+    """Get and decode several values from the cache with a single MGET.
+    
+    Args:
+        keys: Cache keys
+        cache: Optional Redis connection (default: current app cache)
+        
+    Returns:
+        list: One entry per key, as returned by :func:`cache_get`
+    """
+    cache = cache if cache is not None else get_cache()
+    if cache is None or not keys:
+        return [None] * len(keys)
+    
+    started = time.perf_counter()
+    try:
+        raw_values = cache.mget(keys)
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        for key in keys:
+            cache_stats.record_get(key_prefix(key), ERROR)
+        logger.error(f"Cache error for {len(keys)} keys: {e}")
+        return [None] * len(keys)
+    # One round trip for the batch, shared by its keys
+    elapsed = (time.perf_counter() - started) / len(keys)
+    
+    values = []
+    for key, raw in zip(keys, raw_values):
+        prefix = key_prefix(key)
+        if raw is None:
+            cache_stats.record_get(prefix, MISS, elapsed)
+            values.append(None)
+            continue
+        try:
+            values.append(loads(raw))
+            cache_stats.record_get(prefix, HIT, elapsed)
+        except CodecError as e:
+            cache_stats.record_get(prefix, ERROR, elapsed)
+            logger.error(f"Cache error for key {key}: {e}")
+            values.append(None)
+    return values
+
+
+def cache_set_many(mapping: Dict[str, Any], timeout: int,
+                   cache: Optional[redis.Redis] = None) -> bool:
+    """Encode and store several values in one pipelined round trip.
+    
+    Args:
+        mapping: Values to store keyed by cache key
+        timeout: Cache timeout in seconds
+        cache: Optional Redis connection (default: current app cache)
+        
+    Returns:
+        bool: True if the values were stored
+    """
+    cache = cache if cache is not None else get_cache()
+    if cache is None or not mapping:
+        return False
+    
+    try:
+        encoded = {key: dumps(value) for key, value in mapping.items()}
+        started = time.perf_counter()
+        pipe = cache.pipeline(transaction=False)
+        for key, data in encoded.items():
+            pipe.setex(key, timeout, data)
+        pipe.execute()
+        redis_breaker.record_success()
+    except (redis.RedisError, CodecError) as e:
+        if isinstance(e, redis.RedisError):
+            redis_breaker.record_failure()
+        for key in mapping:
+            cache_stats.record_error(key_prefix(key))
+        logger.error(f"Cache error storing {len(mapping)} keys: {e}")
+        return False
+    
+    elapsed = (time.perf_counter() - started) / len(encoded)
+    for key, data in encoded.items():
+        cache_stats.record_set(key_prefix(key), len(data), elapsed)
+    return True
+
+
+def _data_versions_collection():
+    """Return the Mongo collection holding durable data versions, or None."""
+    if not has_app_context():
+        return None
+    db = getattr(current_app, 'db', None)
+    return db[DATA_VERSIONS_COLLECTION] if db is not None else None
+
+
+def _load_durable_version(namespace: str) -> Optional[int]:
+    """Read the last data version recorded in Mongo, or None."""
+    collection = _data_versions_collection()
+    if collection is None:
+        return None
+    try:
+        doc = collection.find_one({'_id': namespace})
+    except PyMongoError as e:
+        logger.error(f"Error reading durable data version for {namespace}: {e}")
+        return None
+    return int(doc['version']) if doc else None
+
+
+def _save_durable_version(namespace: str, version: int) -> None:
+    """Record a data version in Mongo; it never moves backwards."""
+    collection = _data_versions_collection()
+    if collection is None:
+        return
+    try:
+        collection.update_one(
+            {'_id': namespace}, {'$max': {'version': version}}, upsert=True
+        )
+    except PyMongoError as e:
+        logger.error(f"Error saving durable data version for {namespace}: {e}")
+
+
+def _read_version(cache: redis.Redis, namespace: str, known: Optional[int]) -> int:
+    """Read the Redis counter, reconciled with the durable copy in Mongo.
+
+    The counter is raised to the durable version if it is behind, so a
+    counter Redis lost, or a bump any process made while Redis was
+    unreachable (which only reached Mongo), is restored on the next read.
+    A counter that is ahead of the durable copy is recorded there.
+
+    Raises:
+        redis.RedisError: If Redis cannot be reached
+    """
+    durable = _load_durable_version(namespace)
+    floor = max(v for v in (durable, known, 0) if v is not None)
+    version = int(cache.register_script(RAISE_VERSION_SCRIPT)(
+        keys=[DATA_VERSION_KEY.format(namespace=namespace)],
+        # Start from the clock only on first use
+        args=[floor, int(time.time())],
+    ))
+    if durable is None or durable < version:
+        _save_durable_version(namespace, version)
+    return version
+
+
+def get_data_version(namespace: str = 'registrations') -> Optional[int]:
+    """Get the current data version for a namespace.
+    
+    The version is read from Redis at most once every
+    ``CACHE_VERSION_CHECK_INTERVAL`` seconds per process. Versions are also
+    kept in the Mongo ``data_versions`` collection: a counter Redis lost is
+    restored from there (or, on first use, initialized from the clock), and
+    while Redis is down the Mongo copy is returned instead, so entries in
+    the disk tier stay reachable across Redis restarts and outages.
+    
+    Args:
+        namespace: Data namespace (default: registrations)
+        
+    Returns:
+        Optional[int]: The version, or None if neither Redis nor Mongo has it
+    """
+    now = time.monotonic()
+    with _data_versions_lock:
+        memo = _data_versions.get(namespace)
+    if memo is not None and now - memo[1] < settings.CACHE_VERSION_CHECK_INTERVAL:
+        return memo[0]
+    
+    version = None
+    cache = get_cache()
+    if cache is not None:
+        try:
+            version = _read_version(cache, namespace, memo[0] if memo else None)
+            redis_breaker.record_success()
+        except redis.RedisError as e:
+            redis_breaker.record_failure()
+            logger.error(f"Error reading data version for {namespace}: {e}")
+    if version is None:
+        version = _load_durable_version(namespace)
+        if version is None:
+            return None
+    
+    with _data_versions_lock:
+        _data_versions[namespace] = (version, now)
+    return version
+
+
+def bump_data_version(namespace: str = 'registrations') -> Optional[int]:
+    """Increment the data version, invalidating all versioned cache entries.
+    
+    The new version is recorded in Mongo as well. If Redis is unavailable
+    only the Mongo copy is incremented, and Redis catches up on the next
+    read of the counter in any process.
+    
+    Args:
+        namespace: Data namespace (default: registrations)
+        
+    Returns:
+        Optional[int]: The new version, or None if neither Redis nor Mongo
+            could be updated
     """
-    key_parts = [prefix] + [str(arg) for arg in args]
-    if kwargs:
-        key_parts.append(json.dumps(kwargs, sort_keys=True))
-    return ':'.join(key_parts)
+    # Make sure the counter exists so INCR does not restart from zero
+    if get_data_version(namespace) is None:
+        return None
+    
+    version = None
+    cache = get_cache()
+    if cache is not None:
+        try:
+            version = cache.incr(DATA_VERSION_KEY.format(namespace=namespace))
+            redis_breaker.record_success()
+        except redis.RedisError as e:
+            redis_breaker.record_failure()
+            logger.error(f"Error bumping data version for {namespace}: {e}")
+    
+    if version is not None:
+        _save_durable_version(namespace, version)
+    else:
+        collection = _data_versions_collection()
+        if collection is None:
+            return None
+        try:
+            doc = collection.find_one_and_update(
+                {'_id': namespace}, {'$inc': {'version': 1}},
+                return_document=ReturnDocument.AFTER,
+            )
+        except PyMongoError as e:
+            logger.error(f"Error bumping durable data version for {namespace}: {e}")
+            return None
+        if doc is None:
+            return None
+        version = int(doc['version'])
+    
+    with _data_versions_lock:
+        _data_versions[namespace] = (version, time.monotonic())
+    logger.info(f"Data version for {namespace} is now {version}")
+    return version
+
 
+def _disk_get(key: str) -> Any:
+    """Get and decode a value from the disk cache, or None."""
+    disk = get_disk_cache()
+    if disk is None:
+        return None
+    try:
+        value = disk.get(key)
+        return loads(value) if value is not None else None
+    except (sqlite3.Error, CodecError) as e:
+        logger.error(f"Disk cache error for key {key}: {e}")
+        return None
 
-def cached(timeout: int = 300, key_prefix: str = None, unless=None):
+
+def _disk_set(key: str, value: Any, timeout: int) -> None:
+    """Encode and store a value in the disk cache, if enabled."""
+    disk = get_disk_cache()
+    if disk is None:
+        return
+    try:
+        disk.set(key, dumps(value), timeout)
+    except (sqlite3.Error, CodecError) as e:
+        logger.error(f"Disk cache error for key {key}: {e}")
+
+
+def _store_key_metadata(key: CacheKey, timeout: int, cache: redis.Redis) -> None:
+    """Keep the full form of a hashed key next to it when debugging."""
+    if not (key.hashed and settings.DEBUG):
+        return
+    try:
+        cache.setex(f"{key}:meta", timeout, key.raw)
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Cache error for key {key}: {e}")
+
+
+def cached(timeout: int = 300, key_prefix: str = None, unless=None,
+           ignore: tuple = (), negative_timeout: Optional[int] = None,
+           versioned: Optional[str] = None, persist: bool = False):
     """Decorator to cache the result of a function.
     
+    Works on both regular and ``async`` functions. The cache key skips a
+    bound ``self``/``cls`` argument, so methods share entries across
+    instances.
+    
+    A ``None`` result is only cached when ``negative_timeout`` is given, in
+    which case a ``MISSING`` entry is stored for that many seconds and
+    later calls return None without running the function.
+    
+    With ``versioned`` set to a data namespace, the current data version
+    is part of the key, so entries become unreachable as soon as ingestion
+    bumps the version and do not need a short timeout.
+    
+    With ``persist``, results are also written to the on-disk cache tier
+    (see :mod:`app.core.disk_cache`), which is checked on a Redis miss and
+    survives restarts. Use it for expensive aggregates. Combined with
+    ``versioned``, the disk entries stay reachable across Redis restarts and
+    while Redis is down, since the data version is also kept in Mongo (see
+    :func:`get_data_version`).
+    
+    The decorated function gets a ``refresh`` attribute that always calls
+    the function and overwrites the cache entry, used for cache warming.
+    
     Args:
         timeout: Cache timeout in seconds (default: 300)
         key_prefix: Custom cache key prefix (default: function name)
         unless: Callable that returns True to bypass caching
+        ignore: Names of arguments to leave out of the cache key, e.g.
+            injected services
+        negative_timeout: Cache timeout in seconds for None results
+        versioned: Data namespace whose version is included in the key
+        persist: Also keep results in the disk cache tier
     """
     def decorator(f: F) -> F:
-        @wraps(f)
-        def decorated_function(*args, **kwargs):
+        prefix = key_prefix or f"{f.__module__}:{f.__name__}"
+        
+        def resolve(args, kwargs):
+            """Return ``(cache, key)`` for a call, or Nones to bypass.
+            
+            ``cache`` is None when only the disk tier is available.
+            """
             # Bypass cache if specified
             if callable(unless) and unless():
-                return f(*args, **kwargs)
-                
+                return None, None
+            
             # Get Redis connection
             cache = get_cache()
-            if cache is None:
-                return f(*args, **kwargs)
+            if cache is None and not (persist and get_disk_cache() is not None):
+                return None, None
             
             # Generate cache key
-            prefix = key_prefix or f"{f.__module__}:{f.__name__}"
-            key = cache_key(prefix, *args, **kwargs)
-            
+            key_base = prefix
+            if versioned:
+                version = get_data_version(versioned)
+                if version is None:
+                    return None, None
+                key_base = f"{prefix}:v{version}"
             try:
-                # Try to get from cache
-                cached_value = cache.get(key)
+                key = function_key(key_base, f, args, kwargs, ignore=ignore)
+            except TypeError as e:
+                logger.warning(f"Not caching {prefix}: {e}")
+                return None, None
+            # Group versioned keys under their unversioned prefix
+            key.prefix = prefix
+            
+            return cache, key
+        
+        def lookup(args, kwargs):
+            """Return ``(cache, key, value)`` for a call, or Nones to bypass."""
+            cache, key = resolve(args, kwargs)
+            if key is None:
+                return None, None, None
+            value = cache_get(key, cache) if cache is not None else None
+            if value is None and persist:
+                value = _disk_get(key)
+                if value is not None and cache is not None:
+                    cache_set(key, value, timeout, cache)
+            return cache, key, value
+        
+        def store(cache, key, result):
+            if key is None:
+                return
+            if result is None:
+                if negative_timeout and cache is not None:
+                    cache_set(key, MISSING, negative_timeout, cache)
+                return
+            if cache is not None and cache_set(key, result, timeout, cache):
+                _store_key_metadata(key, timeout, cache)
+            if persist:
+                _disk_set(key, result, timeout)
+        
+        if inspect.iscoroutinefunction(f):
+            @wraps(f)
+            async def decorated_coroutine(*args, **kwargs):
+                cache, key, cached_value = lookup(args, kwargs)
+                if cached_value is MISSING:
+                    return None
                 if cached_value is not None:
-                    logger.debug(f"Cache hit for key: {key}")
-                    return json.loads(cached_value)
+                    return cached_value
                 
                 # Call the function and cache the result
-                result = f(*args, **kwargs)
-                cache.setex(key, timeout, json.dumps(result))
+                result = await f(*args, **kwargs)
+                store(cache, key, result)
                 return result
-                
-            except (redis.RedisError, json.JSONDecodeError) as e:
-                logger.error(f"Cache error for key {key}: {e}")
-                # If there's a cache error, just call the function
-                return f(*args, **kwargs)
+            
+            async def refresh_coroutine(*args, **kwargs):
+                """Recompute the result and overwrite its cache entry."""
+                cache, key = resolve(args, kwargs)
+                result = await f(*args, **kwargs)
+                store(cache, key, result)
+                return result
+            
+            decorated_coroutine.refresh = refresh_coroutine
+            return cast(F, decorated_coroutine)
+        
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            cache, key, cached_value = lookup(args, kwargs)
+            if cached_value is MISSING:
+                return None
+            if cached_value is not None:
+                return cached_value
+            
+            # Call the function and cache the result
+            result = f(*args, **kwargs)
+            store(cache, key, result)
+            return result
         
+        def refresh(*args, **kwargs):
+            """Recompute the result and overwrite its cache entry."""
+            cache, key = resolve(args, kwargs)
+            result = f(*args, **kwargs)
+            store(cache, key, result)
+            return result
+        
+        decorated_function.refresh = refresh
         return cast(F, decorated_function)
     return decorator
 
@@ -145,22 +650,171 @@ def invalidate_cache(prefix: str, *args, **kwargs) -> None:
     if cache is None:
         return
     
-    pattern = cache_key(prefix, *args, **kwargs) + '*'
+    pattern = _escape_pattern(cache_key(prefix, *args, **kwargs)) + '*'
     try:
-        keys = cache.keys(pattern)
-        if keys:
-            cache.delete(*keys)
-            logger.debug(f"Invalidated cache keys: {keys}")
+        deleted = _unlink_matching(cache, pattern)
+        redis_breaker.record_success()
+        logger.debug(f"Invalidated {deleted} cache keys matching {pattern}")
     except redis.RedisError as e:
+        redis_breaker.record_failure()
         logger.error(f"Error invalidating cache for pattern {pattern}: {e}")
 
 
+def _unlink_matching(cache: redis.Redis, pattern: str) -> int:
+    """UNLINK keys matching ``pattern`` in batches, without blocking on KEYS."""
+    deleted = 0
+    batch = []
+    for key in cache.scan_iter(match=pattern, count=SCAN_BATCH_SIZE):
+        batch.append(key)
+        if len(batch) >= SCAN_BATCH_SIZE:
+            deleted += cache.unlink(*batch)
+            batch = []
+    if batch:
+        deleted += cache.unlink(*batch)
+    return deleted
+
+
+def flush_namespace(prefix: str) -> Optional[int]:
+    """Delete every cache entry under a key prefix, in Redis and on disk.
+    
+    Args:
+        prefix: Cache key prefix, e.g. ``registration_search``
+        
+    Returns:
+        Optional[int]: Number of Redis keys deleted, or None if Redis is
+            unavailable
+    """
+    disk = get_disk_cache()
+    if disk is not None:
+        try:
+            disk.delete_prefix(prefix)
+        except sqlite3.Error as e:
+            logger.error(f"Error flushing disk cache namespace {prefix}: {e}")
+    
+    cache = get_cache()
+    if cache is None:
+        return None
+    
+    try:
+        pattern = f"{_escape_pattern(prefix)}:*"
+        deleted = cache.unlink(prefix) + _unlink_matching(cache, pattern)
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error flushing cache namespace {prefix}: {e}")
+        return None
+    
+    logger.info(f"Flushed {deleted} keys from cache namespace {prefix}")
+    return deleted
+
+
+def _escape_pattern(value: str) -> str:
+    """Escape glob characters for use in a SCAN/KEYS pattern."""
+    for char in '\\*?[]':
+        value = value.replace(char, '\\' + char)
+    return value
+
+
+def sample_key_usage(
+    sample_size: int = 1000, top: int = 20
+) -> Optional[Dict[str, Any]]:
+    """Estimate memory use per key prefix from a sample of keys.
+    
+    Walks the keyspace with SCAN until ``sample_size`` keys have been seen
+    and measures each with ``MEMORY USAGE``.
+    
+    Args:
+        sample_size: Maximum number of keys to sample
+        top: Number of largest keys to return
+        
+    Returns:
+        Optional[dict]: ``sampled`` (int), ``prefixes`` (keys, bytes and
+            share of the sampled bytes per prefix) and ``top_keys``; None if
+            Redis is unavailable
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+    
+    try:
+        keys = []
+        for key in cache.scan_iter(count=SCAN_BATCH_SIZE):
+            keys.append(key)
+            if len(keys) >= sample_size:
+                break
+        
+        pipe = cache.pipeline(transaction=False)
+        for key in keys:
+            pipe.memory_usage(key)
+            pipe.ttl(key)
+        results = pipe.execute()
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error sampling cache keys: {e}")
+        return None
+    
+    sizes = []
+    prefixes: Dict[str, Dict[str, int]] = {}
+    for index, key in enumerate(keys):
+        size, ttl = results[2 * index], results[2 * index + 1]
+        if size is None:
+            # Expired between SCAN and MEMORY USAGE
+            continue
+        key = key.decode('utf-8', 'replace')
+        prefix = key_prefix(key)
+        usage = prefixes.setdefault(prefix, {'keys': 0, 'bytes': 0})
+        usage['keys'] += 1
+        usage['bytes'] += size
+        sizes.append({'key': key, 'prefix': prefix, 'bytes': size, 'ttl': ttl})
+    
+    total = sum(usage['bytes'] for usage in prefixes.values())
+    for usage in prefixes.values():
+        usage['share'] = round(usage['bytes'] / total, 4) if total else 0
+    
+    return {
+        'sampled': len(sizes),
+        'prefixes': dict(
+            sorted(prefixes.items(), key=lambda i: i[1]['bytes'], reverse=True)
+        ),
+        'top_keys': sorted(sizes, key=lambda k: k['bytes'], reverse=True)[:top],
+    }
+
+
+def delete_keys(*keys: str) -> None:
+    """Delete specific cache entries, including negative entries.
+    
+    Args:
+        *keys: Exact cache keys to delete
+    """
+    cache = get_cache()
+    if cache is None or not keys:
+        return
+    
+    try:
+        cache.delete(*keys)
+        redis_breaker.record_success()
+        logger.debug(f"Deleted cache keys: {keys}")
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error deleting cache keys {keys}: {e}")
+
+
 def clear_cache() -> None:
-    """Clear the entire cache."""
+    """Clear the entire cache, including the disk tier."""
+    disk = get_disk_cache()
+    if disk is not None:
+        try:
+            disk.clear()
+        except sqlite3.Error as e:
+            logger.error(f"Error clearing disk cache: {e}")
+    
     cache = get_cache()
     if cache is not None:
         try:
             cache.flushdb()
+            redis_breaker.record_success()
             logger.info("Cache cleared successfully")
         except redis.RedisError as e:
+            redis_breaker.record_failure()
             logger.error(f"Error clearing cache: {e}")
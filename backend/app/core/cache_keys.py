@@ -0,0 +1,204 @@
+"""
+Cache key construction for BizFindr.
+
+Keys are built from a prefix and the canonical form of the call arguments,
+so equivalent calls map to the same key regardless of how they were made:
+``get_business(svc, "abc")`` and ``get_business(other_svc, business_id="abc")``
+both produce ``business:abc``.
+
+Parts are separated by ``:``. String parts escape ``\\`` and ``:`` with a
+backslash; every other part, including None, is JSON preceded by a single
+backslash, and keyword arguments are marked ``\\*``. So no two different
+argument lists can join to the same key: ``("a:", "b")`` becomes
+``a\\::b`` while ``("a", ":b")`` becomes ``a:\\:b``, ``True`` becomes
+``\\true`` while ``"true"`` stays ``true``, and ``None`` becomes ``\\null``
+while ``""`` stays empty.
+"""
+import hashlib
+import inspect
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+
+# Parameter names that refer to the bound instance or class
+BOUND_PARAMS = ('self', 'cls')
+
+# Marker placed between the prefix and the digest of a hashed key
+HASH_MARKER = '#'
+
+# Escape character for string parts; also marks JSON parts
+ESCAPE = '\\'
+
+
+class CacheKey(str):
+    """A cache key that remembers the full key it was derived from.
+
+    When the canonical key exceeds ``CACHE_KEY_MAX_LENGTH`` it is replaced
+    by the prefix plus a digest, and the original is kept in :attr:`raw`
+    for debugging. :attr:`prefix` is used to group cache statistics.
+    """
+
+    raw: str
+    hashed: bool
+    prefix: Optional[str]
+
+    def __new__(cls, key: str, raw: Optional[str] = None, prefix: Optional[str] = None):
+        obj = super().__new__(cls, key)
+        obj.raw = raw or key
+        obj.hashed = raw is not None and raw != key
+        obj.prefix = prefix
+        return obj
+
+
+def canonicalize(value: Any) -> Any:
+    """Convert a value to a canonical, JSON-compatible form.
+
+    Numbers and strings that represent the same value canonicalize the same
+    way (``1``, ``1.0`` and ``"1"`` all become ``"1"``), mappings are sorted
+    by key and sets are sorted by value. Booleans stay booleans, so they do
+    not collide with the strings ``"true"`` and ``"false"``.
+
+    Raises:
+        TypeError: If the value has no stable canonical form
+    """
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, Enum):
+        return canonicalize(value.value)
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, dict):
+        return {
+            str(k): canonicalize(v)
+            for k, v in sorted(value.items(), key=lambda i: str(i[0]))
+        }
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonicalize(v) for v in value), key=lambda v: json.dumps(v))
+    if hasattr(value, 'model_dump'):
+        return canonicalize(value.model_dump())
+    if hasattr(value, 'dict') and hasattr(value, '__fields__'):
+        return canonicalize(value.dict())
+    raise TypeError(f"Cannot build a cache key from {type(value).__name__}")
+
+
+def _escape(value: str) -> str:
+    return value.replace(ESCAPE, ESCAPE * 2).replace(':', ESCAPE + ':')
+
+
+def _key_part(value: Any) -> str:
+    value = canonicalize(value)
+    if isinstance(value, str):
+        return _escape(value)
+    # An escaped string never has a backslash before anything but "\\" or
+    # ":", and JSON is self-delimiting, so a marked JSON part is unambiguous
+    return ESCAPE + json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def _kwargs_part(kwargs: Dict[str, Any]) -> str:
+    # Marked apart from a positional mapping with the same items
+    return (
+        ESCAPE
+        + '*'
+        + json.dumps(canonicalize(kwargs), sort_keys=True, separators=(',', ':'))
+    )
+
+
+def _finalize(prefix: str, parts: Iterable[str]) -> CacheKey:
+    raw = ':'.join([prefix, *parts])
+    max_length = settings.CACHE_KEY_MAX_LENGTH
+    if len(raw) <= max_length:
+        return CacheKey(raw, prefix=prefix)
+    digest = hashlib.sha1(raw[len(prefix) :].encode('utf-8')).hexdigest()
+    return CacheKey(f"{prefix}:{HASH_MARKER}{digest}", raw, prefix=prefix)
+
+
+def make_key(prefix: str, *args, **kwargs) -> CacheKey:
+    """Build a cache key from a prefix and canonicalized arguments.
+
+    Args:
+        prefix: Cache key prefix
+        *args: Positional arguments to include in the key
+        **kwargs: Keyword arguments to include in the key, sorted by name
+
+    Returns:
+        CacheKey: Generated cache key
+    """
+    parts = [_key_part(arg) for arg in args]
+    if kwargs:
+        parts.append(_kwargs_part(kwargs))
+    return _finalize(prefix, parts)
+
+
+def _signature(f: Callable) -> inspect.Signature:
+    try:
+        return f.__cache_signature__
+    except AttributeError:
+        sig = inspect.signature(f)
+        try:
+            f.__cache_signature__ = sig
+        except AttributeError:
+            pass
+        return sig
+
+
+def function_key(
+    prefix: str,
+    f: Callable,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    ignore: Iterable[str] = (),
+) -> CacheKey:
+    """Build a cache key for a call to ``f``.
+
+    Arguments are bound to the function signature (with defaults applied)
+    so positional and keyword calls produce the same key. A leading
+    ``self``/``cls`` parameter and any parameter named in ``ignore`` are
+    left out of the key.
+
+    Args:
+        prefix: Cache key prefix
+        f: The function being called
+        args: Positional arguments of the call
+        kwargs: Keyword arguments of the call
+        ignore: Parameter names to leave out of the key
+
+    Returns:
+        CacheKey: Generated cache key
+
+    Raises:
+        TypeError: If an argument has no stable canonical form
+    """
+    sig = _signature(f)
+    bound = sig.bind(*args, **kwargs)
+    bound.apply_defaults()
+
+    parts = []
+    extra: Dict[str, Any] = {}
+    for index, (name, value) in enumerate(bound.arguments.items()):
+        if (index == 0 and name in BOUND_PARAMS) or name in ignore:
+            continue
+        kind = sig.parameters[name].kind
+        if kind is inspect.Parameter.VAR_POSITIONAL:
+            parts.extend(_key_part(v) for v in value)
+        elif kind is inspect.Parameter.VAR_KEYWORD:
+            extra.update(value)
+        else:
+            parts.append(_key_part(value))
+    if extra:
+        parts.append(_kwargs_part(extra))
+    return _finalize(prefix, parts)
@@ -0,0 +1,161 @@
+"""
+Cache statistics per key prefix.
+
+Every cache read and write made through :mod:`app.core.cache` is recorded
+here by key prefix: hits, misses, errors, latency and value sizes. Counts
+are exported as Prometheus metrics (see :mod:`app.core.metrics`) and also
+kept in process for the admin API, which can show them without a
+Prometheus server.
+"""
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.metrics import CACHE_LATENCY, CACHE_REQUESTS, CACHE_VALUE_SIZE
+
+HIT = 'hit'
+MISS = 'miss'
+ERROR = 'error'
+
+
+def key_prefix(key: str) -> str:
+    """Return the prefix a cache key was built with.
+
+    Args:
+        key: Cache key, usually a :class:`~app.core.cache_keys.CacheKey`
+
+    Returns:
+        str: The key prefix, or the part before the first ``:``
+    """
+    prefix = getattr(key, 'prefix', None)
+    if prefix:
+        return prefix
+    return key.split(':', 1)[0]
+
+
+class _PrefixStats:
+    __slots__ = (
+        'hits',
+        'misses',
+        'errors',
+        'sets',
+        'get_seconds',
+        'gets',
+        'set_seconds',
+        'value_bytes',
+        'max_value_bytes',
+    )
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.sets = 0
+        self.gets = 0
+        self.get_seconds = 0.0
+        self.set_seconds = 0.0
+        self.value_bytes = 0
+        self.max_value_bytes = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+            'avg_get_ms': round(self.get_seconds / self.gets * 1000, 3)
+            if self.gets
+            else None,
+            'sets': self.sets,
+            'avg_set_ms': round(self.set_seconds / self.sets * 1000, 3)
+            if self.sets
+            else None,
+            'avg_value_bytes': self.value_bytes // self.sets if self.sets else None,
+            'max_value_bytes': self.max_value_bytes,
+        }
+
+
+class CacheStats:
+    """Thread-safe per-prefix cache counters for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, _PrefixStats] = {}
+
+    def _get(self, prefix: str) -> _PrefixStats:
+        stats = self._stats.get(prefix)
+        if stats is None:
+            stats = self._stats[prefix] = _PrefixStats()
+        return stats
+
+    def record_get(
+        self, prefix: str, result: str, seconds: Optional[float] = None
+    ) -> None:
+        """Record the outcome of a lookup.
+
+        Args:
+            prefix: Key prefix
+            result: ``HIT``, ``MISS`` or ``ERROR``
+            seconds: Round-trip time, if this call made one
+        """
+        CACHE_REQUESTS.labels(prefix, result).inc()
+        if seconds is not None:
+            CACHE_LATENCY.labels(prefix, 'get').observe(seconds)
+        with self._lock:
+            stats = self._get(prefix)
+            if result == HIT:
+                stats.hits += 1
+            elif result == MISS:
+                stats.misses += 1
+            else:
+                stats.errors += 1
+            if seconds is not None:
+                stats.gets += 1
+                stats.get_seconds += seconds
+
+    def record_set(self, prefix: str, size: int, seconds: float) -> None:
+        """Record a successful write.
+
+        Args:
+            prefix: Key prefix
+            size: Encoded value size in bytes
+            seconds: Round-trip time
+        """
+        CACHE_VALUE_SIZE.labels(prefix).observe(size)
+        CACHE_LATENCY.labels(prefix, 'set').observe(seconds)
+        with self._lock:
+            stats = self._get(prefix)
+            stats.sets += 1
+            stats.set_seconds += seconds
+            stats.value_bytes += size
+            stats.max_value_bytes = max(stats.max_value_bytes, size)
+
+    def record_error(self, prefix: str) -> None:
+        """Record a failed write.
+
+        Args:
+            prefix: Key prefix
+        """
+        CACHE_REQUESTS.labels(prefix, ERROR).inc()
+        with self._lock:
+            self._get(prefix).errors += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Return the counters of every prefix seen so far.
+
+        Returns:
+            dict: Statistics keyed by prefix
+        """
+        with self._lock:
+            return {
+                prefix: stats.as_dict() for prefix, stats in sorted(self._stats.items())
+            }
+
+    def reset(self) -> None:
+        """Forget all counters."""
+        with self._lock:
+            self._stats.clear()
+
+
+# Process-wide statistics used by app.core.cache
+cache_stats = CacheStats()
@@ -0,0 +1,138 @@
+"""
+Circuit breaker for calls to backing services such as Redis.
+
+After ``failure_threshold`` consecutive failures the breaker opens and calls
+are skipped for ``reset_timeout`` seconds. It then goes half-open and lets a
+single probe through: a success closes the breaker, a failure opens it again.
+"""
+import logging
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.core.metrics import (
+    CIRCUIT_BREAKER_REJECTED,
+    CIRCUIT_BREAKER_STATE,
+    CIRCUIT_BREAKER_TRIPS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure circuit breaker.
+
+    Args:
+        name: Name used in logs and metrics
+        failure_threshold: Consecutive failures before the breaker opens
+        reset_timeout: Seconds to stay open before allowing a probe
+    """
+
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        CIRCUIT_BREAKER_STATE.labels(name).set(0)
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the timeout expires."""
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.reset_timeout
+            ):
+                self._set_state(self.HALF_OPEN)
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Check whether a call may be made right now.
+
+        In the half-open state only one probe is allowed at a time. A probe
+        whose outcome is never recorded is given up on after ``reset_timeout``.
+
+        Returns:
+            bool: True if the call should go ahead
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.HALF_OPEN and (
+                self._probe_started is None
+                or now - self._probe_started >= self.reset_timeout
+            ):
+                self._probe_started = now
+                return True
+
+        CIRCUIT_BREAKER_REJECTED.labels(self.name).inc()
+        return False
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the breaker if it was probing."""
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            if self._state != self.CLOSED:
+                logger.info(f"Circuit breaker '{self.name}' closed")
+                self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker past the threshold."""
+        with self._lock:
+            self._failures += 1
+            self._probe_started = None
+            if self._state == self.HALF_OPEN or (
+                self._state == self.CLOSED and self._failures >= self.failure_threshold
+            ):
+                logger.warning(
+                    f"Circuit breaker '{self.name}' opened after "
+                    f"{self._failures} failures, retrying in {self.reset_timeout}s"
+                )
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+                CIRCUIT_BREAKER_TRIPS.labels(self.name).inc()
+
+    def reset(self) -> None:
+        """Force the breaker back to the closed state."""
+        with self._lock:
+            self._failures = 0
+            self._probe_started = None
+            self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        CIRCUIT_BREAKER_STATE.labels(self.name).set(self._STATE_VALUES[state])
+
+
+# Shared breaker for all Redis access (cache and rate limiting)
+redis_breaker = CircuitBreaker(
+    'redis',
+    failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.REDIS_BREAKER_RESET_TIMEOUT,
+)
+
+
+def allow_redis_request(conn) -> bool:
+    """Check whether a call on a Redis connection may be made right now.
+
+    Clients with a breaker per node (``ShardedRedis``) bypass only their
+    failing nodes themselves, so the shared breaker is not consulted.
+    """
+    return hasattr(conn, 'breakers') or redis_breaker.allow_request()
@@ -0,0 +1,393 @@
+"""
+Value codecs for the Redis cache.
+
+Every cached value is stored as a single header byte followed by the encoded
+payload. The header records which codec produced the payload and whether it
+was compressed, so the configured codec can be changed without flushing the
+cache: values written by an older codec are still decoded correctly.
+
+Header layout::
+
+    bit 7     always set (legacy JSON values start with an ASCII byte)
+    bits 4-6  compression id (0 = none, 1 = zlib, 2 = zstd)
+    bits 0-3  codec id (1 = json, 2 = msgpack, 3 = orjson)
+
+A header with codec id 0 and no payload is reserved for :data:`MISSING`,
+the sentinel stored by negative cache entries.
+"""
+import importlib
+import json
+import logging
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional
+
+from bson import ObjectId
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER_FLAG = 0x80
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+# msgpack extension type codes
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_OBJECTID = 3
+EXT_MODEL = 4
+
+
+class CodecError(ValueError):
+    """Raised when a cached value cannot be encoded or decoded."""
+
+
+class _Missing:
+    """Type of the :data:`MISSING` sentinel."""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __repr__(self):
+        return 'MISSING'
+
+    def __bool__(self):
+        return False
+
+
+# Cached marker for "looked up, does not exist"
+MISSING = _Missing()
+MISSING_VALUE = bytes((HEADER_FLAG,))
+
+
+def _model_path(value: Any) -> str:
+    cls = type(value)
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _load_model(path: str, data: Dict[str, Any]) -> Any:
+    """Rebuild a pydantic model from its import path and field data.
+
+    Only models defined inside the application package are revived, so a
+    tampered cache entry cannot be used to import arbitrary modules.
+    """
+    module_name, _, qualname = path.partition(':')
+    if not module_name.startswith('app.'):
+        raise CodecError(f"Refusing to load model from {module_name!r}")
+    obj: Any = importlib.import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+    return obj(**data)
+
+
+def _model_data(value: Any) -> Dict[str, Any]:
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(by_alias=True)
+    return value.dict(by_alias=True)
+
+
+def _is_model(value: Any) -> bool:
+    return hasattr(value, 'model_dump') or hasattr(value, '__fields__')
+
+
+class Codec:
+    """Base class for cache value codecs."""
+
+    codec_id: int = 0
+    name: str = ''
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+def _tag(value: Any) -> Any:
+    """Convert extension types to tagged JSON objects."""
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    if isinstance(value, date):
+        return {'$day': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if _is_model(value):
+        return {'$model': _model_path(value), 'data': _model_data(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def _untag(obj: Dict[str, Any]) -> Any:
+    """Inverse of :func:`_tag`, used as a JSON object hook."""
+    if len(obj) == 1:
+        if '$date' in obj:
+            return datetime.fromisoformat(obj['$date'])
+        if '$day' in obj:
+            return date.fromisoformat(obj['$day'])
+        if '$oid' in obj:
+            return ObjectId(obj['$oid'])
+    elif len(obj) == 2 and '$model' in obj and 'data' in obj:
+        return _load_model(obj['$model'], obj['data'])
+    return obj
+
+
+class JSONCodec(Codec):
+    """Standard library JSON with tagged extension types."""
+
+    codec_id = 1
+    name = 'json'
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=_tag, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data, object_hook=_untag)
+
+
+class OrjsonCodec(Codec):
+    """orjson with the same tagged extension types as :class:`JSONCodec`."""
+
+    codec_id = 3
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._options = orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, value: Any) -> bytes:
+        return self._orjson.dumps(value, default=_tag, option=self._options)
+
+    def loads(self, data: bytes) -> Any:
+        return self._revive(self._orjson.loads(data))
+
+    def _revive(self, value: Any) -> Any:
+        # orjson has no object hook, so walk the decoded structure instead.
+        if isinstance(value, dict):
+            return _untag({k: self._revive(v) for k, v in value.items()})
+        if isinstance(value, list):
+            return [self._revive(v) for v in value]
+        return value
+
+
+class MsgpackCodec(Codec):
+    """msgpack with extension types for datetimes, ObjectIds and models."""
+
+    codec_id = 2
+    name = 'msgpack'
+
+    def __init__(self):
+        import msgpack
+
+        self._msgpack = msgpack
+
+    def _default(self, value: Any) -> Any:
+        msgpack = self._msgpack
+        if isinstance(value, datetime):
+            return msgpack.ExtType(EXT_DATETIME, value.isoformat().encode('ascii'))
+        if isinstance(value, date):
+            return msgpack.ExtType(EXT_DATE, value.isoformat().encode('ascii'))
+        if isinstance(value, ObjectId):
+            return msgpack.ExtType(EXT_OBJECTID, value.binary)
+        if _is_model(value):
+            payload = self.dumps([_model_path(value), _model_data(value)])
+            return msgpack.ExtType(EXT_MODEL, payload)
+        raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+    def _ext_hook(self, code: int, data: bytes) -> Any:
+        if code == EXT_DATETIME:
+            return datetime.fromisoformat(data.decode('ascii'))
+        if code == EXT_DATE:
+            return date.fromisoformat(data.decode('ascii'))
+        if code == EXT_OBJECTID:
+            return ObjectId(data)
+        if code == EXT_MODEL:
+            path, fields = self.loads(data)
+            return _load_model(path, fields)
+        return self._msgpack.ExtType(code, data)
+
+    def dumps(self, value: Any) -> bytes:
+        return self._msgpack.packb(value, default=self._default, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(
+            data, ext_hook=self._ext_hook, raw=False, strict_map_key=False
+        )
+
+
+# Registry of codec factories keyed by id and by name
+_CODEC_FACTORIES: Dict[int, Callable[[], Codec]] = {
+    JSONCodec.codec_id: JSONCodec,
+    MsgpackCodec.codec_id: MsgpackCodec,
+    OrjsonCodec.codec_id: OrjsonCodec,
+}
+_CODEC_NAMES = {
+    JSONCodec.name: JSONCodec.codec_id,
+    MsgpackCodec.name: MsgpackCodec.codec_id,
+    OrjsonCodec.name: OrjsonCodec.codec_id,
+}
+_codecs: Dict[int, Codec] = {}
+
+
+def get_codec(codec: Any) -> Codec:
+    """Get a codec instance by id or name.
+
+    Args:
+        codec: Codec id (int) or name (str)
+
+    Returns:
+        Codec: Codec instance
+
+    Raises:
+        CodecError: If the codec is unknown or its library is not installed
+    """
+    codec_id = _CODEC_NAMES.get(codec, codec) if isinstance(codec, str) else codec
+    if codec_id not in _codecs:
+        factory = _CODEC_FACTORIES.get(codec_id)
+        if factory is None:
+            raise CodecError(f"Unknown cache codec: {codec!r}")
+        try:
+            _codecs[codec_id] = factory()
+        except ImportError as e:
+            raise CodecError(f"Cache codec {codec!r} is not available: {e}") from e
+    return _codecs[codec_id]
+
+
+def _compress(data: bytes, method: int) -> bytes:
+    if method == COMPRESSION_ZLIB:
+        return zlib.compress(data, 6)
+    if method == COMPRESSION_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decompress(data: bytes, method: int) -> bytes:
+    if method == COMPRESSION_NONE:
+        return data
+    if method == COMPRESSION_ZLIB:
+        return zlib.decompress(data)
+    if method == COMPRESSION_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise CodecError(f"Unknown compression method: {method}")
+
+
+def _compression_method(name: str) -> int:
+    name = (name or 'none').lower()
+    if name == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+
+            return COMPRESSION_ZSTD
+        except ImportError:
+            logger.warning("zstandard is not installed, falling back to zlib")
+            return COMPRESSION_ZLIB
+    if name == 'zlib':
+        return COMPRESSION_ZLIB
+    return COMPRESSION_NONE
+
+
+class ValueSerializer:
+    """Encode and decode cache values with a header byte.
+
+    Args:
+        codec: Codec name used for new values
+        compression: Compression method (``none``, ``zlib`` or ``zstd``)
+        threshold: Payloads smaller than this many bytes are not compressed
+    """
+
+    def __init__(
+        self, codec: str = 'msgpack', compression: str = 'zlib', threshold: int = 1024
+    ):
+        try:
+            self.codec = get_codec(codec)
+        except CodecError as e:
+            logger.warning(f"{e}; falling back to json")
+            self.codec = get_codec('json')
+        self.compression = _compression_method(compression)
+        self.threshold = threshold
+
+    def dumps(self, value: Any) -> bytes:
+        """Serialize a value for storage in the cache.
+
+        Raises:
+            CodecError: If the value cannot be serialized
+        """
+        if value is MISSING:
+            return MISSING_VALUE
+        try:
+            payload = self.codec.dumps(value)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise CodecError(f"Failed to encode cache value: {e}") from e
+
+        method = COMPRESSION_NONE
+        if self.compression != COMPRESSION_NONE and len(payload) >= self.threshold:
+            compressed = _compress(payload, self.compression)
+            if len(compressed) < len(payload):
+                payload, method = compressed, self.compression
+
+        header = HEADER_FLAG | (method << 4) | self.codec.codec_id
+        return bytes((header,)) + payload
+
+    def loads(self, data: Any) -> Any:
+        """Deserialize a value read from the cache.
+
+        Values without a header byte are treated as legacy JSON strings.
+
+        Raises:
+            CodecError: If the value cannot be decoded
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not data:
+            raise CodecError("Empty cache value")
+
+        header = data[0]
+        if data == MISSING_VALUE:
+            return MISSING
+        try:
+            if not header & HEADER_FLAG:
+                return json.loads(data)
+            codec = get_codec(header & 0x0F)
+            payload = _decompress(data[1:], (header >> 4) & 0x07)
+            return codec.loads(payload)
+        except CodecError:
+            raise
+        except Exception as e:
+            raise CodecError(f"Failed to decode cache value: {e}") from e
+
+
+_serializer: Optional[ValueSerializer] = None
+
+
+def get_serializer() -> ValueSerializer:
+    """Get the process-wide serializer configured from settings."""
+    global _serializer
+
+    if _serializer is None:
+        _serializer = ValueSerializer(
+            codec=settings.CACHE_CODEC,
+            compression=settings.CACHE_COMPRESSION,
+            threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+        )
+    return _serializer
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value with the configured serializer."""
+    return get_serializer().dumps(value)
+
+
+def loads(data: Any) -> Any:
+    """Deserialize a value with the configured serializer."""
+    return get_serializer().loads(data)
@@ -22,6 +22,8 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     ENVIRONMENT: str = "development"
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret-key-change-me-in-production")
+    # Unset disables the admin API
+    ADMIN_API_KEY: Optional[str] = os.getenv("ADMIN_API_KEY") or None
     
     # Flask Settings
     FLASK_APP: str = os.getenv("FLASK_APP", "app")
@@ -132,6 +134,17 @@ class Settings(BaseSettings):
     # Redis Settings
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://redis:6379/0")
     REDIS_CACHE_TTL: int = int(os.getenv("REDIS_CACHE_TTL", "300"))  # 5 minutes default
+    # Timeouts, including the breaker's reset timeout, are in seconds
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "0.5"))
+    REDIS_CONNECT_TIMEOUT: float = float(os.getenv("REDIS_CONNECT_TIMEOUT", "0.5"))
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = int(
+        os.getenv("REDIS_BREAKER_FAILURE_THRESHOLD", "5")
+    )
+    REDIS_BREAKER_RESET_TIMEOUT: float = float(
+        os.getenv("REDIS_BREAKER_RESET_TIMEOUT", "30")
+    )
+    # Comma-separated URLs; shards the cache when set
+    REDIS_CACHE_NODES: str = os.getenv("REDIS_CACHE_NODES", "")
     
     # API Settings
     API_PREFIX: str = "/api"
@@ -150,10 +163,81 @@ class Settings(BaseSettings):
     # Rate Limiting
     RATE_LIMIT_DEFAULT: str = "1000 per day"
     RATE_LIMIT_STORAGE_URL: str = REDIS_URL
+    # Algorithm: sliding_window or gcra
+    RATE_LIMIT_ALGORITHM: str = os.getenv("RATE_LIMIT_ALGORITHM", "sliding_window")
+    # Mode: strict or approximate (local token buckets)
+    RATE_LIMIT_MODE: str = os.getenv("RATE_LIMIT_MODE", "strict")
+    # Seconds between lease refills
+    RATE_LIMIT_SYNC_INTERVAL: float = float(
+        os.getenv("RATE_LIMIT_SYNC_INTERVAL", "0.25")
+    )
+    # Share of a limit leased at once
+    RATE_LIMIT_LEASE_FRACTION: float = float(
+        os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.1")
+    )
+    # Cost units per API key
+    API_KEY_QUOTA: str = os.getenv("API_KEY_QUOTA", "600 per minute")
+    # Extra unit per N ms of request time; 0 disables
+    API_QUOTA_MS_PER_UNIT: int = int(os.getenv("API_QUOTA_MS_PER_UNIT", "0"))
+    # Days of per-key usage kept
+    API_QUOTA_USAGE_DAYS: int = int(os.getenv("API_QUOTA_USAGE_DAYS", "7"))
     
     # Caching
     CACHE_DEFAULT_TIMEOUT: int = 300  # 5 minutes
     CACHE_KEY_PREFIX: str = "bizfindr_"
+    # Longer keys are hashed
+    CACHE_KEY_MAX_LENGTH: int = int(os.getenv("CACHE_KEY_MAX_LENGTH", "200"))
+    # Seconds to remember missing IDs
+    CACHE_NEGATIVE_TTL: int = int(os.getenv("CACHE_NEGATIVE_TTL", "30"))
+    # TTL of entries keyed on the data version
+    CACHE_VERSIONED_TTL: int = int(os.getenv("CACHE_VERSIONED_TTL", "86400"))
+    # Seconds between reads of the data version counters
+    CACHE_VERSION_CHECK_INTERVAL: float = float(
+        os.getenv("CACHE_VERSION_CHECK_INTERVAL", "1")
+    )
+    CACHE_WARM_ENABLED: bool = os.getenv("CACHE_WARM_ENABLED", "true").lower() == "true"
+    # /registrations pages to warm
+    CACHE_WARM_PAGES: int = int(os.getenv("CACHE_WARM_PAGES", "5"))
+    CACHE_WARM_PER_PAGE: int = int(os.getenv("CACHE_WARM_PER_PAGE", "20"))
+    CACHE_WARM_TOP_QUERIES: int = int(os.getenv("CACHE_WARM_TOP_QUERIES", "20"))
+    CACHE_WARM_CONCURRENCY: int = int(os.getenv("CACHE_WARM_CONCURRENCY", "4"))
+    CACHE_CODEC: str = os.getenv("CACHE_CODEC", "msgpack")  # msgpack, orjson or json
+    # Compression: none, zlib or zstd
+    CACHE_COMPRESSION: str = os.getenv("CACHE_COMPRESSION", "zlib")
+    # Values over this many bytes are compressed
+    CACHE_COMPRESSION_THRESHOLD: int = int(
+        os.getenv("CACHE_COMPRESSION_THRESHOLD", "1024")
+    )
+    # Unset disables the disk tier
+    DISK_CACHE_PATH: Optional[str] = os.getenv("DISK_CACHE_PATH") or None
+    DISK_CACHE_MAX_BYTES: int = int(
+        os.getenv("DISK_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+    )
+    
+    # Pagination
+    # Deeper pages need a cursor
+    PAGINATION_MAX_SKIP: int = int(os.getenv("PAGINATION_MAX_SKIP", "10000"))
+    # Rows per Mongo batch and streamed chunk
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    # IDs per /registrations/batch request
+    BATCH_LOOKUP_MAX_IDS: int = int(os.getenv("BATCH_LOOKUP_MAX_IDS", "1000"))
+    # Server-side budget per search/list query
+    QUERY_MAX_TIME_MS: int = int(os.getenv("QUERY_MAX_TIME_MS", "5000"))
+    
+    # Query profiling and the slow query log
+    QUERY_PROFILING: bool = os.getenv("QUERY_PROFILING", "false").lower() == "true"
+    # Queries at least this slow are logged
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "100"))
+    # Explain slow queries when logging them
+    SLOW_QUERY_EXPLAIN: bool = (
+        os.getenv("SLOW_QUERY_EXPLAIN", "false").lower() == "true"
+    )
+    # Size of the capped slow query collection
+    SLOW_QUERY_LOG_BYTES: int = int(
+        os.getenv("SLOW_QUERY_LOG_BYTES", str(16 * 1024 * 1024))
+    )
+    # Entries kept in the capped slow query collection
+    SLOW_QUERY_LOG_MAX: int = int(os.getenv("SLOW_QUERY_LOG_MAX", "10000"))
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
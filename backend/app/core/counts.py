@@ -0,0 +1,92 @@
+"""
+Total counts for paginated queries.
+
+``count_documents`` walks every matching index entry, so for an empty or
+broad filter it costs as much as the query it accompanies. Counts are
+therefore taken with the cheapest strategy that fits:
+
+- ``estimated``: an unfiltered count comes from collection metadata
+  (``estimated_document_count``)
+- ``cached``: a filtered count is cached under the filter and the data
+  version, so it is computed once per filter until ingestion changes the data
+- ``exact``: ``count_documents``, used when Redis is unavailable
+- ``has_more``: no count at all; the page query fetches one extra row to
+  tell whether there is a next page
+
+The strategy used is reported to clients so they know how far to trust
+the total.
+"""
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.cache import cache_get, cache_key, cache_set, get_cache, get_data_version
+from app.core.config import settings
+from app.core.query_profiler import COUNT, track_query
+
+logger = logging.getLogger(__name__)
+
+# Count strategies
+ESTIMATED = 'estimated'
+CACHED = 'cached'
+EXACT = 'exact'
+HAS_MORE = 'has_more'
+
+# Count modes a caller can ask for
+AUTO = 'auto'
+COUNT_MODES = (AUTO, HAS_MORE)
+
+# Cache key prefix for filtered counts
+COUNT_PREFIX = 'count'
+
+
+def _count_documents(collection, query: Dict[str, Any], options: Dict[str, Any]) -> int:
+    with track_query(collection, COUNT, query):
+        return collection.count_documents(query, **options)
+
+
+def count_matching(
+    collection,
+    query: Dict[str, Any],
+    mode: str = AUTO,
+    namespace: Optional[str] = None,
+    max_time_ms: Optional[int] = None,
+) -> Tuple[Optional[int], str]:
+    """Count the documents matching a query with the cheapest strategy.
+
+    Args:
+        collection: MongoDB collection to count
+        query: Filter to count
+        mode: ``auto`` to count, ``has_more`` to skip counting
+        namespace: Data version namespace for cached counts; without one,
+            filtered counts are exact
+        max_time_ms: Server-side time limit for a filtered count
+
+    Returns:
+        tuple: (total or None, strategy used)
+    """
+    if mode == HAS_MORE:
+        return None, HAS_MORE
+
+    if not query:
+        return collection.estimated_document_count(), ESTIMATED
+
+    options = {'maxTimeMS': max_time_ms} if max_time_ms else {}
+    # The data version outlives Redis, so check Redis itself is there
+    version = (
+        get_data_version(namespace) if namespace and get_cache() is not None else None
+    )
+    if version is None:
+        return _count_documents(collection, query, options), EXACT
+
+    try:
+        key = cache_key(f"{COUNT_PREFIX}:{collection.name}:v{version}", query)
+    except TypeError as e:
+        logger.warning(f"Not caching count: {e}")
+        return _count_documents(collection, query, options), EXACT
+    key.prefix = COUNT_PREFIX
+
+    total = cache_get(key)
+    if total is None:
+        total = _count_documents(collection, query, options)
+        cache_set(key, total, settings.CACHE_VERSIONED_TTL)
+    return total, CACHED
@@ -0,0 +1,238 @@
+"""
+Persistent on-disk cache tier for BizFindr.
+
+A small SQLite key/value store in WAL mode that keeps expensive cached
+results across deploys and Redis restarts. The file is shared by all worker
+processes on a host; each process and thread opens its own connection.
+Entries expire like Redis keys, and the least recently used entries are
+evicted once the store grows past ``DISK_CACHE_MAX_BYTES``.
+
+Values are stored already encoded by :mod:`app.core.codecs`, so this module
+only deals in bytes.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only record a read if the entry was last touched longer ago than this, so
+# hot entries do not turn every read into a write
+_ACCESS_RESOLUTION = 60
+
+# Evict down to this fraction of the size limit to avoid evicting on every set
+_EVICT_TARGET = 0.9
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_last_access ON cache (last_access);
+"""
+
+
+class DiskCache:
+    """Size-bounded SQLite cache with per-entry expiry and LRU eviction.
+
+    Args:
+        path: Path of the SQLite database file
+        max_bytes: Maximum total size of stored values
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._size_lock = threading.Lock()
+        self._size: Optional[int] = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, reopening it after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a value.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Optional[bytes]: The stored value, or None if missing or expired
+        """
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT value, expires_at, last_access FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at, last_access = row
+        if expires_at <= now:
+            conn.execute(
+                'DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, now)
+            )
+            return None
+        if now - last_access > _ACCESS_RESOLUTION:
+            conn.execute('UPDATE cache SET last_access = ? WHERE key = ?', (now, key))
+        return value
+
+    def set(self, key: str, value: bytes, timeout: int) -> None:
+        """Store a value, evicting old entries if the store is full.
+
+        Args:
+            key: Cache key
+            value: Encoded value
+            timeout: Time to live in seconds
+        """
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO cache (key, value, size, expires_at, last_access) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (key, value, len(value), now + timeout, now),
+        )
+        with self._size_lock:
+            if self._size is not None:
+                self._size += len(value)
+        if self._current_size() > self.max_bytes:
+            self.evict()
+
+    def delete(self, *keys: str) -> None:
+        """Delete entries.
+
+        Args:
+            *keys: Cache keys to delete
+        """
+        if keys:
+            self._connection().executemany(
+                'DELETE FROM cache WHERE key = ?', [(k,) for k in keys]
+            )
+            self._reset_size()
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Delete all entries under a key prefix.
+
+        Args:
+            prefix: Cache key prefix
+
+        Returns:
+            int: Number of entries removed
+        """
+        namespace = f'{prefix}:'
+        removed = (
+            self._connection()
+            .execute(
+                'DELETE FROM cache WHERE key = ? OR substr(key, 1, ?) = ?',
+                (prefix, len(namespace), namespace),
+            )
+            .rowcount
+        )
+        self._reset_size()
+        return removed
+
+    def clear(self) -> None:
+        """Delete all entries."""
+        self._connection().execute('DELETE FROM cache')
+        self._reset_size()
+
+    def evict(self) -> int:
+        """Drop expired entries, then least recently used ones until under the limit.
+
+        Returns:
+            int: Number of entries removed
+        """
+        conn = self._connection()
+        removed = conn.execute(
+            'DELETE FROM cache WHERE expires_at <= ?', (time.time(),)
+        ).rowcount
+        size = self._reset_size()
+        target = int(self.max_bytes * _EVICT_TARGET)
+
+        while size > target:
+            rows = conn.execute(
+                'SELECT key, size FROM cache ORDER BY last_access LIMIT 100'
+            ).fetchall()
+            if not rows:
+                break
+            batch = []
+            for key, entry_size in rows:
+                batch.append((key,))
+                size -= entry_size
+                if size <= target:
+                    break
+            conn.executemany('DELETE FROM cache WHERE key = ?', batch)
+            removed += len(batch)
+
+        self._reset_size()
+        if removed:
+            logger.debug(f"Evicted {removed} disk cache entries")
+        return removed
+
+    def _current_size(self) -> int:
+        with self._size_lock:
+            if self._size is not None:
+                return self._size
+        return self._reset_size()
+
+    def _reset_size(self) -> int:
+        """Re-read the total size; other processes write to the same file."""
+        size = (
+            self._connection()
+            .execute('SELECT COALESCE(SUM(size), 0) FROM cache')
+            .fetchone()[0]
+        )
+        with self._size_lock:
+            self._size = size
+        return size
+
+
+_disk_cache: Optional[DiskCache] = None
+_disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """Get the process-wide disk cache.
+
+    Returns:
+        Optional[DiskCache]: The disk cache, or None if ``DISK_CACHE_PATH``
+            is not set or the database cannot be opened
+    """
+    global _disk_cache
+
+    if not settings.DISK_CACHE_PATH:
+        return None
+    if _disk_cache is None:
+        with _disk_cache_lock:
+            if _disk_cache is None:
+                try:
+                    _disk_cache = DiskCache(
+                        settings.DISK_CACHE_PATH, settings.DISK_CACHE_MAX_BYTES
+                    )
+                except (OSError, sqlite3.Error) as e:
+                    logger.error(
+                        f"Failed to open disk cache at {settings.DISK_CACHE_PATH}: {e}"
+                    )
+                    return None
+    return _disk_cache
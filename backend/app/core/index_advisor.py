@@ -0,0 +1,248 @@
+"""
+Index advisor.
+
+Compares the query shapes recorded by the query profiler (see
+:mod:`app.core.query_profiler`) with the indexes that exist on a
+collection, and suggests compound indexes for the shapes none of them
+serve. The indexes declared in :mod:`app.core.indexes` are a starting
+point; the advisor shows where real traffic differs.
+
+A suggested index follows the equality, sort, range rule: fields matched
+by equality first, then the sort fields in sort order, then fields with
+range predicates. Such an index answers the query with one bounded scan
+in sort order. ``$text`` queries are reported but not analysed, since they
+can only use the text index.
+
+Indexes that ``$indexStats`` reports as never used since the server
+started are flagged as candidates to drop; unique indexes are left out
+because they enforce a constraint.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Operators that select single values and can lead an index
+EQUALITY_OPERATORS = {'$eq', '$in'}
+
+IndexKey = List[Tuple[str, Any]]
+
+
+def _collect(filter_shape: Dict[str, Any], equality: set, ranges: set) -> None:
+    for field, value in filter_shape.items():
+        if field == '$and':
+            for clause in value:
+                _collect(clause, equality, ranges)
+        elif field in ('$or', '$nor'):
+            # Branches are scanned separately; treat their fields as ranges
+            for clause in value:
+                branch_equality, branch_ranges = set(), set()
+                _collect(clause, branch_equality, branch_ranges)
+                ranges.update(branch_equality | branch_ranges)
+        elif field.startswith('$'):
+            continue
+        elif (
+            isinstance(value, dict)
+            and value
+            and all(op.startswith('$') for op in value)
+        ):
+            (equality if set(value) <= EQUALITY_OPERATORS else ranges).add(field)
+        else:
+            equality.add(field)
+
+
+def recommend_index(shape: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Work out the compound index that best serves a query shape.
+
+    Args:
+        shape: Shape from :func:`app.core.query_profiler.query_shape`
+
+    Returns:
+        dict: ``keys`` (``(field, direction)`` pairs) and the number of
+            ``equality`` and ``sort`` fields at their start, or None for
+            ``$text`` queries and shapes without fields
+    """
+    if '$text' in shape['filter']:
+        return None
+
+    equality, ranges = set(), set()
+    _collect(shape['filter'], equality, ranges)
+
+    keys = [(field, 1) for field in sorted(equality)]
+    seen = set(equality)
+    sort_count = 0
+    for field, direction in shape['sort']:
+        if field not in seen:
+            keys.append((field, direction))
+            seen.add(field)
+            sort_count += 1
+    keys += [(field, 1) for field in sorted(ranges - seen)]
+
+    if not keys:
+        return None
+    return {'keys': keys, 'equality': len(equality), 'sort': sort_count}
+
+
+def index_serves(index_keys: IndexKey, wanted: Dict[str, Any]) -> bool:
+    """Check whether an index can serve the index recommended for a shape.
+
+    Equality fields may come in any order and any direction, the sort
+    fields must follow in order with all directions equal or all reversed,
+    and the range fields may follow in any order.
+
+    Args:
+        index_keys: Keys of an existing or suggested index
+        wanted: Recommendation from :func:`recommend_index`
+
+    Returns:
+        bool: True if the index serves the shape
+    """
+    keys = wanted['keys']
+    if len(index_keys) < len(keys) or any(
+        not isinstance(d, int) for _, d in index_keys[: len(keys)]
+    ):
+        return False
+
+    head = index_keys[: len(keys)]
+    eq, sort = wanted['equality'], wanted['sort']
+    if {field for field, _ in head[:eq]} != {field for field, _ in keys[:eq]}:
+        return False
+
+    index_sort, wanted_sort = head[eq : eq + sort], keys[eq : eq + sort]
+    if [field for field, _ in index_sort] != [field for field, _ in wanted_sort]:
+        return False
+    same = all(a == b for (_, a), (_, b) in zip(index_sort, wanted_sort))
+    reversed_ = all(a == -b for (_, a), (_, b) in zip(index_sort, wanted_sort))
+    if not (same or reversed_):
+        return False
+
+    return {field for field, _ in head[eq + sort :]} == {
+        field for field, _ in keys[eq + sort :]
+    }
+
+
+def unused_indexes(collection) -> Optional[List[Dict[str, Any]]]:
+    """List indexes with no recorded use, according to ``$indexStats``.
+
+    Usage counters restart with the server, so check ``since`` before
+    dropping anything.
+
+    Args:
+        collection: PyMongo collection
+
+    Returns:
+        list: ``name``, ``key`` and ``since`` of each unused, non-unique
+            index other than ``_id_``; None if ``$indexStats`` is unavailable
+    """
+    try:
+        stats = list(collection.aggregate([{'$indexStats': {}}]))
+    except (OperationFailure, NotImplementedError) as e:
+        logger.warning(f"$indexStats is unavailable: {e}")
+        return None
+
+    info = collection.index_information()
+    unused = []
+    for entry in stats:
+        name = entry['name']
+        if name == '_id_' or info.get(name, {}).get('unique'):
+            continue
+        accesses = entry.get('accesses', {})
+        if not accesses.get('ops'):
+            unused.append(
+                {
+                    'name': name,
+                    'key': list(entry['key'].items()),
+                    'since': accesses.get('since'),
+                }
+            )
+    return unused
+
+
+def advise(
+    collection, shape_stats: List[Dict[str, Any]], min_count: int = 1
+) -> Dict[str, Any]:
+    """Compare recorded query shapes with a collection's indexes.
+
+    Args:
+        collection: PyMongo collection
+        shape_stats: Entries from :func:`app.core.query_profiler.get_query_shape_stats`
+        min_count: Ignore shapes seen fewer times
+
+    Returns:
+        dict: ``suggested`` indexes (``keys`` and the ``shapes``,
+            ``count`` and ``total_ms`` they would serve), ``served`` (the
+            same per existing index), ``unused`` indexes (or None) and
+            ``skipped`` shapes that cannot be analysed
+    """
+    existing = {
+        name: list(info['key']) for name, info in collection.index_information().items()
+    }
+    candidates, skipped = [], []
+    for stat in shape_stats:
+        if stat['collection'] != collection.name or stat['count'] < min_count:
+            continue
+        wanted = recommend_index(stat['shape'])
+        if wanted is None:
+            skipped.append(stat)
+        else:
+            candidates.append((wanted, stat))
+
+    served, suggested = {}, []
+    # Longest first, so shorter shapes fold into an index that also serves them
+    for wanted, stat in sorted(
+        candidates, key=lambda item: len(item[0]['keys']), reverse=True
+    ):
+        name = next(
+            (name for name, keys in existing.items() if index_serves(keys, wanted)),
+            None,
+        )
+        if name is not None:
+            target = served.setdefault(
+                name,
+                {
+                    'name': name,
+                    'keys': existing[name],
+                    'shapes': [],
+                    'count': 0,
+                    'total_ms': 0.0,
+                },
+            )
+        else:
+            target = next(
+                (entry for entry in suggested if index_serves(entry['keys'], wanted)),
+                None,
+            )
+            if target is None:
+                target = {
+                    'keys': wanted['keys'],
+                    'shapes': [],
+                    'count': 0,
+                    'total_ms': 0.0,
+                }
+                suggested.append(target)
+        target['shapes'].append(stat['shape'])
+        target['count'] += stat['count']
+        target['total_ms'] += stat['total_ms']
+
+    by_time = lambda entry: entry['total_ms']  # noqa: E731
+    return {
+        'suggested': sorted(suggested, key=by_time, reverse=True),
+        'served': sorted(served.values(), key=by_time, reverse=True),
+        'unused': unused_indexes(collection),
+        'skipped': skipped,
+    }
+
+
+def create_suggested_indexes(collection, suggested: List[Dict[str, Any]]) -> List[str]:
+    """Create suggested indexes.
+
+    Args:
+        collection: PyMongo collection
+        suggested: ``suggested`` entries from :func:`advise`
+
+    Returns:
+        list: Names of the created indexes
+    """
+    return [collection.create_index(entry['keys']) for entry in suggested]
@@ -0,0 +1,301 @@
+"""
+Approximate rate limiting with local token buckets.
+
+Instead of a Redis round trip per request, each worker process leases a
+share of every key's budget from a shared Redis counter and spends it from
+memory. A background thread tops up leases that are running low every
+``RATE_LIMIT_SYNC_INTERVAL`` seconds, claiming tokens for all keys in one
+pipelined batch.
+
+Tokens are claimed before they are spent, so the global limit is never
+exceeded; the cost is that tokens leased by a worker that then goes quiet
+are lost until the window resets, so a client can be limited slightly
+early. A request only waits on Redis when its worker has no tokens left
+for the key and no refill has arrived yet; concurrent requests for that
+key wait on the same lease rather than starting their own. Once the budget is used up,
+rejections are answered from memory until the window resets.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+
+from app.core.circuit_breaker import allow_redis_request, redis_breaker
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: tokens claimed in the current window
+# ARGV: limit, period (ms), tokens wanted
+# Returns {tokens granted, tokens left after the grant, ms until the window resets}
+LEASE_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local used = tonumber(redis.call('GET', key) or '0')
+local grant = math.min(tonumber(ARGV[3]), limit - used)
+if grant > 0 then
+    used = redis.call('INCRBY', key, grant)
+    if used == grant then
+        redis.call('PEXPIRE', key, ARGV[2])
+    end
+else
+    grant = 0
+end
+local ttl = redis.call('PTTL', key)
+if ttl < 0 then
+    ttl = tonumber(ARGV[2])
+end
+return {grant, math.max(0, limit - used), ttl}
+"""
+
+
+class _Lease(threading.Event):
+    """A synchronous lease in flight; set once it has been applied."""
+
+    failed = False
+
+
+class _Bucket:
+    __slots__ = (
+        'limit',
+        'period',
+        'tokens',
+        'remaining',
+        'resets_at',
+        'exhausted',
+        'refilling',
+        'leasing',
+    )
+
+    def __init__(self, limit: int, period: int):
+        self.limit = limit
+        self.period = period
+        self.tokens = 0
+        self.remaining = limit
+        self.resets_at = 0.0
+        self.exhausted = False
+        self.refilling = False
+        # Set while a synchronous lease is in flight; other requests for the
+        # key wait on it instead of replacing the bucket
+        self.leasing: Optional[_Lease] = None
+
+    def apply_lease(
+        self, granted: int, remaining: int, ttl_ms: int, now: float
+    ) -> None:
+        self.tokens += granted
+        self.remaining = remaining
+        self.resets_at = now + ttl_ms / 1000
+        self.exhausted = granted == 0 and self.tokens == 0
+
+    def lease_size(self) -> int:
+        return max(1, math.ceil(self.limit * settings.RATE_LIMIT_LEASE_FRACTION))
+
+
+class LocalRateLimiter:
+    """Per-process token buckets backed by leases from a shared Redis counter.
+
+    Args:
+        redis_factory: Callable returning the Redis connection to lease from
+        sync_interval: Seconds between background lease refills
+    """
+
+    def __init__(self, redis_factory, sync_interval: float):
+        self.redis_factory = redis_factory
+        self.sync_interval = sync_interval
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._script = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _lease_key(self, key: str) -> str:
+        return f"{key}:lease"
+
+    def _run_lease(self, client, key: str, bucket: _Bucket, want: int):
+        if self._script is None:
+            self._script = self.redis_factory().register_script(LEASE_SCRIPT)
+        return self._script(
+            keys=[self._lease_key(key)],
+            args=[bucket.limit, bucket.period * 1000, want],
+            client=client,
+        )
+
+    def _ensure_sync_thread(self) -> None:
+        """Start the refill thread, again in each forked worker."""
+        if (
+            self._pid == os.getpid()
+            and self._thread is not None
+            and self._thread.is_alive()
+        ):
+            return
+        with self._lock:
+            if (
+                self._pid == os.getpid()
+                and self._thread is not None
+                and self._thread.is_alive()
+            ):
+                return
+            if self._pid != os.getpid():
+                self._buckets.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._sync_loop, name='rate-limit-sync', daemon=True
+            )
+            self._thread.start()
+
+    def check(self, key: str, limit: int, period: int) -> Tuple[bool, Dict[str, str]]:
+        """Spend one token for ``key``.
+
+        Args:
+            key: Rate limit key
+            limit: Maximum number of requests allowed in the period
+            period: Time period in seconds
+
+        Returns:
+            Tuple of (is_limited, headers); fails open when Redis is unavailable
+        """
+        self._ensure_sync_thread()
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None or (
+                    bucket.leasing is None
+                    and (
+                        bucket.limit != limit
+                        or bucket.period != period
+                        or now >= bucket.resets_at
+                    )
+                ):
+                    bucket = self._buckets[key] = _Bucket(limit, period)
+                if bucket.tokens > 0:
+                    return self._spend(bucket, now)
+                if bucket.exhausted:
+                    return True, self._headers(bucket, now, limited=True)
+                lease = bucket.leasing
+                if lease is None:
+                    bucket.leasing = _Lease()
+                    break
+            # Another request is leasing for this key; spend what it brings
+            # back, or fail open with it if Redis is unavailable
+            lease.wait()
+            if lease.failed:
+                return False, {}
+
+        result = None
+        try:
+            result = self._lease(key, bucket, now)
+        finally:
+            with self._lock:
+                lease, bucket.leasing = bucket.leasing, None
+            lease.failed = result is None
+            lease.set()
+        return result if result is not None else (False, {})
+
+    def _lease(
+        self, key: str, bucket: _Bucket, now: float
+    ) -> Optional[Tuple[bool, Dict[str, str]]]:
+        """Lease tokens synchronously for a bucket that has none.
+
+        Returns:
+            The result of the check, or None if Redis is unavailable
+        """
+        redis_conn = self.redis_factory()
+        if not allow_redis_request(redis_conn):
+            return None
+        try:
+            granted, remaining, ttl = (
+                int(v)
+                for v in self._run_lease(redis_conn, key, bucket, bucket.lease_size())
+            )
+            redis_breaker.record_success()
+        except RedisError as e:
+            redis_breaker.record_failure()
+            logger.error(f"Redis error leasing rate limit tokens: {e}")
+            return None
+
+        with self._lock:
+            bucket.apply_lease(granted, remaining, ttl, time.monotonic())
+            if bucket.tokens > 0:
+                return self._spend(bucket, now)
+            return True, self._headers(bucket, now, limited=True)
+
+    def _spend(self, bucket: _Bucket, now: float) -> Tuple[bool, Dict[str, str]]:
+        bucket.tokens -= 1
+        if bucket.tokens <= bucket.lease_size() // 2 and bucket.remaining > 0:
+            bucket.refilling = True
+        return False, self._headers(bucket, now, limited=False)
+
+    def _headers(self, bucket: _Bucket, now: float, limited: bool) -> Dict[str, str]:
+        reset_in = max(0.0, bucket.resets_at - now)
+        headers = {
+            'X-RateLimit-Limit': str(bucket.limit),
+            'X-RateLimit-Remaining': str(bucket.remaining + bucket.tokens),
+            'X-RateLimit-Reset': str(math.ceil(time.time() + reset_in)),
+        }
+        if limited:
+            headers['Retry-After'] = str(max(1, math.ceil(reset_in)))
+        return headers
+
+    def _sync_loop(self) -> None:
+        while True:
+            time.sleep(self.sync_interval)
+            try:
+                self.sync()
+            except Exception as e:  # keep the thread alive
+                logger.error(f"Rate limit sync failed: {e}")
+
+    def sync(self) -> int:
+        """Refill low buckets with one pipelined batch of leases.
+
+        Returns:
+            int: Number of buckets refilled
+        """
+        now = time.monotonic()
+        with self._lock:
+            # A bucket waiting on its first lease has no reset time yet
+            for key in [
+                k
+                for k, b in self._buckets.items()
+                if b.leasing is None and now >= b.resets_at
+            ]:
+                del self._buckets[key]
+            pending: List[Tuple[str, _Bucket]] = [
+                (key, bucket)
+                for key, bucket in self._buckets.items()
+                if bucket.refilling
+            ]
+            for _, bucket in pending:
+                bucket.refilling = False
+
+        if not pending:
+            return 0
+        redis_conn = self.redis_factory()
+        if not allow_redis_request(redis_conn):
+            return 0
+
+        try:
+            pipe = redis_conn.pipeline(transaction=False)
+            for key, bucket in pending:
+                self._run_lease(pipe, key, bucket, bucket.lease_size())
+            # A failing shard of a sharded client fails only its own leases
+            replies = pipe.execute(raise_on_error=False)
+            redis_breaker.record_success()
+        except RedisError as e:
+            redis_breaker.record_failure()
+            logger.error(f"Redis error refilling rate limit leases: {e}")
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            for (_, bucket), reply in zip(pending, replies):
+                if isinstance(reply, Exception):
+                    # Refilled on a later sync, once the bucket is spent again
+                    continue
+                granted, remaining, ttl = (int(v) for v in reply)
+                bucket.apply_lease(granted, remaining, ttl, now)
+        return len(pending)
@@ -0,0 +1,113 @@
+"""
+Prometheus metrics for BizFindr.
+
+``prometheus_client`` is optional. When it is not installed the metric
+objects are no-ops, so instrumented code does not need to check for it.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import prometheus_client
+except ImportError:  # pragma: no cover - depends on the environment
+    prometheus_client = None
+
+
+class _NoopMetric:
+    """Stand-in for a Prometheus metric when the client is not installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def dec(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+
+def _metric(kind: str, name: str, documentation: str, labelnames=(), **kwargs):
+    if prometheus_client is None:
+        return _NoopMetric()
+    return getattr(prometheus_client, kind)(name, documentation, labelnames, **kwargs)
+
+
+# Circuit breakers
+CIRCUIT_BREAKER_STATE = _metric(
+    'Gauge',
+    'bizfindr_circuit_breaker_state',
+    'Circuit breaker state (0 = closed, 1 = half-open, 2 = open)',
+    ['breaker'],
+)
+CIRCUIT_BREAKER_TRIPS = _metric(
+    'Counter',
+    'bizfindr_circuit_breaker_trips_total',
+    'Number of times a circuit breaker has opened',
+    ['breaker'],
+)
+CIRCUIT_BREAKER_REJECTED = _metric(
+    'Counter',
+    'bizfindr_circuit_breaker_rejected_total',
+    'Calls skipped because a circuit breaker was open',
+    ['breaker'],
+)
+
+
+# Cache
+CACHE_REQUESTS = _metric(
+    'Counter',
+    'bizfindr_cache_requests_total',
+    'Cache lookups by key prefix and result (hit, miss or error)',
+    ['prefix', 'result'],
+)
+CACHE_LATENCY = _metric(
+    'Histogram',
+    'bizfindr_cache_latency_seconds',
+    'Cache round-trip time by key prefix and operation',
+    ['prefix', 'operation'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5),
+)
+CACHE_VALUE_SIZE = _metric(
+    'Histogram',
+    'bizfindr_cache_value_size_bytes',
+    'Encoded size of cached values by key prefix',
+    ['prefix'],
+    buckets=(128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+
+# MongoDB queries (recorded when QUERY_PROFILING is enabled)
+QUERY_LATENCY = _metric(
+    'Histogram',
+    'bizfindr_query_latency_seconds',
+    'MongoDB query time by collection and operation',
+    ['collection', 'operation'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+def init_metrics(app) -> None:
+    """Expose a /metrics endpoint for Prometheus if the client is installed.
+
+    Args:
+        app: Flask application instance
+    """
+    if prometheus_client is None:
+        logger.info("prometheus_client not installed, /metrics disabled")
+        return
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus metrics endpoint."""
+        return (
+            prometheus_client.generate_latest(),
+            200,
+            {'Content-Type': prometheus_client.CONTENT_TYPE_LATEST},
+        )
@@ -0,0 +1,251 @@
+"""
+Keyset (cursor) pagination for BizFindr.
+
+Offset pagination (``skip``) makes MongoDB walk and discard every entry
+before the requested page, so deep pages get slower the further in they
+are. A cursor instead records the sort value and ``registration_id`` of
+the last (or first) row of a page, and the next page resumes from there
+with a range predicate on the ``(sort field, registration_id)`` index.
+
+Cursors are opaque, URL-safe tokens. They are tied to the sort field and
+order they were issued for and only carry scalar values, so a tampered
+token can move a client around the result set but never change the query.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.query_profiler import FIND, track_query
+
+# Tie-breaker that makes every sort order total
+TIEBREAK_FIELD = 'registration_id'
+
+# Cursor directions
+NEXT = 'next'
+PREV = 'prev'
+
+_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token is malformed or does not fit the query."""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    if not isinstance(value, _SCALAR_TYPES):
+        raise TypeError(
+            f"Cannot build a cursor from a {type(value).__name__} sort value"
+        )
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and set(value) == {'$date'}:
+        try:
+            return datetime.fromisoformat(value['$date'])
+        except (TypeError, ValueError):
+            raise InvalidCursor('Invalid cursor')
+    if not isinstance(value, _SCALAR_TYPES):
+        raise InvalidCursor('Invalid cursor')
+    return value
+
+
+def encode_cursor(
+    row: Dict[str, Any], sort_field: str, order: str, direction: str = NEXT
+) -> str:
+    """Build a cursor that resumes after (or before) a row.
+
+    Args:
+        row: The boundary row of the current page
+        sort_field: Field the results are sorted by
+        order: ``asc`` or ``desc``
+        direction: ``next`` to continue after the row, ``prev`` to go back before it
+
+    Returns:
+        str: An opaque, URL-safe cursor token
+    """
+    payload = {
+        'f': sort_field,
+        'o': order,
+        'd': direction,
+        'v': _encode_value(row.get(sort_field)),
+        'id': row.get(TIEBREAK_FIELD),
+    }
+    raw = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token: str, sort_field: str, order: str) -> Tuple[str, Any, str]:
+    """Decode a cursor token issued for the same sort.
+
+    Args:
+        token: Cursor token from a previous response
+        sort_field: Field the current request sorts by
+        order: ``asc`` or ``desc``
+
+    Returns:
+        tuple: (direction, sort value, registration_id)
+
+    Raises:
+        InvalidCursor: If the token is malformed or was issued for another sort
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(payload, dict) or payload.get('d') not in (NEXT, PREV):
+        raise InvalidCursor('Invalid cursor')
+    if payload.get('f') != sort_field or payload.get('o') != order:
+        raise InvalidCursor('Cursor does not match the requested sort order')
+    if not isinstance(payload.get('id'), str):
+        raise InvalidCursor('Invalid cursor')
+
+    return payload['d'], _decode_value(payload.get('v')), payload['id']
+
+
+def keyset_sort(
+    sort_field: str, order: str, direction: str = NEXT
+) -> List[Tuple[str, int]]:
+    """Sort specification for a page, reversed when paging backwards.
+
+    Args:
+        sort_field: Field the results are sorted by
+        order: ``asc`` or ``desc``
+        direction: ``next`` or ``prev``
+
+    Returns:
+        list: ``(field, direction)`` pairs for ``Cursor.sort``
+    """
+    ascending = (order == 'asc') == (direction == NEXT)
+    sort_order = 1 if ascending else -1
+    if sort_field == TIEBREAK_FIELD:
+        return [(sort_field, sort_order)]
+    return [(sort_field, sort_order), (TIEBREAK_FIELD, sort_order)]
+
+
+def keyset_filter(
+    sort_field: str, order: str, direction: str, value: Any, last_id: str
+) -> Dict[str, Any]:
+    """Range predicate selecting the rows after a cursor position.
+
+    MongoDB sorts missing and null values before everything else, so they
+    are matched separately from the typed range.
+
+    Args:
+        sort_field: Field the results are sorted by
+        order: ``asc`` or ``desc``
+        direction: ``next`` or ``prev``
+        value: Sort value of the boundary row
+        last_id: ``registration_id`` of the boundary row
+
+    Returns:
+        dict: A MongoDB filter to combine with the query
+    """
+    ascending = (order == 'asc') == (direction == NEXT)
+    op = '$gt' if ascending else '$lt'
+
+    if sort_field == TIEBREAK_FIELD:
+        return {TIEBREAK_FIELD: {op: last_id}}
+
+    if value is None:
+        same_value = {sort_field: None, TIEBREAK_FIELD: {op: last_id}}
+        if ascending:
+            return {'$or': [{sort_field: {'$ne': None}}, same_value]}
+        return same_value
+
+    clauses = [
+        {sort_field: {op: value}},
+        {sort_field: value, TIEBREAK_FIELD: {op: last_id}},
+    ]
+    if not ascending:
+        clauses.append({sort_field: None})
+    return {'$or': clauses}
+
+
+def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    order: str,
+    per_page: int,
+    page: int = 1,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+    max_skip: Optional[int] = None,
+    max_time_ms: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Fetch one page of a query, by cursor or by page number.
+
+    Page numbers use ``skip`` and are meant for the first few pages; a
+    cursor resumes from a previous page with an indexed range scan, so
+    every page costs the same.
+
+    Args:
+        collection: MongoDB collection to query
+        query: Filter for the results
+        sort_field: Field to sort by
+        order: ``asc`` or ``desc``
+        per_page: Items per page
+        page: Page number, starting at 1; ignored when ``cursor`` is given
+        cursor: Cursor token from a previous page
+        projection: Fields to return
+        max_skip: Largest offset allowed for page numbers
+        max_time_ms: Server-side time limit for the query
+
+    Returns:
+        dict: ``data`` (list of rows), ``has_more`` (bool, whether there is
+            a next page), ``next_cursor`` and ``prev_cursor`` (str or None)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed, was issued for another
+            sort, or the page is deeper than ``max_skip``
+    """
+    if projection is None:
+        projection = {'_id': 0}
+
+    direction = NEXT
+    criteria = query
+    skip = 0
+    if cursor:
+        direction, value, last_id = decode_cursor(cursor, sort_field, order)
+        boundary = keyset_filter(sort_field, order, direction, value, last_id)
+        criteria = {'$and': [query, boundary]} if query else boundary
+    else:
+        skip = (max(page, 1) - 1) * per_page
+        if max_skip is not None and skip > max_skip:
+            raise InvalidCursor('Page is too deep; use next_cursor to continue')
+
+    # One extra row tells whether there is anything beyond this page
+    sort = keyset_sort(sort_field, order, direction)
+    found = (
+        collection.find(criteria, projection).sort(sort).skip(skip).limit(per_page + 1)
+    )
+    if max_time_ms:
+        found = found.max_time_ms(max_time_ms)
+    with track_query(collection, FIND, criteria, sort, skip, per_page + 1):
+        rows = list(found)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == PREV:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, bool(cursor) or skip > 0
+
+    return {
+        'data': rows,
+        'has_more': has_next,
+        'next_cursor': encode_cursor(rows[-1], sort_field, order, NEXT)
+        if rows and has_next
+        else None,
+        'prev_cursor': encode_cursor(rows[0], sort_field, order, PREV)
+        if rows and has_prev
+        else None,
+    }
@@ -0,0 +1,242 @@
+"""
+Query compiler for search filters.
+
+Search parameters arrive as strings. Compared as strings they silently
+miss typed data (ingestion stores ``date_registration`` as a ``datetime``,
+so a bound like ``"2024-01-01T00:00:00"`` matches nothing) and, passed
+into a regex, they can match far more than intended or never finish.
+
+This module parses and validates every filter once and compiles it into
+predicates that an index can answer:
+
+- dates become ``datetime`` bounds, with the end date exclusive at the
+  following midnight
+- status and type become normalized equality matches
+- a name prefix becomes an anchored, escaped, case-sensitive regex, which
+  MongoDB runs as a range scan on the name index
+
+Each compiled query carries a ``maxTimeMS`` budget
+(``QUERY_MAX_TIME_MS``), so a pathological query is stopped by the server
+instead of holding a worker.
+"""
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.errors.handlers import ValidationError
+from app.schemas.business import BusinessCategory, BusinessStatus
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Longest accepted text query or name prefix
+MAX_TERM_LENGTH = 200
+
+
+class CompiledQuery:
+    """A validated MongoDB filter and the time budget to run it with."""
+
+    __slots__ = ('filter', 'max_time_ms')
+
+    def __init__(self, filter: Dict[str, Any], max_time_ms: Optional[int] = None):
+        self.filter = filter
+        self.max_time_ms = (
+            settings.QUERY_MAX_TIME_MS if max_time_ms is None else max_time_ms
+        )
+
+    def find(self, collection, projection: Optional[Dict[str, Any]] = None):
+        """Open a cursor for the query with its time budget applied.
+
+        Args:
+            collection: MongoDB (or Motor) collection to query
+            projection: Fields to return
+
+        Returns:
+            The cursor
+        """
+        cursor = collection.find(self.filter, projection)
+        if self.max_time_ms:
+            cursor = cursor.max_time_ms(self.max_time_ms)
+        return cursor
+
+    def __repr__(self):
+        return f'CompiledQuery({self.filter!r}, max_time_ms={self.max_time_ms})'
+
+
+def _term(name: str, value: Optional[str], errors: Dict[str, str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    if len(value) > MAX_TERM_LENGTH:
+        errors[name] = f'Must be at most {MAX_TERM_LENGTH} characters'
+        return None
+    return value or None
+
+
+def parse_date(
+    name: str, value: Optional[str], errors: Dict[str, str]
+) -> Optional[datetime]:
+    """Parse a ``YYYY-MM-DD`` filter value, recording an error if it is invalid.
+
+    Args:
+        name: Parameter name, used in the error
+        value: Date string, or None
+        errors: Errors collected so far, keyed by parameter
+
+    Returns:
+        datetime: Midnight of the date, or None if absent or invalid
+    """
+    value = _term(name, value, errors)
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        errors[name] = 'Must be a date in YYYY-MM-DD format'
+        return None
+
+
+def date_range(
+    date_from: Optional[datetime], date_to: Optional[datetime]
+) -> Optional[Dict[str, datetime]]:
+    """Build a range predicate covering whole days.
+
+    Args:
+        date_from: First day included
+        date_to: Last day included
+
+    Returns:
+        dict: ``$gte``/``$lt`` bounds, or None for no bounds
+    """
+    bounds = {}
+    if date_from is not None:
+        bounds['$gte'] = date_from
+    if date_to is not None:
+        # Exclusive at the next midnight, so times on the last day match
+        bounds['$lt'] = date_to + timedelta(days=1)
+    return bounds or None
+
+
+def prefix_match(prefix: str) -> Dict[str, str]:
+    """Build an index-friendly predicate matching values that start with a prefix.
+
+    Args:
+        prefix: Literal prefix; regex metacharacters are escaped
+
+    Returns:
+        dict: An anchored ``$regex`` predicate
+    """
+    return {'$regex': '^' + re.escape(prefix)}
+
+
+def normalize_status(status: str) -> str:
+    """Normalize a status the way ingestion stores it (``Active``)."""
+    return status.strip().capitalize()
+
+
+def compile_registration_query(
+    q: Optional[str] = None,
+    business_type: Optional[str] = None,
+    status: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    name: Optional[str] = None,
+    max_time_ms: Optional[int] = None,
+) -> CompiledQuery:
+    """Compile registration search parameters into a MongoDB query.
+
+    Args:
+        q: Full-text search query
+        business_type: Business type to match exactly
+        status: Registration status to match (case-insensitive)
+        date_from: Earliest registration date (YYYY-MM-DD)
+        date_to: Latest registration date (YYYY-MM-DD), inclusive
+        name: Business name prefix (case-sensitive)
+        max_time_ms: Time budget; defaults to ``QUERY_MAX_TIME_MS``, 0 for none
+
+    Returns:
+        CompiledQuery: The filter, empty when no parameters are given
+
+    Raises:
+        ValidationError: If any parameter is invalid; ``errors`` maps each
+            offending parameter to its problem
+    """
+    errors = {}
+    q = _term('q', q, errors)
+    business_type = _term('business_type', business_type, errors)
+    status = _term('status', status, errors)
+    name = _term('name', name, errors)
+    start = parse_date('date_from', date_from, errors)
+    end = parse_date('date_to', date_to, errors)
+    if start and end and start > end:
+        errors['date_to'] = 'Must not be before date_from'
+    if errors:
+        raise ValidationError('Invalid search parameters', errors)
+
+    query = {}
+    if q:
+        query['$text'] = {'$search': q}
+    if business_type:
+        query['business_type'] = business_type
+    if status:
+        query['status'] = normalize_status(status)
+    if name:
+        query['business_name'] = prefix_match(name)
+    dates = date_range(start, end)
+    if dates:
+        query['date_registration'] = dates
+
+    return CompiledQuery(query, max_time_ms)
+
+
+def compile_business_query(
+    q: Optional[str] = None,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    name: Optional[str] = None,
+    max_time_ms: Optional[int] = None,
+) -> CompiledQuery:
+    """Compile business search parameters into a MongoDB query.
+
+    Args:
+        q: Text to find in the name, DBA name, description or tags
+            (case-insensitive, matched literally)
+        status: Business status (a ``BusinessStatus`` value)
+        category: Business category (a ``BusinessCategory`` value)
+        name: Name prefix (case-sensitive)
+        max_time_ms: Time budget; defaults to ``QUERY_MAX_TIME_MS``, 0 for none
+
+    Returns:
+        CompiledQuery: The filter, empty when no parameters are given
+
+    Raises:
+        ValidationError: If any parameter is invalid
+    """
+    errors = {}
+    q = _term('q', q, errors)
+    name = _term('name', name, errors)
+    status = _term('status', status, errors)
+    category = _term('category', category, errors)
+    if status and status.lower() not in {s.value for s in BusinessStatus}:
+        choices = ', '.join(s.value for s in BusinessStatus)
+        errors['status'] = f"Must be one of: {choices}"
+    if category and category.lower() not in {c.value for c in BusinessCategory}:
+        choices = ', '.join(c.value for c in BusinessCategory)
+        errors['category'] = f"Must be one of: {choices}"
+    if errors:
+        raise ValidationError('Invalid search parameters', errors)
+
+    query = {}
+    if q:
+        pattern = {'$regex': re.escape(q), '$options': 'i'}
+        query['$or'] = [
+            {field: pattern} for field in ('name', 'dba', 'description', 'tags')
+        ]
+    if name:
+        query['name'] = prefix_match(name)
+    if status:
+        query['status'] = status.lower()
+    if category:
+        query['category'] = category.lower()
+
+    return CompiledQuery(query, max_time_ms)
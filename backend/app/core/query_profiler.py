@@ -0,0 +1,475 @@
+"""
+Query profiling and the slow query log.
+
+With ``QUERY_PROFILING`` enabled, registration and business queries run
+inside :func:`track_query`, which times them and records the duration per
+collection and operation (see :mod:`app.core.metrics`) and the count and
+total time per query shape in daily Redis sorted sets, which the index
+advisor (:mod:`app.core.index_advisor`) reads. A query slower
+than ``SLOW_QUERY_MS`` is written to the capped ``slow_queries``
+collection with its *shape*: the filter and sort with every value
+replaced by a placeholder, so the same search with different terms groups
+together.
+
+Slow entries get ``docs_examined``/``keys_examined`` and the winning plan
+from ``explain("executionStats")`` when ``SLOW_QUERY_EXPLAIN`` is set;
+otherwise an entry can be explained later through the admin API
+(:func:`explain_logged_query`). Explaining re-runs the query, so it is
+never done for fast queries.
+"""
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import redis
+from bson import ObjectId, json_util
+from flask import has_app_context
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from app.core.cache import get_cache
+from app.core.circuit_breaker import redis_breaker
+from app.core.config import settings
+from app.core.metrics import QUERY_LATENCY
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERIES = 'slow_queries'
+
+# Operations that can be tracked and explained
+FIND = 'find'
+COUNT = 'count'
+
+# Placeholder for values in a query shape
+PLACEHOLDER = '?'
+
+# Sorted sets of query counts and total milliseconds per shape, one per day
+QUERY_SHAPES_KEY = 'query_shapes:{metric}:{day}'
+QUERY_SHAPES_DAYS = 7
+
+_log_ready = set()
+
+
+def _sync(collection):
+    # Motor collections wrap a PyMongo collection; the log and explain use
+    # it. (Attribute access on a PyMongo collection returns a subcollection,
+    # so look for the instance attribute only.)
+    return getattr(collection, '__dict__', {}).get('delegate', collection)
+
+
+def _shape_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _shape_value(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = _shape_value(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return PLACEHOLDER
+
+
+def query_shape(query: Dict[str, Any], sort: Optional[List] = None) -> Dict[str, Any]:
+    """Reduce a query to its shape: fields, operators and sort, without values.
+
+    ``$in`` lists and ``$or``/``$and`` branches collapse to their distinct
+    shapes, so a query's shape does not depend on how many values it has.
+
+    Args:
+        query: MongoDB filter
+        sort: ``(field, direction)`` pairs
+
+    Returns:
+        dict: ``filter`` and ``sort`` with values replaced by ``?``
+    """
+    return {
+        'filter': _shape_value(query or {}),
+        'sort': [[field, direction] for field, direction in (sort or [])],
+    }
+
+
+def shape_key(shape: Dict[str, Any]) -> str:
+    """Canonical string for a query shape, used to group log entries."""
+    return json.dumps(shape, sort_keys=True, separators=(',', ':'))
+
+
+def _shape_keys(day: datetime) -> Dict[str, str]:
+    return {
+        metric: QUERY_SHAPES_KEY.format(metric=metric, day=day.strftime('%Y%m%d'))
+        for metric in ('count', 'ms')
+    }
+
+
+def record_query_shape(
+    collection_name: str, operation: str, shape: Dict[str, Any], duration_ms: float
+) -> None:
+    """Count a query and its duration in today's query shape sets.
+
+    Args:
+        collection_name: Collection the query ran on
+        operation: ``find`` or ``count``
+        shape: Shape from :func:`query_shape`
+        duration_ms: Time the query took
+    """
+    # Business queries also run outside Flask, without the app's cache
+    cache = get_cache() if has_app_context() else None
+    if cache is None:
+        return
+
+    keys = _shape_keys(datetime.utcnow())
+    member = json.dumps([collection_name, operation, shape_key(shape)])
+    try:
+        pipe = cache.pipeline(transaction=False)
+        pipe.zincrby(keys['count'], 1, member)
+        pipe.zincrby(keys['ms'], duration_ms, member)
+        for key in keys.values():
+            pipe.expire(key, QUERY_SHAPES_DAYS * 86400)
+        pipe.execute()
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error recording query shape: {e}")
+
+
+def get_query_shape_stats(days: int = 1) -> Optional[List[Dict[str, Any]]]:
+    """Get query counts and latencies per shape for the last few days.
+
+    Args:
+        days: Number of days to sum, including today
+
+    Returns:
+        list: Per shape: ``collection``, ``operation``, ``shape``,
+            ``count``, ``total_ms`` and ``avg_ms``, by total time; None if
+            the cache is unavailable
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+
+    today = datetime.utcnow()
+    try:
+        pipe = cache.pipeline(transaction=False)
+        for n in range(max(1, min(days, QUERY_SHAPES_DAYS))):
+            keys = _shape_keys(today - timedelta(days=n))
+            pipe.zrange(keys['count'], 0, -1, withscores=True)
+            pipe.zrange(keys['ms'], 0, -1, withscores=True)
+        results = pipe.execute()
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error reading query shapes: {e}")
+        return None
+
+    totals = {}
+    for index, members in enumerate(results):
+        metric = 'count' if index % 2 == 0 else 'total_ms'
+        for member, score in members:
+            entry = totals.setdefault(member, {'count': 0, 'total_ms': 0.0})
+            entry[metric] += score
+
+    stats = []
+    for member, entry in totals.items():
+        collection_name, operation, key = json.loads(member)
+        count = int(entry['count'])
+        stats.append(
+            {
+                'collection': collection_name,
+                'operation': operation,
+                'shape': json.loads(key),
+                'count': count,
+                'total_ms': round(entry['total_ms'], 2),
+                'avg_ms': round(entry['total_ms'] / count, 2) if count else None,
+            }
+        )
+    stats.sort(key=lambda entry: entry['total_ms'], reverse=True)
+    return stats
+
+
+def ensure_slow_query_log(db) -> None:
+    """Create the capped ``slow_queries`` collection if it does not exist.
+
+    Args:
+        db: PyMongo database
+    """
+    try:
+        db.create_collection(
+            SLOW_QUERIES,
+            capped=True,
+            size=settings.SLOW_QUERY_LOG_BYTES,
+            max=settings.SLOW_QUERY_LOG_MAX,
+        )
+        logger.info(f"Created capped collection: {SLOW_QUERIES}")
+    except CollectionInvalid:
+        pass
+
+
+def _explain_command(
+    collection,
+    operation: str,
+    query: Dict[str, Any],
+    sort=None,
+    skip: int = 0,
+    limit: int = 0,
+) -> Dict[str, Any]:
+    if operation == COUNT:
+        command = {'count': collection.name, 'query': query}
+    else:
+        command = {'find': collection.name, 'filter': query}
+        if sort:
+            command['sort'] = dict(sort)
+    if skip:
+        command['skip'] = skip
+    if limit:
+        command['limit'] = limit
+    return command
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = []
+    while plan:
+        stage = plan.get('stage', '?')
+        if plan.get('indexName'):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        inputs = plan.get('inputStages') or [plan.get('inputStage')]
+        plan = inputs[0] if inputs else None
+    return stages
+
+
+def explain(
+    collection,
+    operation: str,
+    query: Dict[str, Any],
+    sort=None,
+    skip: int = 0,
+    limit: int = 0,
+) -> Dict[str, Any]:
+    """Run ``explain("executionStats")`` for a query and summarize it.
+
+    Args:
+        collection: MongoDB (or Motor) collection
+        operation: ``find`` or ``count``
+        query: MongoDB filter
+        sort: ``(field, direction)`` pairs
+        skip: Rows skipped
+        limit: Row limit
+
+    Returns:
+        dict: ``docs_examined``, ``keys_examined``, ``returned``,
+            ``execution_ms`` and the winning ``plan`` as a list of stages
+    """
+    collection = _sync(collection)
+    command = _explain_command(collection, operation, query, sort, skip, limit)
+    result = collection.database.command('explain', command, verbosity='executionStats')
+    stats = result.get('executionStats', {})
+    winning = result.get('queryPlanner', {}).get('winningPlan', {})
+    return {
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'returned': stats.get('nReturned'),
+        'execution_ms': stats.get('executionTimeMillis'),
+        'plan': _plan_stages(winning.get('queryPlan', winning)),
+    }
+
+
+def log_slow_query(
+    collection,
+    operation: str,
+    query: Dict[str, Any],
+    duration_ms: float,
+    sort=None,
+    skip: int = 0,
+    limit: int = 0,
+    error: Optional[str] = None,
+) -> None:
+    """Write a slow query to the ``slow_queries`` log.
+
+    Failures are logged and swallowed; profiling never breaks a request.
+
+    Args:
+        collection: MongoDB (or Motor) collection the query ran on
+        operation: ``find`` or ``count``
+        query: MongoDB filter
+        duration_ms: Time the query took
+        sort: ``(field, direction)`` pairs
+        skip: Rows skipped
+        limit: Row limit
+        error: Error the query failed with, if any
+    """
+    collection = _sync(collection)
+    shape = query_shape(query, sort)
+    entry = {
+        'ts': datetime.utcnow(),
+        'collection': collection.name,
+        'operation': operation,
+        'shape': shape_key(shape),
+        # Filters use $-prefixed keys and typed values, so keep them as
+        # Extended JSON to re-run them for explain
+        'query': json_util.dumps(query),
+        'sort': shape['sort'],
+        'skip': skip,
+        'limit': limit,
+        'duration_ms': round(duration_ms, 2),
+    }
+    if error:
+        entry['error'] = error
+
+    try:
+        if settings.SLOW_QUERY_EXPLAIN and not error:
+            entry.update(explain(collection, operation, query, sort, skip, limit))
+        db = collection.database
+        if db.name not in _log_ready:
+            ensure_slow_query_log(db)
+            _log_ready.add(db.name)
+        db[SLOW_QUERIES].insert_one(entry)
+    except PyMongoError as e:
+        logger.warning(f"Could not log slow query: {e}")
+
+
+@contextmanager
+def track_query(
+    collection,
+    operation: str,
+    query: Dict[str, Any],
+    sort=None,
+    skip: int = 0,
+    limit: int = 0,
+):
+    """Time the query run inside the block and log it if it is slow.
+
+    Does nothing unless ``QUERY_PROFILING`` is enabled.
+
+    Args:
+        collection: MongoDB (or Motor) collection the query runs on
+        operation: ``find`` or ``count``
+        query: MongoDB filter
+        sort: ``(field, direction)`` pairs
+        skip: Rows skipped
+        limit: Row limit
+    """
+    if not settings.QUERY_PROFILING:
+        yield
+        return
+
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except PyMongoError as e:
+        error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        collection_name = _sync(collection).name
+        QUERY_LATENCY.labels(collection_name, operation).observe(duration_ms / 1000)
+        record_query_shape(
+            collection_name, operation, query_shape(query, sort), duration_ms
+        )
+        if duration_ms >= settings.SLOW_QUERY_MS:
+            log_slow_query(
+                collection,
+                operation,
+                query,
+                duration_ms,
+                sort=sort,
+                skip=skip,
+                limit=limit,
+                error=error,
+            )
+
+
+def worst_query_shapes(
+    db, top: int = 20, hours: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Summarize the slow query log per shape, by total time spent.
+
+    Args:
+        db: PyMongo database
+        top: Number of shapes to return
+        hours: Only include entries from the last ``hours`` hours
+
+    Returns:
+        list: Per shape: ``shape`` (filter and sort), ``collection``,
+            ``operation``, ``count``, ``total_ms``, ``avg_ms``, ``max_ms``,
+            the largest ``docs_examined``/``keys_examined`` seen,
+            ``last_seen`` and ``example_id``, an entry to explain
+    """
+    pipeline = []
+    if hours:
+        pipeline.append(
+            {'$match': {'ts': {'$gte': datetime.utcnow() - timedelta(hours=hours)}}}
+        )
+    pipeline += [
+        {'$sort': {'ts': 1}},
+        {
+            '$group': {
+                '_id': {
+                    'shape': '$shape',
+                    'collection': '$collection',
+                    'operation': '$operation',
+                },
+                'count': {'$sum': 1},
+                'total_ms': {'$sum': '$duration_ms'},
+                'avg_ms': {'$avg': '$duration_ms'},
+                'max_ms': {'$max': '$duration_ms'},
+                'docs_examined': {'$max': '$docs_examined'},
+                'keys_examined': {'$max': '$keys_examined'},
+                'last_seen': {'$last': '$ts'},
+                'example_id': {'$last': '$_id'},
+            }
+        },
+        {'$sort': {'total_ms': -1}},
+        {'$limit': max(0, top)},
+    ]
+    shapes = []
+    for row in db[SLOW_QUERIES].aggregate(pipeline):
+        group = row.pop('_id')
+        row.update(group)
+        row['shape'] = json.loads(group['shape'])
+        row['avg_ms'] = round(row['avg_ms'], 2)
+        row['total_ms'] = round(row['total_ms'], 2)
+        row['last_seen'] = row['last_seen'].isoformat()
+        row['example_id'] = str(row['example_id'])
+        shapes.append(row)
+    return shapes
+
+
+def explain_logged_query(db, entry_id: str) -> Optional[Dict[str, Any]]:
+    """Re-run ``explain("executionStats")`` for an entry of the slow query log.
+
+    Args:
+        db: PyMongo database
+        entry_id: ``_id`` of the log entry
+
+    Returns:
+        dict: The entry's shape, timing and explain summary, or None if
+            there is no such entry
+    """
+    if not ObjectId.is_valid(entry_id):
+        return None
+    entry = db[SLOW_QUERIES].find_one({'_id': ObjectId(entry_id)})
+    if entry is None:
+        return None
+
+    query = json_util.loads(entry['query'])
+    sort = [tuple(pair) for pair in entry.get('sort') or []]
+    summary = explain(
+        db[entry['collection']],
+        entry['operation'],
+        query,
+        sort,
+        entry.get('skip', 0),
+        entry.get('limit', 0),
+    )
+    return {
+        'id': entry_id,
+        'collection': entry['collection'],
+        'operation': entry['operation'],
+        'shape': json.loads(entry['shape']),
+        'duration_ms': entry['duration_ms'],
+        'ts': entry['ts'].isoformat(),
+        **summary,
+    }
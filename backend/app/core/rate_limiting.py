@@ -1,19 +1,121 @@
 """
 Rate limiting implementation using Redis for the BizFindr API.
+
+Each check is a single atomic Lua script (``EVALSHA``), so it costs one
+round trip and concurrent requests cannot race. Two algorithms are
+available, selected with ``RATE_LIMIT_ALGORITHM``:
+
+- ``sliding_window``: an exact sliding log in a sorted set, one member per
+  allowed request.
+- ``gcra``: the generic cell rate algorithm, equivalent to a token bucket
+  that allows bursts of ``limit`` requests, storing a single timestamp per
+  key.
+
+Both scripts read the clock from Redis, so app servers with skewed clocks
+share the same windows.
+
+With ``RATE_LIMIT_MODE=approximate``, non-strict limits are checked against
+local token buckets instead (see :mod:`app.core.local_rate_limiting`) and
+only touch Redis in periodic batches. Auth endpoints always use the strict
+path.
 """
+import hashlib
+import hmac
+import math
 import time
+import uuid
 import logging
-from typing import Optional, Callable, Any, Dict, Tuple
-from functools import wraps
+from datetime import datetime, timedelta
+from typing import Optional, Callable, Any, Dict, List, Tuple
 
-from flask import request, g, jsonify, current_app
+from flask import current_app, request, g, jsonify
 from redis.exceptions import RedisError
 
-from app.core.cache import get_redis_connection
+from app.core.cache import get_cache, get_redis_connection
+from app.core.circuit_breaker import allow_redis_request, redis_breaker
 from app.core.config import settings
+from app.core.local_rate_limiting import LocalRateLimiter
 
 logger = logging.getLogger(__name__)
 
+SLIDING_WINDOW = 'sliding_window'
+GCRA = 'gcra'
+
+STRICT = 'strict'
+APPROXIMATE = 'approximate'
+
+# KEYS[1]: sorted set of request timestamps
+# ARGV: limit, period (ms), unique member
+# Returns {allowed, remaining, reset (ms since epoch), retry after (ms)}
+SLIDING_WINDOW_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - period)
+local count = redis.call('ZCARD', key)
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', key, now, ARGV[3])
+    count = count + 1
+    allowed = 1
+end
+if count > 0 then
+    redis.call('PEXPIRE', key, period)
+end
+
+local reset = now + period
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + period
+end
+local retry_after = 0
+if allowed == 0 then
+    retry_after = reset - now
+end
+return {allowed, limit - count, reset, retry_after}
+"""
+
+# KEYS[1]: theoretical arrival time (ms since epoch)
+# KEYS[2] (optional): usage hash, incremented by cost under field ARGV[4]
+# ARGV: limit, period (ms), cost, usage field, usage TTL (s), '1' to charge
+#       even when over the limit
+# Returns {allowed, remaining, reset (ms since epoch), retry after (ms)}
+GCRA_SCRIPT = """
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local force = ARGV[6] == '1'
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local emission = period / limit
+local tat = tonumber(redis.call('GET', key)) or now
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + emission * cost
+local allow_at = new_tat - period
+if allow_at > now and not force then
+    return {0, 0, math.ceil(tat), math.ceil(allow_at - now)}
+end
+
+redis.call('SET', key, tostring(new_tat), 'PX', math.ceil(new_tat - now))
+if KEYS[2] then
+    redis.call('HINCRBY', KEYS[2], ARGV[4], cost)
+    redis.call('EXPIRE', KEYS[2], ARGV[5])
+end
+return {1, math.max(0, math.floor((now - allow_at) / emission)), math.ceil(new_tat), 0}
+"""
+
+# Scripts registered per source; EVALSHA falls back to loading them once
+_scripts: Dict[str, Any] = {}
+
+
 class RateLimitExceeded(Exception):
     """Exception raised when rate limit is exceeded."""
     def __init__(self, retry_after: int):
@@ -43,20 +145,35 @@ def get_rate_limit_key(identifier: str, endpoint: str) -> str:
     return f"rate_limit:{endpoint}:{identifier}"
 
 
+def _run_script(redis_conn, source: str, keys, args):
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = redis_conn.register_script(source)
+    return script(keys=keys, args=args, client=redis_conn)
+
+
 def is_rate_limited(
     key: str, 
     limit: int, 
     period: int,
-    redis_conn = None
-) -> Tuple[bool, Dict[str, int]]:
+    redis_conn = None,
+    algorithm: Optional[str] = None,
+    cost: int = 1
+) -> Tuple[bool, Dict[str, str]]:
     """
     Check if the request should be rate limited.
     
+    Allowed requests are counted against the limit; rejected requests are
+    not, so a client that keeps retrying is not locked out longer.
+    
     Args:
         key: Redis key for the rate limit
         limit: Maximum number of requests allowed in the period
         period: Time period in seconds
         redis_conn: Optional Redis connection
+        algorithm: ``sliding_window`` or ``gcra`` (default:
+            ``RATE_LIMIT_ALGORITHM``)
+        cost: Units this request consumes (``gcra`` only)
         
     Returns:
         Tuple of (is_limited, headers)
@@ -64,145 +181,386 @@ def is_rate_limited(
     if redis_conn is None:
         redis_conn = get_redis_connection()
     
-    current = int(time.time())
-    window_start = current - period
+    # Fail open without touching Redis while the breaker is open
+    if not allow_redis_request(redis_conn):
+        return False, {}
+    
+    algorithm = algorithm or settings.RATE_LIMIT_ALGORITHM
     
     try:
-        # Use a Redis pipeline for atomic operations
-        pipe = redis_conn.pipeline()
-        
-        # Remove old timestamps outside the current window
-        pipe.zremrangebyscore(key, 0, window_start)
-        
-        # Add current timestamp
-        pipe.zadd(key, {current: current})
-        
-        # Set expiry on the key
-        pipe.expire(key, period)
-        
-        # Get the count of requests in the current window
-        pipe.zcard(key)
-        
-        # Execute the pipeline
-        _, _, _, request_count = pipe.execute()
-        
-        # Check if limit is exceeded
-        remaining = max(0, limit - request_count)
-        reset_time = current + period
-        
-        headers = {
-            'X-RateLimit-Limit': str(limit),
-            'X-RateLimit-Remaining': str(remaining),
-            'X-RateLimit-Reset': str(reset_time)
-        }
-        
-        return request_count > limit, headers
-        
+        if algorithm == GCRA:
+            reply = _run_script(redis_conn, GCRA_SCRIPT, [key],
+                                [limit, period * 1000, cost])
+        else:
+            # Unique member per request so concurrent requests are all counted
+            reply = _run_script(redis_conn, SLIDING_WINDOW_SCRIPT, [key],
+                                [limit, period * 1000, uuid.uuid4().hex])
+        redis_breaker.record_success()
     except RedisError as e:
+        redis_breaker.record_failure()
         logger.error(f"Redis error in rate limiting: {e}")
         # Fail open - don't rate limit if Redis is down
         return False, {}
+    
+    allowed, remaining, reset_ms, retry_after_ms = (int(value) for value in reply)
+    headers = {
+        'X-RateLimit-Limit': str(limit),
+        'X-RateLimit-Remaining': str(max(0, remaining)),
+        'X-RateLimit-Reset': str(math.ceil(reset_ms / 1000))
+    }
+    if not allowed:
+        headers['Retry-After'] = str(max(1, math.ceil(retry_after_ms / 1000)))
+    
+    return not allowed, headers
+
+
+# Shared local buckets for approximate mode
+local_limiter = LocalRateLimiter(
+    get_redis_connection, settings.RATE_LIMIT_SYNC_INTERVAL
+)
+
+
+def check_rate_limit(
+    key: str,
+    limit: int,
+    period: int,
+    strict: bool = False
+) -> Tuple[bool, Dict[str, str]]:
+    """
+    Check a rate limit using the configured mode.
+    
+    Args:
+        key: Redis key for the rate limit
+        limit: Maximum number of requests allowed in the period
+        period: Time period in seconds
+        strict: Always check against Redis, even in approximate mode
+        
+    Returns:
+        Tuple of (is_limited, headers)
+    """
+    if not strict and settings.RATE_LIMIT_MODE == APPROXIMATE:
+        return local_limiter.check(key, limit, period)
+    return is_rate_limited(key, limit, period)
+
+
+class RateLimitPolicy:
+    """A rate limit applied to a class of routes.
+    
+    Args:
+        name: Policy name, used in error messages and logs
+        limit: Maximum number of requests allowed in the period
+        period: Time period in seconds
+        strict: Always check against Redis, even in approximate mode
+        key_func: Function returning the client identifier
+    """
+    
+    def __init__(self, name: str, limit: int, period: int, strict: bool = False,
+                 key_func: Callable[[], str] = get_remote_address):
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.strict = strict
+        self.key_func = key_func
+    
+    def __repr__(self) -> str:
+        return f"RateLimitPolicy({self.name!r}, {self.limit}/{self.period}s)"
+
+
+_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate_limit(value: str) -> Tuple[int, int]:
+    """Parse a limit such as ``"100 per day"`` or ``"200/hour"``.
+    
+    Args:
+        value: Rate limit string
+        
+    Returns:
+        Tuple of (limit, period in seconds)
+        
+    Raises:
+        ValueError: If the string is not a valid rate limit
+    """
+    normalized = value.strip().lower().replace('/', ' per ')
+    try:
+        count, unit = [part.strip() for part in normalized.split(' per ')]
+        return int(count), _PERIODS[unit.rstrip('s')]
+    except (KeyError, ValueError):
+        raise ValueError(f"Invalid rate limit: {value!r}")
+
+
+# Rate limit policies, the single place where limits are declared. Routes
+# pick a policy by endpoint name (see get_policy_for_endpoint); views can
+# override it with @rate_limited.
+RATE_LIMIT_POLICIES = {
+    # Auth limits guard against brute force, so never approximate them
+    'auth': RateLimitPolicy('auth', 10, 60, strict=True),
+    'search': RateLimitPolicy('search', 30, 60),
+    'api': RateLimitPolicy('api', 100, 60),
+    'public': RateLimitPolicy('public', 60, 60),
+}
+
+# Endpoints that are never rate limited
+EXEMPT_ENDPOINTS = {'static', 'health_check', 'metrics', 'api.v1_health_check'}
+
+
+def get_policy_for_endpoint(endpoint: str) -> RateLimitPolicy:
+    """Get the rate limit policy for an endpoint."""
+    if 'auth' in endpoint:
+        return RATE_LIMIT_POLICIES['auth']
+    elif 'search' in endpoint:
+        return RATE_LIMIT_POLICIES['search']
+    elif 'api' in endpoint:
+        return RATE_LIMIT_POLICIES['api']
+    return RATE_LIMIT_POLICIES['public']
 
 
 def rate_limited(
     limit: int = 60,
     period: int = 60,
     key_func: Callable[[], str] = get_remote_address,
-    error_message: Optional[str] = None
+    error_message: Optional[str] = None,
+    strict: bool = False
 ):
     """
-    Decorator for rate limiting endpoints.
+    Decorator overriding the rate limit policy of a view function.
+    
+    The limit is enforced by the hook installed by
+    :func:`init_rate_limiting`, so a request is still checked only once.
     
     Args:
         limit: Maximum number of requests allowed in the period
         period: Time period in seconds
         key_func: Function to get the rate limit key
         error_message: Custom error message when rate limit is exceeded
+        strict: Check every request against Redis, even in approximate mode
     """
     def decorator(f):
-        @wraps(f)
-        def wrapped(*args, **kwargs):
-            # Skip rate limiting in development
-            if current_app.config.get('TESTING') or current_app.config.get('DEBUG'):
-                return f(*args, **kwargs)
-                
-            # Get rate limit key
-            identifier = key_func()
-            endpoint = f"{request.endpoint}.{request.method.lower()}"
-            redis_key = get_rate_limit_key(identifier, endpoint)
-            
-            # Check rate limit
-            is_limited, headers = is_rate_limited(
-                key=redis_key,
-                limit=limit,
-                period=period
-            )
-            
-            # Set headers on response
-            g.headers = headers
-            
-            if is_limited:
-                retry_after = int(headers.get('X-RateLimit-Reset', 0) - time.time())
-                response = jsonify({
-                    'error': error_message or 'Rate limit exceeded',
-                    'retry_after': retry_after
-                })
-                response.status_code = 429
-                response.headers['Retry-After'] = str(retry_after)
-                return response
-                
-            return f(*args, **kwargs)
-        return wrapped
+        f._rate_limit_policy = RateLimitPolicy(
+            f.__name__, limit, period, strict=strict, key_func=key_func
+        )
+        f._rate_limit_message = error_message
+        return f
     return decorator
 
 
-def init_rate_limiting(app):
-    """Initialize rate limiting for the Flask app."""
-    @app.after_request
-    def inject_rate_limit_headers(response):
-        # Add rate limit headers to the response
-        if hasattr(g, 'headers'):
-            for header, value in g.headers.items():
-                response.headers[header] = value
-        return response
+# Quota units charged per request to API key holders; other endpoints cost 1.
+# Searches run $text queries and count_documents over the collection; a
+# batch lookup replaces up to BATCH_LOOKUP_MAX_IDS single lookups and an
+# export streams a whole result set.
+ENDPOINT_COSTS = {
+    'api.v1_registration': 1,
+    'api.v1_registration_batch': 10,
+    'api.v1_latest_registration_date': 1,
+    'api.v1_registration_list': 2,
+    'api.v1_registration_search': 10,
+    'api.v1_registration_export': 50,
+}
 
+# GCRA state and daily usage per API key; the hash tag keeps both on one shard
+QUOTA_KEY = 'quota:{{{key_id}}}'
+QUOTA_USAGE_KEY = 'quota_usage:{{{key_id}}}'
 
-# Default rate limits for different endpoints
-DEFAULT_RATE_LIMITS = {
-    'auth': (10, 60),  # 10 requests per minute for auth endpoints
-    'api': (100, 60),  # 100 requests per minute for API endpoints
-    'search': (30, 60),  # 30 requests per minute for search
-    'public': (60, 60),  # 60 requests per minute for public endpoints
-}
 
+def api_key_id(api_key: str) -> str:
+    """Return the identifier quotas are stored under, so keys never reach Redis."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
 
-def get_rate_limit_for_endpoint(endpoint: str) -> Tuple[int, int]:
-    """Get the rate limit for an endpoint."""
-    if 'auth' in endpoint:
-        return DEFAULT_RATE_LIMITS['auth']
-    elif 'search' in endpoint:
-        return DEFAULT_RATE_LIMITS['search']
-    elif 'api' in endpoint:
-        return DEFAULT_RATE_LIMITS['api']
-    return DEFAULT_RATE_LIMITS['public']
+
+def get_request_api_key_id() -> Optional[str]:
+    """Return the quota identifier for a valid ``X-API-Key``, or None."""
+    api_key = request.headers.get('X-API-Key')
+    expected = current_app.config.get('API_KEY')
+    if not api_key or not expected:
+        return None
+    if not hmac.compare_digest(api_key.encode('utf-8'), expected.encode('utf-8')):
+        return None
+    return api_key_id(api_key)
 
 
-def apply_rate_limits(app):
-    """Apply rate limits to all routes."""
-    for rule in app.url_map.iter_rules():
-        endpoint = rule.endpoint
-        limit, period = get_rate_limit_for_endpoint(endpoint)
+def charge_quota(
+    key_id: str,
+    cost: int,
+    force: bool = False,
+    redis_conn = None
+) -> Tuple[bool, Dict[str, str]]:
+    """
+    Charge an API key's quota and record the usage.
+    
+    Args:
+        key_id: Identifier from :func:`api_key_id`
+        cost: Quota units to charge
+        force: Charge even if the quota is exhausted (for costs measured
+            after the request ran)
+        redis_conn: Optional Redis connection
         
-        # Skip if already decorated
-        if hasattr(app.view_functions[endpoint], '_rate_limited'):
-            continue
-            
-        # Apply rate limit decorator
-        app.view_functions[endpoint] = rate_limited(
-            limit=limit,
-            period=period,
-            error_message=f"Too many requests. Limit is {limit} per {period} seconds."
-        )(app.view_functions[endpoint])
+    Returns:
+        Tuple of (is_limited, headers)
+    """
+    if redis_conn is None:
+        redis_conn = get_redis_connection()
+    
+    if not allow_redis_request(redis_conn):
+        return False, {}
+    
+    limit, period = parse_rate_limit(settings.API_KEY_QUOTA)
+    day = datetime.utcnow().strftime('%Y%m%d')
+    try:
+        reply = _run_script(
+            redis_conn, GCRA_SCRIPT,
+            [QUOTA_KEY.format(key_id=key_id), QUOTA_USAGE_KEY.format(key_id=key_id)],
+            [limit, period * 1000, cost, day, settings.API_QUOTA_USAGE_DAYS * 86400,
+             '1' if force else '0']
+        )
+        redis_breaker.record_success()
+    except RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Redis error charging quota: {e}")
+        return False, {}
+    
+    allowed, remaining, reset_ms, retry_after_ms = (int(value) for value in reply)
+    headers = {
+        'X-RateLimit-Limit': str(limit),
+        'X-RateLimit-Remaining': str(max(0, remaining)),
+        'X-RateLimit-Reset': str(math.ceil(reset_ms / 1000)),
+        'X-RateLimit-Cost': str(cost)
+    }
+    if not allowed:
+        headers['Retry-After'] = str(max(1, math.ceil(retry_after_ms / 1000)))
+    
+    return not allowed, headers
+
+
+def get_quota_usage(
+    key_id: Optional[str] = None, days: int = 1, top: int = 20
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Get quota units used per API key over the last ``days`` days.
+    
+    Args:
+        key_id: Only report this key
+        days: Number of days to sum, including today
+        top: Maximum number of keys to return
         
-        # Mark as decorated
-        app.view_functions[endpoint]._rate_limited = True
+    Returns:
+        List of ``{'key_id', 'units', 'by_day'}`` dicts, heaviest first, or
+        None if Redis is unavailable
+    """
+    cache = get_cache()
+    if cache is None:
+        return None
+    
+    today = datetime.utcnow()
+    fields = [(today - timedelta(days=n)).strftime('%Y%m%d') for n in range(days)]
+    try:
+        if key_id:
+            keys = [QUOTA_USAGE_KEY.format(key_id=key_id).encode('utf-8')]
+        else:
+            keys = list(cache.scan_iter(match='quota_usage:*', count=500))
+        pipe = cache.pipeline(transaction=False)
+        for key in keys:
+            pipe.hmget(key, fields)
+        replies = pipe.execute()
+        redis_breaker.record_success()
+    except RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error reading quota usage: {e}")
+        return None
+    
+    usage = []
+    for key, values in zip(keys, replies):
+        by_day = {day: int(value) for day, value in zip(fields, values)
+                  if value is not None}
+        if by_day:
+            usage.append({
+                'key_id': key.decode('utf-8').split('{', 1)[1].rstrip('}'),
+                'units': sum(by_day.values()),
+                'by_day': by_day,
+            })
+    return sorted(usage, key=lambda u: u['units'], reverse=True)[:top]
+
+
+def init_rate_limiting(app):
+    """Initialize rate limiting for the Flask app.
+    
+    Installs a single ``before_request`` hook that makes one limiter call
+    per request: requests with a valid API key are charged against that
+    key's quota by endpoint cost (``ENDPOINT_COSTS``), others are checked
+    against the policy of the requested endpoint (memoized per endpoint).
+    An ``after_request`` hook adds the rate limit headers and, when
+    ``API_QUOTA_MS_PER_UNIT`` is set, charges slow requests extra units for
+    the time they took.
+    """
+    policies: Dict[str, Optional[RateLimitPolicy]] = {}
+    
+    def resolve_policy(endpoint: str) -> Optional[RateLimitPolicy]:
+        if endpoint not in policies:
+            view = app.view_functions.get(endpoint)
+            if endpoint in EXEMPT_ENDPOINTS or view is None:
+                policies[endpoint] = None
+            else:
+                policies[endpoint] = getattr(view, '_rate_limit_policy', None) \
+                    or get_policy_for_endpoint(endpoint)
+        return policies[endpoint]
+    
+    @app.before_request
+    def enforce_rate_limit():
+        # Skip rate limiting in development
+        if app.config.get('TESTING') or app.config.get('DEBUG'):
+            return None
+        
+        if request.endpoint is None or request.method == 'OPTIONS':
+            return None
+        policy = resolve_policy(request.endpoint)
+        if policy is None:
+            return None
+        
+        key_id = get_request_api_key_id()
+        if key_id is not None:
+            cost = ENDPOINT_COSTS.get(request.endpoint, 1)
+            is_limited, headers = charge_quota(key_id, cost)
+            g.quota = (key_id, time.monotonic())
+        else:
+            endpoint = f"{request.endpoint}.{request.method.lower()}"
+            is_limited, headers = check_rate_limit(
+                key=get_rate_limit_key(policy.key_func(), endpoint),
+                limit=policy.limit,
+                period=policy.period,
+                strict=policy.strict
+            )
+        
+        # Set headers on response
+        g.headers = headers
+        
+        if is_limited:
+            retry_after = int(headers.get('Retry-After', policy.period))
+            view = app.view_functions[request.endpoint]
+            message = getattr(view, '_rate_limit_message', None)
+            if key_id is not None:
+                message = f"API key quota of {settings.API_KEY_QUOTA} units exceeded."
+            response = jsonify({
+                'error': message or (f"Too many requests. Limit is {policy.limit} "
+                                     f"per {policy.period} seconds."),
+                'retry_after': retry_after
+            })
+            response.status_code = 429
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+        return None
+    
+    @app.after_request
+    def inject_rate_limit_headers(response):
+        # Charge API keys extra for slow requests
+        quota = g.pop('quota', None)
+        ms_per_unit = settings.API_QUOTA_MS_PER_UNIT
+        if quota is not None and ms_per_unit > 0 and response.status_code < 400:
+            key_id, started = quota
+            extra = int((time.monotonic() - started) * 1000 // ms_per_unit)
+            if extra > 0:
+                charge_quota(key_id, extra, force=True)
+        
+        # Add rate limit headers to the response
+        if hasattr(g, 'headers'):
+            for header, value in g.headers.items():
+                response.headers[header] = value
+        return response
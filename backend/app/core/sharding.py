@@ -0,0 +1,421 @@
+"""
+Client-side sharding of the cache over several Redis nodes.
+
+Keys are placed on nodes with a consistent hash ring. Each node owns many
+virtual points on the ring, so load is spread evenly and adding or removing
+a node only moves the keys in the arcs that node gains or loses (about
+``1/N`` of the keyspace) instead of reshuffling everything.
+
+:class:`ShardedRedis` exposes the subset of the ``redis.Redis`` API the
+cache uses. Commands are routed by their first key; multi-key commands
+(``MGET``, ``DELETE``/``UNLINK``) and pipelines are split into one round
+trip per shard and the replies are put back in order. Lua scripts run on
+the shard that owns their keys, so all keys of one script call must hash
+to the same node; as in Redis Cluster, a ``{hash tag}`` in a key makes only
+the tagged part count, e.g. ``quota:{abc}`` and ``quota_usage:{abc}``.
+
+Each node has its own circuit breaker, so a failing node is bypassed
+without affecting the others: commands for its keys raise
+:class:`ShardUnavailable` without a network round trip while its breaker
+is open, and ``MGET`` returns its keys as misses.
+"""
+import bisect
+import hashlib
+import itertools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import redis
+from redis.commands.core import Script
+
+from app.core.circuit_breaker import CircuitBreaker
+from app.core.config import settings
+
+# Virtual points per node on the hash ring
+DEFAULT_REPLICAS = 160
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big'
+    )
+
+
+def _key_str(key: Any) -> str:
+    if isinstance(key, bytes):
+        key = key.decode('utf-8', 'surrogateescape')
+    else:
+        key = str(key)
+    start = key.find('{')
+    if start != -1:
+        end = key.find('}', start + 1)
+        if end > start + 1:
+            return key[start + 1 : end]
+    return key
+
+
+class HashRing:
+    """Consistent hash ring with virtual nodes.
+
+    Args:
+        nodes: Initial node names
+        replicas: Virtual points per node
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: str) -> None:
+        """Add a node and its virtual points to the ring."""
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove_node(self, node: str) -> None:
+        """Remove a node; its keys move to the next points on the ring."""
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def get_node(self, key: Any) -> str:
+        """Return the node that owns a key.
+
+        Raises:
+            LookupError: If the ring has no nodes
+        """
+        if not self._points:
+            raise LookupError("Hash ring has no nodes")
+        index = bisect.bisect(self._points, _hash(_key_str(key))) % len(self._points)
+        return self._owners[index]
+
+
+class ShardUnavailable(redis.ConnectionError):
+    """Raised instead of contacting a node whose circuit breaker is open."""
+
+
+class ShardedRedis:
+    """Redis client that shards keys over several nodes.
+
+    Args:
+        clients: Redis clients keyed by a stable node name
+        replicas: Virtual points per node on the hash ring
+    """
+
+    def __init__(
+        self, clients: Dict[str, redis.Redis], replicas: int = DEFAULT_REPLICAS
+    ):
+        if not clients:
+            raise ValueError("ShardedRedis needs at least one node")
+        self.clients = dict(clients)
+        self.ring = HashRing(self.clients, replicas=replicas)
+        self.breakers = {
+            node: CircuitBreaker(
+                f'redis:{node}',
+                failure_threshold=settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.REDIS_BREAKER_RESET_TIMEOUT,
+            )
+            for node in self.clients
+        }
+        self._scripts: Dict[str, bytes] = {}
+
+    @classmethod
+    def from_urls(
+        cls, urls: Sequence[str], replicas: int = DEFAULT_REPLICAS, **pool_kwargs
+    ) -> 'ShardedRedis':
+        """Create a client with one connection pool per node URL.
+
+        Nodes are named ``host:port/db``, so credentials can change
+        without moving keys.
+
+        Args:
+            urls: Redis URLs, one per node
+            replicas: Virtual points per node on the hash ring
+            **pool_kwargs: Options for each ``ConnectionPool``
+        """
+        clients = {}
+        for url in urls:
+            pool = redis.ConnectionPool.from_url(url, **pool_kwargs)
+            kwargs = pool.connection_kwargs
+            host = kwargs.get('host', kwargs.get('path', 'localhost'))
+            name = f"{host}:{kwargs.get('port', 6379)}/{kwargs.get('db', 0)}"
+            clients[name] = redis.Redis(connection_pool=pool)
+        return cls(clients, replicas=replicas)
+
+    def get_client(self, key: Any) -> redis.Redis:
+        """Return the client of the node that owns ``key``."""
+        return self.clients[self.ring.get_node(key)]
+
+    def _call(self, node: str, func: Callable, *args, **kwargs) -> Any:
+        """Run a call against one node through its circuit breaker.
+
+        Raises:
+            ShardUnavailable: If the node's breaker is open
+        """
+        breaker = self.breakers[node]
+        if not breaker.allow_request():
+            raise ShardUnavailable(f"Redis node {node} is unavailable")
+        try:
+            result = func(*args, **kwargs)
+        except (redis.ConnectionError, redis.TimeoutError):
+            breaker.record_failure()
+            raise
+        except redis.RedisError:
+            # The node answered, with an error reply
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
+
+    def _each_node(self, name: str, *args, **kwargs) -> List[Any]:
+        return [
+            self._call(node, getattr(client, name), *args, **kwargs)
+            for node, client in self.clients.items()
+        ]
+
+    def _group(self, keys: Iterable[Any]) -> 'OrderedDict[str, List[Tuple[int, Any]]]':
+        groups: 'OrderedDict[str, List[Tuple[int, Any]]]' = OrderedDict()
+        for index, key in enumerate(keys):
+            groups.setdefault(self.ring.get_node(key), []).append((index, key))
+        return groups
+
+    def __getattr__(self, name: str) -> Callable:
+        """Route any other single-key command by its first argument."""
+        if name.startswith('_') or not hasattr(redis.Redis, name):
+            raise AttributeError(name)
+
+        def command(key, *args, **kwargs):
+            node = self.ring.get_node(key)
+            return self._call(
+                node, getattr(self.clients[node], name), key, *args, **kwargs
+            )
+
+        command.__name__ = name
+        return command
+
+    # Multi-key commands
+
+    def mget(self, keys, *args) -> List[Optional[bytes]]:
+        """MGET split into one round trip per shard, in key order.
+
+        Keys on an unreachable node are returned as misses.
+        """
+        keys = list(keys) + list(args)
+        values: List[Optional[bytes]] = [None] * len(keys)
+        for node, items in self._group(keys).items():
+            try:
+                replies = self._call(
+                    node, self.clients[node].mget, [key for _, key in items]
+                )
+            except (redis.ConnectionError, redis.TimeoutError):
+                continue
+            for (index, _), value in zip(items, replies):
+                values[index] = value
+        return values
+
+    def _sum_over_shards(self, command: str, keys: Sequence[Any]) -> int:
+        """Run a multi-key command on every shard, then raise the first node error."""
+        total = 0
+        error = None
+        for node, items in self._group(keys).items():
+            try:
+                total += self._call(
+                    node,
+                    getattr(self.clients[node], command),
+                    *[key for _, key in items],
+                )
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return total
+
+    def delete(self, *keys) -> int:
+        return self._sum_over_shards('delete', keys)
+
+    def unlink(self, *keys) -> int:
+        return self._sum_over_shards('unlink', keys)
+
+    def exists(self, *keys) -> int:
+        return self._sum_over_shards('exists', keys)
+
+    # Node-wide commands
+
+    def ping(self) -> bool:
+        return all(self._each_node('ping'))
+
+    def flushdb(self, *args, **kwargs) -> bool:
+        return all(self._each_node('flushdb', *args, **kwargs))
+
+    def dbsize(self) -> int:
+        return sum(self._each_node('dbsize'))
+
+    def keys(self, pattern='*') -> List[bytes]:
+        return list(itertools.chain.from_iterable(self._each_node('keys', pattern)))
+
+    def scan_iter(self, match=None, count=None, _type=None, **kwargs):
+        for node, client in self.clients.items():
+            # Each SCAN batch goes through the node's breaker
+            cursor = 0
+            while True:
+                cursor, keys = self._call(
+                    node,
+                    client.scan,
+                    cursor=cursor,
+                    match=match,
+                    count=count,
+                    _type=_type,
+                    **kwargs,
+                )
+                yield from keys
+                if cursor == 0:
+                    break
+
+    # Scripting
+
+    def get_encoder(self):
+        return next(iter(self.clients.values())).get_encoder()
+
+    def register_script(self, script) -> Script:
+        """Register a Lua script; it runs on the shard that owns its keys."""
+        registered = Script(self, script)
+        self._scripts[registered.sha] = registered.script
+        return registered
+
+    def script_load(self, script) -> str:
+        """Load a script on every node and return its SHA1."""
+        sha = None
+        for client in self.clients.values():
+            sha = client.script_load(script)
+        self._scripts[sha] = script
+        return sha
+
+    def _script_node(self, numkeys: int, keys_and_args: Sequence[Any]) -> str:
+        keys = keys_and_args[:numkeys]
+        if not keys:
+            raise redis.RedisError("Sharded scripts need at least one key to route on")
+        nodes = {self.ring.get_node(key) for key in keys}
+        if len(nodes) > 1:
+            raise redis.RedisError(
+                "Keys of a sharded script call must map to the same node"
+            )
+        return nodes.pop()
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        node = self._script_node(numkeys, keys_and_args)
+        return self._call(
+            node, self.clients[node].evalsha, sha, numkeys, *keys_and_args
+        )
+
+    def eval(self, script, numkeys, *keys_and_args):
+        node = self._script_node(numkeys, keys_and_args)
+        return self._call(
+            node, self.clients[node].eval, script, numkeys, *keys_and_args
+        )
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> 'ShardedPipeline':
+        """Create a pipeline that runs one per-shard pipeline per node.
+
+        With ``transaction``, each shard's commands run in a MULTI/EXEC
+        block; there is no atomicity across shards.
+        """
+        return ShardedPipeline(self, transaction)
+
+
+class ShardedPipeline:
+    """Buffers commands and executes them with one pipeline per shard."""
+
+    def __init__(self, sharded: ShardedRedis, transaction: bool = False):
+        self.sharded = sharded
+        self.transaction = transaction
+        self._commands: List[Tuple[str, str, tuple, dict]] = []
+
+    def __enter__(self) -> 'ShardedPipeline':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._commands)
+
+    def reset(self) -> None:
+        self._commands = []
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith('_') or not hasattr(redis.Redis, name):
+            raise AttributeError(name)
+
+        def command(key, *args, **kwargs):
+            self._commands.append(
+                (self.sharded.ring.get_node(key), name, (key,) + args, kwargs)
+            )
+            return self
+
+        command.__name__ = name
+        return command
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        node = self.sharded._script_node(numkeys, keys_and_args)
+        self._commands.append((node, 'evalsha', (sha, numkeys) + keys_and_args, {}))
+        return self
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        """Run the buffered commands and return the replies in order.
+
+        Every reachable shard runs its commands even if another node fails;
+        the node error is then raised, or with ``raise_on_error=False``
+        returned as the reply of each of that node's commands.
+        """
+        commands, self._commands = self._commands, []
+        results: List[Any] = [None] * len(commands)
+
+        groups: 'OrderedDict[str, List[int]]' = OrderedDict()
+        for index, (node, _, _, _) in enumerate(commands):
+            groups.setdefault(node, []).append(index)
+
+        error = None
+        for node, indexes in groups.items():
+            try:
+                replies = self.sharded._call(
+                    node,
+                    self._execute_shard,
+                    node,
+                    [commands[i] for i in indexes],
+                    raise_on_error,
+                )
+            except (redis.ConnectionError, redis.TimeoutError) as e:
+                error = error or e
+                replies = [e] * len(indexes)
+            for index, reply in zip(indexes, replies):
+                results[index] = reply
+        if error is not None and raise_on_error:
+            raise error
+        return results
+
+    def _execute_shard(self, node: str, commands, raise_on_error: bool) -> List[Any]:
+        client = self.sharded.clients[node]
+        shas = list({args[0] for _, name, args, _ in commands if name == 'evalsha'})
+        if shas:
+            # Like redis-py pipelines, make sure the node has the scripts
+            # first (it may have restarted), since commands cannot be replayed
+            for sha, exists in zip(shas, client.script_exists(*shas)):
+                if not exists and sha in self.sharded._scripts:
+                    client.script_load(self.sharded._scripts[sha])
+
+        pipe = client.pipeline(transaction=self.transaction)
+        for _, name, args, kwargs in commands:
+            getattr(pipe, name)(*args, **kwargs)
+        return pipe.execute(raise_on_error=raise_on_error)
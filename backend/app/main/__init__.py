@@ -8,6 +8,15 @@ from flask_login import login_required, current_user
 from datetime import datetime
 import requests
 
+from app.core.config import settings
+from app.core.errors.handlers import ValidationError
+from app.services.registration_service import (
+    get_business_types,
+    get_dashboard_stats,
+    get_registration,
+    search_registrations,
+)
+
 bp = Blueprint('main', __name__)
 
 @bp.route('/')
@@ -16,28 +25,7 @@ def index():
     # Get some basic stats for the dashboard
     stats = {}
     try:
-        # Get total number of registrations
-        stats['total_registrations'] = current_app.db.registrations.count_documents({})
-        
-        # Get the latest registration date
-        latest = current_app.db.registrations.find_one(
-            {},
-            {'date_registration': 1},
-            sort=[('date_registration', -1)]
-        )
-        stats['latest_registration'] = latest.get('date_registration') if latest else None
-        
-        # Get count by business type
-        pipeline = [
-            {'$group': {
-                '_id': '$business_type',
-                'count': {'$sum': 1}
-            }},
-            {'$sort': {'count': -1}},
-            {'$limit': 5}
-        ]
-        stats['by_business_type'] = list(current_app.db.registrations.aggregate(pipeline))
-        
+        stats = get_dashboard_stats()
     except Exception as e:
         current_app.logger.error(f"Error fetching dashboard stats: {str(e)}")
         flash('Error loading dashboard data', 'danger')
@@ -49,48 +37,43 @@ def search():
     """Render the search page."""
     query = request.args.get('q', '')
     page = int(request.args.get('page', 1))
+    cursor = request.args.get('cursor') or None
     per_page = 20
     
     results = []
     total = 0
+    total_pages = 0
+    next_cursor = prev_cursor = None
     
     try:
-        # Build the search query
-        search_query = {}
-        
-        # Text search
-        if query:
-            search_query['$text'] = {'$search': query}
-        
-        # Add filters
-        business_type = request.args.get('business_type')
-        if business_type:
-            search_query['business_type'] = business_type
-            
-        status = request.args.get('status')
-        if status:
-            search_query['status'] = status
-            
-        # Get total count
-        total = current_app.db.registrations.count_documents(search_query)
+        # Search with the same cached query path as the API
+        result = search_registrations(
+            q=query or None,
+            business_type=request.args.get('business_type') or None,
+            status=request.args.get('status') or None,
+            date_from=request.args.get('date_from') or None,
+            date_to=request.args.get('date_to') or None,
+            name=request.args.get('name') or None,
+            page=page,
+            per_page=per_page,
+            cursor=cursor
+        )
+        results = result['data']
+        total = result['total']
+        next_cursor = result['next_cursor']
+        prev_cursor = result['prev_cursor']
         
         # Calculate pagination
-        skip = (page - 1) * per_page
         total_pages = (total + per_page - 1) // per_page
         
-        # Execute query
-        results = list(current_app.db.registrations
-            .find(search_query, {'_id': 0})
-            .sort('date_registration', -1)
-            .skip(skip)
-            .limit(per_page))
-        
+    except ValidationError as e:
+        flash('; '.join(e.errors.values()) or e.message, 'warning')
     except Exception as e:
         current_app.logger.error(f"Search error: {str(e)}")
         flash('An error occurred during search', 'danger')
     
     # Get unique business types for filter dropdown
-    business_types = current_app.db.registrations.distinct('business_type')
+    business_types = get_business_types()
     
     return render_template(
         'search.html',
@@ -100,7 +83,11 @@ def search():
         per_page=per_page,
         total=total,
         total_pages=total_pages,
-        business_types=sorted(business_types),
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        # Numbered links beyond this page would need a deep skip
+        max_page=settings.PAGINATION_MAX_SKIP // per_page + 1,
+        business_types=business_types,
         current_filters={
             'business_type': request.args.get('business_type', ''),
             'status': request.args.get('status', '')
@@ -112,10 +99,7 @@ def registration_detail(registration_id):
     """Render the registration detail page."""
     try:
         # Get the registration
-        registration = current_app.db.registrations.find_one(
-            {'registration_id': registration_id},
-            {'_id': 0}
-        )
+        registration = get_registration(registration_id)
         
         if not registration:
             flash('Registration not found', 'danger')
@@ -152,8 +136,9 @@ def about():
 def api_stats():
     """Get application statistics."""
     try:
+        registrations = current_app.db.registrations
         stats = {
-            'total_registrations': current_app.db.registrations.count_documents({}),
+            'total_registrations': registrations.estimated_document_count(),
             'last_updated': None
         }
         
@@ -4,7 +4,6 @@ Application middleware configuration.
 from flask import request, g
 import time
 import logging
-from functools import wraps
 from typing import Callable, Any, Optional
 
 from app.core.config import settings
@@ -47,32 +46,10 @@ def setup_middleware(app):
         
         return response
     
-    # Rate limiting middleware (basic implementation)
-    if settings.ENVIRONMENT != 'testing':
-        from flask_limiter import Limiter
-        from flask_limiter.util import get_remote_address
-        
-        limiter = Limiter(
-            app=app,
-            key_func=get_remote_address,
-            default_limits=[settings.RATE_LIMIT_DEFAULT],
-            storage_uri=settings.RATE_LIMIT_STORAGE_URL,
-            strategy="fixed-window"
-        )
-        
-        # Apply rate limiting to all API routes
-        limiter.exempt('static')
-        
-        # Special rate limits for auth endpoints
-        auth_limits = ["10 per minute", "100 per hour"]
-        
-        @app.before_request
-        def set_rate_limits():
-            if request.path.startswith(f"{settings.API_PREFIX}/v1/auth"):
-                limiter.limit(auth_limits[0], per_method=True)(lambda: None)()
-            elif request.path.startswith(settings.API_PREFIX):
-                limiter.limit(settings.RATE_LIMIT_DEFAULT, per_method=True)(lambda: None)()
-    
+    # Conditional requests (ETag/Last-Modified, 304s and Cache-Control)
+    from app.middleware.conditional import setup_conditional_requests
+    setup_conditional_requests(app)
+
     # Request ID middleware
     @app.before_request
     def set_request_id():
@@ -136,33 +113,19 @@ def rate_limit(limit: str, key_func: Optional[Callable[[], str]] = None):
     """
     Decorator to apply rate limiting to a specific endpoint.
     
+    Declares the limit for the view; it is enforced by the rate limiting
+    engine in :mod:`app.core.rate_limiting`.
+    
     Args:
         limit: Rate limit string (e.g., '100 per day')
         key_func: Optional function to generate a key for rate limiting
     """
-    def decorator(f):
-        @wraps(f)
-        def wrapped(*args, **kwargs):
-            from flask_limiter.util import get_remote_address
-            
-            # Use provided key_func or default to remote address
-            key = key_func() if key_func else get_remote_address()
-            
-            # Get or create rate limiter
-            from flask import current_app
-            if not hasattr(current_app, 'limiter'):
-                from flask_limiter import Limiter
-                current_app.limiter = Limiter(
-                    app=current_app,
-                    key_func=get_remote_address,
-                    storage_uri=current_app.config.get('RATE_LIMIT_STORAGE_URL'),
-                    strategy="fixed-window"
-                )
-            
-            # Apply rate limit
-            with current_app.test_request_context():
-                current_app.limiter.check(limit, key=key)
-            
-            return f(*args, **kwargs)
-        return wrapped
-    return decorator
+    from app.core.rate_limiting import (
+        get_remote_address,
+        parse_rate_limit,
+        rate_limited,
+    )
+    
+    count, period = parse_rate_limit(limit)
+    return rate_limited(limit=count, period=period,
+                        key_func=key_func or get_remote_address)
@@ -0,0 +1,187 @@
+"""
+HTTP conditional request middleware.
+
+Computes validators (``ETag``/``Last-Modified``) for registration routes
+before the view runs and answers ``If-None-Match``/``If-Modified-Since``
+with a 304 when they still match, so repeated polling never reaches the
+database. Collection routes derive their ETag from the registrations data
+version and the query string; detail routes from the record's
+``updated_at``.
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import g, request
+from werkzeug.http import parse_date
+
+from app.core.cache import get_data_version
+from app.core.rate_limiting import get_request_api_key_id
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = 'collection'
+DETAIL = 'detail'
+
+
+class RoutePolicy:
+    """Caching policy for a class of routes.
+
+    Args:
+        pattern: Regular expression matched against the request path; detail
+            routes capture ``registration_id``
+        kind: ``COLLECTION`` or ``DETAIL``
+        cache_control: ``Cache-Control`` header for successful responses
+    """
+
+    def __init__(self, pattern: str, kind: str, cache_control: str):
+        self.pattern = re.compile(pattern)
+        self.kind = kind
+        self.cache_control = cache_control
+
+
+# First match wins, so specific routes come before their parents. Every
+# route requires a valid ``X-API-Key``.
+ROUTE_POLICIES = [
+    RoutePolicy(
+        r'^(?:/api)?/v1/registrations/latest-date$',
+        COLLECTION,
+        'private, max-age=30, must-revalidate',
+    ),
+    RoutePolicy(
+        r'^(?:/api)?/v1/registrations(?:/search)?$',
+        COLLECTION,
+        'private, max-age=60, must-revalidate',
+    ),
+    RoutePolicy(
+        r'^(?:/api)?/v1/registrations/export$', COLLECTION, 'private, no-cache'
+    ),
+    RoutePolicy(
+        r'^(?:/api)?/v1/registrations/(?P<registration_id>[^/]+)$',
+        DETAIL,
+        'private, max-age=300, must-revalidate',
+    ),
+]
+
+
+def _match_policy(path: str):
+    for policy in ROUTE_POLICIES:
+        match = policy.pattern.match(path)
+        if match:
+            return policy, match
+    return None, None
+
+
+def _make_etag(*parts) -> str:
+    """Return an opaque (weak) entity tag for the given parts."""
+    data = '|'.join(str(p) for p in parts).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:32]
+
+
+def _canonical_query() -> str:
+    return '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+
+
+def _to_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _detail_validators(registration_id: str):
+    """Return ``(etag, last_modified)`` for a registration, or Nones."""
+    from app.services.registration_service import get_registration
+
+    registration = get_registration(registration_id)
+    if not registration:
+        return None, None
+
+    updated_at = registration.get('updated_at')
+    last_modified = _to_utc(updated_at) if isinstance(updated_at, datetime) else None
+    return (
+        _make_etag(registration_id, updated_at.isoformat() if last_modified else ''),
+        last_modified,
+    )
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if_none_match = request.if_none_match
+    if if_none_match:
+        return if_none_match.contains_weak(etag)
+
+    if last_modified is not None:
+        if_modified_since = request.headers.get('If-Modified-Since')
+        since = parse_date(if_modified_since) if if_modified_since else None
+        if since is not None:
+            return last_modified.replace(microsecond=0) <= _to_utc(since)
+    return False
+
+
+def _apply_validators(
+    response, etag: str, last_modified: Optional[datetime], cache_control: str
+):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def setup_conditional_requests(app):
+    """Register the conditional request hooks.
+
+    Args:
+        app: Flask application instance
+    """
+
+    @app.before_request
+    def check_conditional_request():
+        if request.method not in ('GET', 'HEAD'):
+            return None
+
+        policy, match = _match_policy(request.path)
+        if policy is None:
+            return None
+
+        # Leave unauthenticated requests to the view's rejection without
+        # spending a cache or database read on validators
+        if get_request_api_key_id() is None:
+            return None
+
+        try:
+            if policy.kind == DETAIL:
+                etag, last_modified = _detail_validators(match.group('registration_id'))
+            else:
+                from app.services.registration_service import DATA_NAMESPACE
+
+                version = get_data_version(DATA_NAMESPACE)
+                etag = (
+                    _make_etag(version, request.path, _canonical_query())
+                    if version is not None
+                    else None
+                )
+                last_modified = None
+        except Exception as e:
+            logger.error(f"Error computing validators for {request.path}: {e}")
+            return None
+
+        if etag is None:
+            return None
+
+        g.conditional = (etag, last_modified, policy.cache_control)
+
+        if _not_modified(etag, last_modified):
+            response = app.response_class(status=304)
+            return _apply_validators(
+                response, etag, last_modified, policy.cache_control
+            )
+        return None
+
+    @app.after_request
+    def set_validators(response):
+        conditional = g.pop('conditional', None)
+        if conditional is not None and response.status_code == 200:
+            _apply_validators(response, *conditional)
+        return response
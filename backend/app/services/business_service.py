@@ -9,8 +9,19 @@ from pymongo import ReturnDocument
 from pymongo.collection import Collection
 from bson import ObjectId
 
-from app.core.cache import cache, cached, invalidate_cache
+from app.core.cache import (
+    cache_get,
+    cache_get_many,
+    cache_key,
+    cache_set,
+    cache_set_many,
+    cached,
+    delete_keys,
+    invalidate_cache,
+)
 from app.core.config import settings
+from app.core.query import CompiledQuery, compile_business_query
+from app.core.query_profiler import FIND, track_query
 from app.db.mongodb import get_database
 from app.schemas.business import (
     Business, 
@@ -21,6 +32,10 @@ from app.schemas.business import (
 
 logger = logging.getLogger(__name__)
 
+# Cache timeouts in seconds for per-ID entities and for list/search ID lists
+ENTITY_CACHE_TIMEOUT = 300
+LIST_CACHE_TIMEOUT = 60
+
 class BusinessService:
     """Service class for business-related operations with Redis caching."""
     
@@ -37,11 +52,17 @@ class BusinessService:
             logger.error(f"Error getting business {business_id}: {e}")
             return None
     
-    @cached(timeout=300, key_prefix="business")
+    @cached(
+        timeout=ENTITY_CACHE_TIMEOUT,
+        key_prefix="business",
+        negative_timeout=settings.CACHE_NEGATIVE_TTL,
+    )
     async def get_business(self, business_id: str) -> Optional[BusinessInDB]:
         """
         Get a business by ID with caching.
         
+        Unknown IDs are cached as missing for ``CACHE_NEGATIVE_TTL`` seconds.
+        
         Args:
             business_id: The business ID to retrieve
             
@@ -51,7 +72,72 @@ class BusinessService:
         business = await self._get_business(business_id)
         return BusinessInDB(**business) if business else None
     
-    @cached(timeout=60, key_prefix="list_businesses")
+    async def _hydrate(self, business_ids: List[str]) -> List[BusinessInDB]:
+        """
+        Load businesses by ID, serving cached entities first.
+        
+        Cached entities are fetched with a single MGET; the rest are loaded
+        with one ``$in`` query and written back to the cache.
+        
+        Args:
+            business_ids: Ordered business IDs
+            
+        Returns:
+            Business records in the order of ``business_ids``; IDs that no
+            longer exist are skipped
+        """
+        keys = [cache_key("business", business_id) for business_id in business_ids]
+        found: Dict[str, BusinessInDB] = {}
+        for business_id, value in zip(business_ids, cache_get_many(keys)):
+            if isinstance(value, BusinessInDB):
+                found[business_id] = value
+        
+        missing = [i for i in business_ids if i not in found]
+        if missing:
+            fetched = {}
+            object_ids = [ObjectId(i) for i in missing]
+            cursor = self.collection.find({"_id": {"$in": object_ids}})
+            async for doc in cursor:
+                business = BusinessInDB(**doc)
+                found[str(doc["_id"])] = business
+                fetched[cache_key("business", str(doc["_id"]))] = business
+            cache_set_many(fetched, ENTITY_CACHE_TIMEOUT)
+        
+        return [found[i] for i in business_ids if i in found]
+    
+    async def _list_by_ids(
+        self, key: str, query: CompiledQuery, skip: int, limit: int
+    ) -> List[BusinessInDB]:
+        """
+        Run a list query, caching only the ordered result IDs under ``key``.
+        
+        Args:
+            key: Cache key for the ID list
+            query: Compiled filter and time budget
+            skip: Number of records to skip
+            limit: Maximum number of records to return
+            
+        Returns:
+            List of business records
+        """
+        business_ids = cache_get(key)
+        if business_ids is not None:
+            return await self._hydrate(business_ids)
+        
+        businesses = []
+        entities = {}
+        cursor = query.find(self.collection).skip(skip).limit(limit)
+        with track_query(self.collection, FIND, query.filter, skip=skip, limit=limit):
+            async for doc in cursor:
+                business = BusinessInDB(**doc)
+                businesses.append(business)
+                entities[cache_key("business", str(doc["_id"]))] = business
+        
+        cache_set_many(entities, ENTITY_CACHE_TIMEOUT)
+        business_ids = [str(business.id) for business in businesses]
+        cache_set(key, business_ids, LIST_CACHE_TIMEOUT)
+        return businesses
+    
     async def list_businesses(
         self, 
         skip: int = 0, 
@@ -61,17 +147,24 @@ class BusinessService:
         """
         List businesses with pagination and optional filters.
         
+        Only the ordered IDs of each page are cached; the records themselves
+        are shared with :meth:`get_business` under per-ID keys.
+        
         Args:
             skip: Number of records to skip
             limit: Maximum number of records to return
-            filters: Optional filter criteria
+            filters: Optional ``q``, ``status``, ``category`` and ``name``
+                filters; see :func:`app.core.query.compile_business_query`
             
         Returns:
             List of business records
+            
+        Raises:
+            ValidationError: If a filter is invalid
         """
-        query = filters or {}
-        cursor = self.collection.find(query).skip(skip).limit(limit)
-        return [BusinessInDB(**doc) async for doc in cursor]
+        query = compile_business_query(**(filters or {}))
+        key = cache_key("list_businesses", skip, limit, query.filter)
+        return await self._list_by_ids(key, query, skip, limit)
     
     async def create_business(self, business: BusinessCreate) -> BusinessInDB:
         """
@@ -89,8 +182,10 @@ class BusinessService:
         result = await self.collection.insert_one(business_dict)
         created_business = await self._get_business(result.inserted_id)
         
-        # Invalidate relevant caches
-        await invalidate_cache("list_businesses")
+        # Invalidate relevant caches, including a negative entry for the new ID
+        delete_keys(cache_key("business", str(result.inserted_id)))
+        invalidate_cache("list_businesses")
+        invalidate_cache("search_businesses")
         
         return BusinessInDB(**created_business)
     
@@ -120,9 +215,8 @@ class BusinessService:
             )
             
             if result:
-                # Invalidate relevant caches
-                await invalidate_cache(f"business:{business_id}")
-                await invalidate_cache("list_businesses")
+                # Cached lists hold only IDs, so the entity key is all that changes
+                delete_keys(cache_key("business", business_id))
                 return BusinessInDB(**result)
             return None
             
@@ -144,15 +238,15 @@ class BusinessService:
             result = await self.collection.delete_one({"_id": ObjectId(business_id)})
             if result.deleted_count > 0:
                 # Invalidate relevant caches
-                await invalidate_cache(f"business:{business_id}")
-                await invalidate_cache("list_businesses")
+                delete_keys(cache_key("business", business_id))
+                invalidate_cache("list_businesses")
+                invalidate_cache("search_businesses")
                 return True
             return False
         except Exception as e:
             logger.error(f"Error deleting business {business_id}: {e}")
             return False
     
-    @cached(timeout=60, key_prefix="search_businesses")
     async def search_businesses(
         self, 
         query: str,
@@ -162,6 +256,9 @@ class BusinessService:
         """
         Search for businesses by name, description, or other fields.
         
+        Like :meth:`list_businesses`, only the ordered result IDs are cached.
+        The query is matched literally (case-insensitive), not as a regex.
+        
         Args:
             query: Search query string
             skip: Number of records to skip
@@ -169,20 +266,16 @@ class BusinessService:
             
         Returns:
             List of matching business records
+            
+        Raises:
+            ValidationError: If the query is too long
         """
-        search_filter = {
-            "$or": [
-                {"name": {"$regex": query, "$options": "i"}},
-                {"dba": {"$regex": query, "$options": "i"}},
-                {"description": {"$regex": query, "$options": "i"}},
-                {"tags": {"$regex": query, "$options": "i"}}
-            ]
-        }
+        search_filter = compile_business_query(q=query)
         
-        cursor = self.collection.find(search_filter).skip(skip).limit(limit)
-        return [BusinessInDB(**doc) async for doc in cursor]
+        key = cache_key("search_businesses", query, skip, limit)
+        return await self._list_by_ids(key, search_filter, skip, limit)
     
-    @cached(timeout=3600, key_prefix="business_statistics")
+    @cached(timeout=3600, key_prefix="business_statistics", persist=True)
     async def get_business_statistics(self) -> Dict[str, Any]:
         """
         Get business statistics.
@@ -0,0 +1,91 @@
+"""
+Cache Warmer Service
+
+This module recomputes the most requested cached results after new data has
+been ingested, so the first users after a sync are not the ones paying for
+cold queries.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from flask import current_app
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_tasks():
+    """Build the list of ``(name, func, kwargs)`` warm-up tasks."""
+    from .registration_service import (
+        _search_registrations,
+        get_business_types,
+        get_dashboard_stats,
+        get_latest_registration_date,
+        get_top_search_queries,
+        list_registrations,
+    )
+
+    tasks = [
+        ('dashboard_stats', get_dashboard_stats.refresh, {}),
+        ('business_types', get_business_types.refresh, {}),
+        ('latest_registration_date', get_latest_registration_date.refresh, {}),
+    ]
+
+    for page in range(1, settings.CACHE_WARM_PAGES + 1):
+        tasks.append(
+            (
+                f'registrations page {page}',
+                list_registrations.refresh,
+                {'page': page, 'per_page': settings.CACHE_WARM_PER_PAGE},
+            )
+        )
+
+    for query in get_top_search_queries(settings.CACHE_WARM_TOP_QUERIES):
+        tasks.append(
+            (f'search {query}', _search_registrations.refresh, dict(query, page=1))
+        )
+
+    return tasks
+
+
+def _run_task(app, func, kwargs):
+    with app.app_context():
+        func(**kwargs)
+
+
+def warm_caches():
+    """Recompute and store hot cached results.
+
+    Warms the dashboard statistics, the business type list, the first
+    ``CACHE_WARM_PAGES`` pages of the registration list and the
+    ``CACHE_WARM_TOP_QUERIES`` most frequent recent searches, running at most
+    ``CACHE_WARM_CONCURRENCY`` queries at a time.
+
+    Returns:
+        dict: Number of warmed and failed entries and the elapsed time
+    """
+    app = current_app._get_current_object()
+    started = datetime.utcnow()
+    tasks = _warm_tasks()
+
+    warmed = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=settings.CACHE_WARM_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(_run_task, app, func, kwargs): name
+            for name, func, kwargs in tasks
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+                warmed += 1
+            except Exception as e:
+                failed += 1
+                logger.error(f"Failed to warm cache for {futures[future]}: {str(e)}")
+
+    elapsed = (datetime.utcnow() - started).total_seconds()
+    logger.info(f"Warmed {warmed} cache entries in {elapsed:.2f}s ({failed} failed)")
+
+    return {'warmed': warmed, 'failed': failed, 'elapsed': elapsed}
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlencode
 from bson import ObjectId
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 def fetch_data_from_api(url, params=None):
@@ -243,6 +245,10 @@ def fetch_latest_data():
         # Save the data to the database
         saved_count, error_count, errors = save_registrations(current_app.db, data)
         
+        # Drop cached (and cached-as-missing) entries for the records we touched
+        from app.services.registration_service import invalidate_registrations
+        invalidate_registrations(record.get('registration_id') for record in data)
+        
         # Log the fetch operation
         fetch_log = {
             'timestamp': datetime.utcnow(),
@@ -258,6 +264,20 @@ def fetch_latest_data():
             
         current_app.db.fetch_history.insert_one(fetch_log)
         
+        if saved_count > 0:
+            # Invalidate versioned list/search caches, then recompute hot
+            # results now rather than on the next user request
+            from app.core.cache import bump_data_version
+            from app.services.registration_service import DATA_NAMESPACE
+            bump_data_version(DATA_NAMESPACE)
+            
+            if settings.CACHE_WARM_ENABLED:
+                try:
+                    from app.services.cache_warmer import warm_caches
+                    warm_caches()
+                except Exception as e:
+                    logger.error(f"Cache warm-up failed: {str(e)}", exc_info=True)
+        
         return {
             'success': True,
             'count': saved_count,
@@ -0,0 +1,257 @@
+"""
+Export Service
+
+Streams registration search results as NDJSON or CSV for bulk consumers.
+Rows are read from a single MongoDB cursor in ``EXPORT_BATCH_SIZE``
+batches and serialized as they arrive, so an export of the whole
+collection never holds more than one batch in memory.
+
+Exports are ordered by ``registration_id`` over its unique index. An
+interrupted export resumes from a cursor token (see
+:mod:`app.core.pagination`) built from the last row received.
+"""
+import csv
+import io
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from bson import ObjectId
+from flask import current_app
+
+from app.core.config import settings
+from app.core.pagination import (
+    NEXT,
+    TIEBREAK_FIELD,
+    InvalidCursor,
+    decode_cursor,
+    encode_cursor,
+    keyset_filter,
+    keyset_sort,
+)
+from app.core.query import compile_registration_query
+
+logger = logging.getLogger(__name__)
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+EXPORT_FORMATS = (NDJSON, CSV)
+
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    CSV: 'text/csv',
+}
+
+# Exports walk the unique registration_id index
+EXPORT_SORT = TIEBREAK_FIELD
+EXPORT_ORDER = 'asc'
+
+# CSV columns; nested fields use dotted paths
+CSV_COLUMNS = [
+    'registration_id',
+    'business_name',
+    'business_type',
+    'date_registration',
+    'status',
+    'address.street',
+    'address.city',
+    'address.state',
+    'address.zip',
+    'created_at',
+    'updated_at',
+]
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _csv_value(row: Dict[str, Any], path: str) -> Any:
+    value = row
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return ''
+        value = value.get(part)
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def resume_cursor(registration_id: str) -> str:
+    """Build the cursor token that resumes an export after a registration.
+
+    Args:
+        registration_id: ID of the last row received
+
+    Returns:
+        str: Cursor token for :func:`export_registrations`
+    """
+    return encode_cursor({TIEBREAK_FIELD: registration_id}, EXPORT_SORT, EXPORT_ORDER)
+
+
+def _last_complete_line(f):
+    """Return ``(end offset, line)`` for the last newline-terminated line."""
+    size = f.seek(0, os.SEEK_END)
+    block = 65536
+    while True:
+        start = max(0, size - block)
+        f.seek(start)
+        tail = f.read(size - start)
+        end = tail.rfind(b'\n')
+        if end >= 0:
+            begin = tail.rfind(b'\n', 0, end) + 1
+            if begin > 0 or start == 0:
+                return start + end + 1, tail[begin:end]
+        elif start == 0:
+            return 0, b''
+        block *= 2
+
+
+def _last_complete_record(f):
+    """Return ``(end offset, record)`` for the last complete CSV record.
+
+    Quoted fields may contain newlines, so a newline only ends a record
+    after an even number of quote characters (quotes inside a field are
+    doubled). Quoting cannot be told from the tail alone, so the file is
+    scanned from the start.
+    """
+    f.seek(0)
+    offset = quotes = 0
+    begin = end = 0
+    while True:
+        block = f.read(65536)
+        if not block:
+            break
+        pos = 0
+        while True:
+            newline = block.find(b'\n', pos)
+            if newline < 0:
+                quotes += block.count(b'"', pos)
+                break
+            quotes += block.count(b'"', pos, newline)
+            pos = newline + 1
+            if quotes % 2 == 0:
+                begin, end = end, offset + pos
+                quotes = 0
+        offset += len(block)
+    f.seek(begin)
+    return end, f.read(end - begin)
+
+
+def prepare_resume(path: str, fmt: str) -> Optional[str]:
+    """Find where a partial export file stopped.
+
+    A row cut off by the interruption is truncated from the file, so the
+    export can be appended to it.
+
+    Args:
+        path: Partial export file
+        fmt: ``ndjson`` or ``csv``
+
+    Returns:
+        str: Cursor token to resume after the last complete row, or None
+            if the file has no complete rows
+    """
+    with open(path, 'r+b') as f:
+        end, line = _last_complete_record(f) if fmt == CSV else _last_complete_line(f)
+        f.truncate(end)
+
+    if not line.strip():
+        return None
+    text = line.decode('utf-8')
+    if fmt == CSV:
+        registration_id = next(csv.reader(io.StringIO(text, newline='')))[0]
+        if registration_id == CSV_COLUMNS[0]:
+            return None
+    else:
+        registration_id = json.loads(text)[TIEBREAK_FIELD]
+    return resume_cursor(registration_id)
+
+
+def _ndjson_chunks(rows: Iterable[Dict[str, Any]], flush_every: int) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, default=_json_default, separators=(',', ':')))
+        if len(lines) >= flush_every:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _csv_chunks(
+    rows: Iterable[Dict[str, Any]], flush_every: int, header: bool
+) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+
+    pending = 0
+    for row in rows:
+        writer.writerow([_csv_value(row, column) for column in CSV_COLUMNS])
+        pending += 1
+        if pending >= flush_every:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder
+
+
+def export_registrations(
+    fmt: str = NDJSON, cursor: Optional[str] = None, header: bool = True, **filters
+) -> Iterator[str]:
+    """Stream registrations matching search filters.
+
+    The query is prepared eagerly, so an invalid format or cursor raises
+    before the first chunk is produced; the rows are read lazily.
+
+    Args:
+        fmt: ``ndjson`` or ``csv``
+        cursor: Cursor token to resume after; see :func:`resume_cursor`
+        header: Write the CSV header row (left out when appending)
+        **filters: Search parameters accepted by
+            :func:`app.core.query.compile_registration_query`
+
+    Returns:
+        Iterator[str]: Text chunks of roughly ``EXPORT_BATCH_SIZE`` rows each
+
+    Raises:
+        ValueError: If the format is unknown
+        ValidationError: If a filter is invalid
+        InvalidCursor: If the cursor is malformed or not an export cursor
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    # No time budget: an export legitimately runs for as long as it streams
+    query = compile_registration_query(**filters, max_time_ms=0).filter
+    if cursor:
+        direction, value, last_id = decode_cursor(cursor, EXPORT_SORT, EXPORT_ORDER)
+        if direction != NEXT:
+            raise InvalidCursor('Exports can only resume forwards')
+        boundary = keyset_filter(EXPORT_SORT, EXPORT_ORDER, direction, value, last_id)
+        query = {'$and': [query, boundary]} if query else boundary
+
+    batch_size = settings.EXPORT_BATCH_SIZE
+    rows = (
+        current_app.db.registrations.find(query, {'_id': 0})
+        .sort(keyset_sort(EXPORT_SORT, EXPORT_ORDER))
+        .batch_size(batch_size)
+    )
+
+    if fmt == CSV:
+        return _csv_chunks(rows, batch_size, header)
+    return _ndjson_chunks(rows, batch_size)
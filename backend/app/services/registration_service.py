@@ -0,0 +1,436 @@
+"""
+Registration Service
+
+This module provides cached read access to business registration records.
+It is shared by the API resources and the web views so both use the same
+cache entries.
+
+List, search and aggregate results are keyed on the registrations data
+version, which ingestion bumps after each successful write, so they stay
+valid until the data actually changes.
+"""
+import json
+import logging
+from datetime import datetime, timedelta
+
+import redis
+from flask import current_app
+
+from app.core.cache import (
+    cache_get_many,
+    cache_key,
+    cache_set_many,
+    cached,
+    delete_keys,
+    get_cache,
+)
+from app.core.circuit_breaker import redis_breaker
+from app.core.codecs import MISSING
+from app.core.config import settings
+from app.core.counts import AUTO, count_matching
+from app.core.indexes import DEFAULT_SORT, validate_sort
+from app.core.pagination import TIEBREAK_FIELD, paginate
+from app.core.query import compile_registration_query
+
+logger = logging.getLogger(__name__)
+
+# Cache key prefix for single registrations
+REGISTRATION_PREFIX = 'registration'
+
+# Data version namespace bumped by ingestion; see app.core.cache.bump_data_version
+DATA_NAMESPACE = 'registrations'
+
+# Sorted sets counting search queries, one per day
+SEARCH_QUERIES_KEY = 'search_queries:{day}'
+SEARCH_QUERIES_DAYS = 2
+
+
+@cached(
+    timeout=settings.REDIS_CACHE_TTL,
+    key_prefix=REGISTRATION_PREFIX,
+    negative_timeout=settings.CACHE_NEGATIVE_TTL,
+)
+def get_registration(registration_id):
+    """Get a registration by its registration ID.
+
+    Misses are cached for ``CACHE_NEGATIVE_TTL`` seconds, so repeated
+    lookups of unknown IDs do not reach MongoDB.
+
+    Args:
+        registration_id (str): The registration identifier
+
+    Returns:
+        dict: The registration without its ``_id``, or None if not found
+    """
+    return current_app.db.registrations.find_one(
+        {'registration_id': registration_id}, {'_id': 0}
+    )
+
+
+def get_registrations(registration_ids):
+    """Get several registrations by registration ID.
+
+    Shares per-ID cache entries with :func:`get_registration`: cached
+    entries are read with one MGET, the rest are loaded with a single
+    ``$in`` query and cached, and unknown IDs are cached as missing.
+
+    Args:
+        registration_ids (iterable): Registration identifiers
+
+    Returns:
+        dict: Registration (without its ``_id``) or None keyed by each
+            distinct ID, in request order
+    """
+    ids = list(dict.fromkeys(registration_ids))
+    keys = [cache_key(REGISTRATION_PREFIX, registration_id) for registration_id in ids]
+
+    found = {}
+    pending = []
+    for registration_id, key, value in zip(ids, keys, cache_get_many(keys)):
+        if value is MISSING:
+            continue
+        if value is None:
+            pending.append((registration_id, key))
+        else:
+            found[registration_id] = value
+
+    if pending:
+        loaded = {
+            doc['registration_id']: doc
+            for doc in current_app.db.registrations.find(
+                {
+                    'registration_id': {
+                        '$in': [registration_id for registration_id, _ in pending]
+                    }
+                },
+                {'_id': 0},
+            )
+        }
+        found.update(loaded)
+        cache_set_many(
+            {
+                key: loaded[registration_id]
+                for registration_id, key in pending
+                if registration_id in loaded
+            },
+            settings.REDIS_CACHE_TTL,
+        )
+        cache_set_many(
+            {
+                key: MISSING
+                for registration_id, key in pending
+                if registration_id not in loaded
+            },
+            settings.CACHE_NEGATIVE_TTL,
+        )
+
+    return {registration_id: found.get(registration_id) for registration_id in ids}
+
+
+def invalidate_registrations(registration_ids):
+    """Drop cached entries, including negative entries, for registrations.
+
+    Args:
+        registration_ids (iterable): Registration IDs that were inserted or updated
+    """
+    keys = [
+        cache_key(REGISTRATION_PREFIX, registration_id)
+        for registration_id in registration_ids
+        if registration_id
+    ]
+    if keys:
+        delete_keys(*keys)
+
+
+@cached(
+    timeout=settings.CACHE_VERSIONED_TTL,
+    key_prefix='dashboard_stats',
+    versioned=DATA_NAMESPACE,
+    persist=True,
+)
+def get_dashboard_stats():
+    """Get the statistics shown on the home page dashboard.
+
+    Returns:
+        dict: Total registrations, latest registration date and the five
+            most common business types
+    """
+    db = current_app.db
+    stats = {}
+
+    # Get total number of registrations
+    stats['total_registrations'], _ = count_matching(db.registrations, {})
+
+    # Get the latest registration date
+    latest = db.registrations.find_one(
+        {}, {'date_registration': 1, '_id': 0}, sort=[('date_registration', -1)]
+    )
+    stats['latest_registration'] = latest.get('date_registration') if latest else None
+
+    # Get count by business type
+    pipeline = [
+        {'$group': {'_id': '$business_type', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1}},
+        {'$limit': 5},
+    ]
+    stats['by_business_type'] = list(db.registrations.aggregate(pipeline))
+
+    return stats
+
+
+@cached(
+    timeout=settings.CACHE_VERSIONED_TTL,
+    key_prefix='business_types',
+    versioned=DATA_NAMESPACE,
+    persist=True,
+)
+def get_business_types():
+    """Get the sorted list of distinct business types for search filters.
+
+    Returns:
+        list: Business type names
+    """
+    return sorted(
+        t for t in current_app.db.registrations.distinct('business_type') if t
+    )
+
+
+def build_projection(fields, sort_field):
+    """Build the MongoDB projection for a sparse fieldset.
+
+    The sort field and registration ID are always read because cursors are
+    built from them; with ``registration_id``, ``business_name`` and
+    ``date_registration`` the list query is covered by an index.
+
+    Args:
+        fields (list): Field paths to return, or None for whole documents
+        sort_field (str): Field the results are sorted by
+
+    Returns:
+        dict: The projection
+    """
+    if not fields:
+        return {'_id': 0}
+
+    paths = set(fields) | {TIEBREAK_FIELD, sort_field}
+    projection = {'_id': 0}
+    for path in sorted(paths):
+        # Projecting a field and one of its subfields is a path collision
+        if not any(path.startswith(f'{other}.') for other in paths):
+            projection[path] = 1
+    return projection
+
+
+@cached(
+    timeout=settings.CACHE_VERSIONED_TTL,
+    key_prefix='registrations',
+    versioned=DATA_NAMESPACE,
+)
+def list_registrations(page=1, per_page=20, cursor=None, count=AUTO, fields=None):
+    """Get a page of registrations, newest first.
+
+    Args:
+        page (int): Page number, starting at 1; ignored when ``cursor`` is given
+        per_page (int): Items per page
+        cursor (str): Cursor token from a previous page
+        count (str): Count mode, ``auto`` or ``has_more``; see :mod:`app.core.counts`
+        fields (list): Field paths to read, or None for whole documents
+
+    Returns:
+        dict: ``data`` (list of registrations), ``total`` (int, or None in
+            ``has_more`` mode), ``count_strategy``, ``has_more`` and the
+            ``next_cursor``/``prev_cursor`` tokens
+
+    Raises:
+        InvalidCursor: If the cursor is invalid or the page is too deep
+    """
+    db = current_app.db
+    compiled = compile_registration_query()
+
+    result = paginate(
+        db.registrations,
+        compiled.filter,
+        'date_registration',
+        'desc',
+        per_page,
+        page=page,
+        cursor=cursor,
+        projection=build_projection(fields, 'date_registration'),
+        max_skip=settings.PAGINATION_MAX_SKIP,
+        max_time_ms=compiled.max_time_ms,
+    )
+    result['total'], result['count_strategy'] = count_matching(
+        db.registrations, compiled.filter, count
+    )
+
+    return result
+
+
+@cached(
+    timeout=settings.CACHE_VERSIONED_TTL,
+    key_prefix='latest_registration_date',
+    versioned=DATA_NAMESPACE,
+)
+def get_latest_registration_date():
+    """Get the date of the most recent registration.
+
+    Returns:
+        datetime: The latest ``date_registration``, or None if there is none
+    """
+    latest = current_app.db.registrations.find_one(
+        {}, {'date_registration': 1, '_id': 0}, sort=[('date_registration', -1)]
+    )
+    if not latest or 'date_registration' not in latest:
+        return None
+    return latest['date_registration']
+
+
+@cached(
+    timeout=settings.CACHE_VERSIONED_TTL,
+    key_prefix='registration_search',
+    versioned=DATA_NAMESPACE,
+)
+def _search_registrations(
+    q=None,
+    business_type=None,
+    status=None,
+    date_from=None,
+    date_to=None,
+    name=None,
+    sort=DEFAULT_SORT,
+    order='desc',
+    page=1,
+    per_page=20,
+    cursor=None,
+    count=AUTO,
+    fields=None,
+):
+    """Cached search; see :func:`search_registrations`."""
+    compiled = compile_registration_query(
+        q=q,
+        business_type=business_type,
+        status=status,
+        date_from=date_from,
+        date_to=date_to,
+        name=name,
+    )
+    db = current_app.db
+
+    # Execute query
+    sort_field = validate_sort(sort)
+    result = paginate(
+        db.registrations,
+        compiled.filter,
+        sort_field,
+        order,
+        per_page,
+        page=page,
+        cursor=cursor,
+        projection=build_projection(fields, sort_field),
+        max_skip=settings.PAGINATION_MAX_SKIP,
+        max_time_ms=compiled.max_time_ms,
+    )
+
+    # Get total count
+    result['total'], result['count_strategy'] = count_matching(
+        db.registrations,
+        compiled.filter,
+        count,
+        namespace=DATA_NAMESPACE,
+        max_time_ms=compiled.max_time_ms,
+    )
+
+    return result
+
+
+def search_registrations(**params):
+    """Search registrations with filters.
+
+    Filters are validated and compiled by
+    :func:`app.core.query.compile_registration_query`. Valid queries
+    (without their page number) are counted so the most frequent searches
+    can be warmed after ingestion.
+
+    Args:
+        **params: ``q``, ``business_type``, ``status``, ``date_from``,
+            ``date_to``, ``name``, ``sort``, ``order``, ``page``,
+            ``per_page``, ``cursor``, ``count`` and ``fields``
+
+    Returns:
+        dict: ``data`` (list of registrations), ``total`` (int, or None in
+            ``has_more`` mode), ``count_strategy``, ``has_more`` and the
+            ``next_cursor``/``prev_cursor`` tokens
+
+    Raises:
+        InvalidCursor: If the cursor is invalid or the page is too deep
+        ValidationError: If a filter is invalid
+        ValueError: If ``sort`` is not one of ``SORT_OPTIONS``
+    """
+    # Unset filters take the defaults, so requests and the cache warmer,
+    # which replays recorded queries without them, share cache keys
+    params = {k: v for k, v in params.items() if v not in (None, '')}
+    result = _search_registrations(**params)
+    record_search_query(params)
+    return result
+
+
+def record_search_query(params):
+    """Count a search query in today's query frequency set.
+
+    Args:
+        params (dict): Search parameters
+    """
+    query = {k: v for k, v in params.items() if k not in ('page', 'cursor', 'count')}
+    if not query:
+        return
+
+    cache = get_cache()
+    if cache is None:
+        return
+
+    key = SEARCH_QUERIES_KEY.format(day=datetime.utcnow().strftime('%Y%m%d'))
+    try:
+        pipe = cache.pipeline(transaction=False)
+        pipe.zincrby(key, 1, json.dumps(query, sort_keys=True, default=str))
+        pipe.expire(key, SEARCH_QUERIES_DAYS * 86400)
+        pipe.execute()
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error recording search query: {e}")
+
+
+def get_top_search_queries(limit):
+    """Get the most frequent search queries of the last few days.
+
+    Args:
+        limit (int): Maximum number of queries to return
+
+    Returns:
+        list: Search parameter dicts, most frequent first
+    """
+    cache = get_cache()
+    if cache is None or limit <= 0:
+        return []
+
+    today = datetime.utcnow()
+    keys = [
+        SEARCH_QUERIES_KEY.format(day=(today - timedelta(days=n)).strftime('%Y%m%d'))
+        for n in range(SEARCH_QUERIES_DAYS)
+    ]
+    try:
+        counts = {}
+        pipe = cache.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrevrange(key, 0, limit - 1, withscores=True)
+        for members in pipe.execute():
+            for member, score in members:
+                counts[member] = counts.get(member, 0) + score
+        redis_breaker.record_success()
+    except redis.RedisError as e:
+        redis_breaker.record_failure()
+        logger.error(f"Error reading top search queries: {e}")
+        return []
+
+    top = sorted(counts, key=counts.get, reverse=True)[:limit]
+    return [json.loads(member) for member in top]
@@ -6,9 +6,12 @@ import os
 import sys
 import logging
 from datetime import datetime
-from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
+from pymongo import MongoClient, DESCENDING
 from pymongo.errors import ConnectionFailure, OperationFailure
 
+from app.core.indexes import REGISTRATION_INDEXES
+from app.core.query_profiler import ensure_slow_query_log
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -34,12 +37,8 @@ def check_mongodb_connection():
 def create_indexes(db):
     """Create necessary indexes for collections."""
     try:
-        # Create indexes for registrations collection
-        db.registrations.create_index([("registration_id", ASCENDING)], unique=True)
-        db.registrations.create_index([("business_name", TEXT)])
-        db.registrations.create_index([("business_type", ASCENDING)])
-        db.registrations.create_index([("date_registration", DESCENDING)])
-        db.registrations.create_index([("status", ASCENDING)])
+        # Registration indexes are declared next to the sorts they serve
+        db.registrations.create_indexes(REGISTRATION_INDEXES)
         
         # Create index for fetch_history collection
         db.fetch_history.create_index([("last_fetched_date", DESCENDING)])
@@ -61,6 +60,9 @@ def create_collections(db):
             logger.info(f"Created collection: {collection}")
         else:
             logger.info(f"Collection already exists: {collection}")
+    
+    # Capped log written by the query profiler (QUERY_PROFILING)
+    ensure_slow_query_log(db)
 
 def init_fetch_history(db):
     """Initialize the fetch history if it doesn't exist."""
@@ -0,0 +1,187 @@
+"""
+Tests for the application factory in ``app/__init__.py``.
+
+The app is built by ``create_app`` with Redis replaced by fakeredis and
+MongoDB by mongomock; the tests are skipped when either is not installed.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from backend.app import create_app
+
+mongomock = pytest.importorskip('mongomock')
+fakeredis = pytest.importorskip('fakeredis')
+
+API_KEY = 'test-api-key'
+ADMIN_KEY = 'test-admin-key'
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def app(redis_conn, monkeypatch):
+    monkeypatch.setattr(
+        'backend.app.core.cache.get_redis_connection', lambda: redis_conn
+    )
+    app = create_app({'API_KEY': API_KEY, 'ADMIN_API_KEY': ADMIN_KEY})
+    app.db = mongomock.MongoClient().db
+    app.db.registrations.insert_many(
+        [
+            {
+                'registration_id': f'R{i}',
+                'business_name': f'Business {i}',
+                'status': 'Active',
+                'updated_at': datetime(2025, 6, 1, 12, 30, 15, 500000),
+            }
+            for i in range(5)
+        ]
+    )
+    # Data versions are memoized per process
+    monkeypatch.setattr('app.core.cache._data_versions', {})
+    return app
+
+
+def test_admin_cache_routes_use_the_app_cache(app, redis_conn):
+    """Test that the admin namespace reaches the Redis cache the factory set up."""
+    redis_conn.set('registration_search:v1:x', b'value')
+    redis_conn.set('registration:R1', b'value')
+
+    # fakeredis has no MEMORY USAGE for /admin/cache/keys; the flush uses
+    # the same get_cache() path
+    response = app.test_client().delete(
+        '/admin/cache/namespaces/registration_search',
+        headers={'X-Admin-Key': ADMIN_KEY},
+    )
+    assert response.status_code == 200
+    assert response.get_json()['deleted'] == 1
+    assert redis_conn.keys('*') == [b'registration:R1']
+
+
+def test_api_key_quota_is_charged_by_endpoint_cost(app, redis_conn, monkeypatch):
+    """Test that API requests are charged by cost until the quota runs out."""
+    monkeypatch.setattr(
+        'backend.app.core.rate_limiting.get_redis_connection', lambda: redis_conn
+    )
+    monkeypatch.setattr(
+        'backend.app.core.rate_limiting.settings.API_KEY_QUOTA', '25 per day'
+    )
+    # Rate limiting is skipped for apps built with a test config
+    app.config['TESTING'] = False
+    client = app.test_client()
+    headers = {'X-API-Key': API_KEY}
+
+    responses = [
+        client.get('/v1/registrations/search', headers=headers) for _ in range(3)
+    ]
+
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[0].headers['X-RateLimit-Cost'] == '10'
+    assert responses[1].headers['X-RateLimit-Remaining'] == '5'
+    assert int(responses[2].headers['Retry-After']) > 0
+
+
+def test_matching_etag_is_not_modified(app):
+    """Test that a collection route answers a matching If-None-Match with a 304."""
+    client = app.test_client()
+    headers = {'X-API-Key': API_KEY}
+
+    first = client.get('/v1/registrations?page=1', headers=headers)
+    etag = first.headers['ETag']
+    second = client.get(
+        '/v1/registrations?page=1', headers={**headers, 'If-None-Match': etag}
+    )
+    other = client.get(
+        '/v1/registrations?page=2', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, max-age=60, must-revalidate'
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert other.status_code == 200
+
+
+def test_detail_route_honours_if_modified_since(app):
+    """Test that detail routes answer If-Modified-Since from updated_at."""
+    client = app.test_client()
+    headers = {'X-API-Key': API_KEY}
+
+    first = client.get('/v1/registrations/R1', headers=headers)
+    last_modified = first.headers['Last-Modified']
+    second = client.get(
+        '/v1/registrations/R1', headers={**headers, 'If-Modified-Since': last_modified}
+    )
+    stale = client.get(
+        '/v1/registrations/R1',
+        headers={**headers, 'If-Modified-Since': 'Sun, 01 Jun 2025 12:30:14 GMT'},
+    )
+
+    assert first.status_code == 200
+    assert last_modified == 'Sun, 01 Jun 2025 12:30:15 GMT'
+    assert second.status_code == 304
+    assert stale.status_code == 200
+
+
+def test_data_version_bump_changes_the_etag(app):
+    """Test that collection ETags change when the registrations data changes."""
+    from app.core.cache import bump_data_version
+
+    client = app.test_client()
+    headers = {'X-API-Key': API_KEY}
+    etag = client.get('/v1/registrations', headers=headers).headers['ETag']
+
+    with app.app_context():
+        bump_data_version('registrations')
+    response = client.get(
+        '/v1/registrations', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_unauthenticated_requests_skip_validators(app, monkeypatch):
+    """Test that requests without a valid API key read no validators."""
+    reads = []
+    monkeypatch.setattr(
+        'app.middleware.conditional.get_data_version',
+        lambda namespace: reads.append(namespace),
+    )
+    monkeypatch.setattr(
+        'app.services.registration_service.get_registration',
+        lambda registration_id: reads.append(registration_id),
+    )
+    client = app.test_client()
+
+    responses = [
+        client.get('/v1/registrations'),
+        client.get('/v1/registrations/R1', headers={'X-API-Key': 'wrong'}),
+    ]
+
+    assert [r.status_code for r in responses] == [401, 401]
+    assert 'ETag' not in responses[0].headers
+    assert reads == []
+
+
+def test_advise_indexes_reads_shapes_recorded_by_requests(app, monkeypatch):
+    """Test that ``flask advise-indexes`` suggests indexes for API traffic."""
+    monkeypatch.setattr(
+        'backend.app.core.query_profiler.settings.QUERY_PROFILING', True
+    )
+    client = app.test_client()
+    for _ in range(3):
+        response = client.get(
+            '/v1/registrations/search?status=Active', headers={'X-API-Key': API_KEY}
+        )
+        assert response.status_code == 200
+
+    result = app.test_cli_runner().invoke(args=['advise-indexes', '--min-count', '1'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Suggested indexes:' in result.output
+    assert '[status 1, ' in result.output
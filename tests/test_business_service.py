@@ -0,0 +1,165 @@
+"""
+Tests for the business list and search caches.
+
+``BusinessService`` caches the ordered IDs of each page and hydrates them
+from per-ID entries. These tests run it against mongomock behind a small
+async adapter and fakeredis, and are skipped when either (or the service's
+database module) is not available.
+"""
+
+import asyncio
+
+import pytest
+from bson import ObjectId
+from flask import Flask, current_app
+
+mongomock = pytest.importorskip('mongomock')
+fakeredis = pytest.importorskip('fakeredis')
+# Imported through ``app`` so cached models are revived by the codecs
+business_service = pytest.importorskip('app.services.business_service')
+
+
+class _AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def skip(self, count):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def max_time_ms(self, ms):
+        return self
+
+    async def _iterate(self):
+        for doc in self._cursor:
+            # BusinessInDB keeps its id as a string
+            yield dict(doc, _id=str(doc['_id']))
+
+    def __aiter__(self):
+        return self._iterate()
+
+
+class _AsyncCollection:
+    """The subset of a Motor collection that BusinessService uses."""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.name = collection.name
+        self.finds = []
+
+    def find(self, filter=None, *args, **kwargs):
+        self.finds.append(filter)
+        return _AsyncCursor(self._collection.find(filter, *args, **kwargs))
+
+    async def find_one(self, filter):
+        doc = self._collection.find_one(filter)
+        return dict(doc, _id=str(doc['_id'])) if doc else None
+
+    async def insert_one(self, doc):
+        return self._collection.insert_one(doc)
+
+    async def delete_one(self, filter):
+        return self._collection.delete_one(filter)
+
+
+def _business(name):
+    return {
+        '_id': ObjectId(),
+        'name': name,
+        'category': 'retail',
+        'status': 'active',
+        'address': '1 Main St',
+        'city': 'Hartford',
+        'state': 'CT',
+        'zip_code': '06103',
+    }
+
+
+@pytest.fixture
+def service():
+    app = Flask(__name__)
+    app.extensions['redis'] = fakeredis.FakeRedis()
+    collection = mongomock.MongoClient().db.businesses
+    collection.insert_many([_business(f'Acme {i}') for i in range(3)])
+
+    svc = business_service.BusinessService(db={'businesses': None})
+    svc.collection = _AsyncCollection(collection)
+    with app.app_context():
+        yield svc
+
+
+def _redis():
+    return current_app.extensions['redis']
+
+
+def _count_mgets(monkeypatch):
+    calls = []
+    mget = _redis().mget
+    monkeypatch.setattr(
+        _redis(), 'mget', lambda keys: calls.append(list(keys)) or mget(keys)
+    )
+    return calls
+
+
+def test_cached_page_hydrates_with_one_mget(service, monkeypatch):
+    """Test that a cached page is served from per-ID entries without a query."""
+    first = asyncio.run(service.list_businesses(limit=10))
+    service.collection.finds.clear()
+    mgets = _count_mgets(monkeypatch)
+
+    second = asyncio.run(service.list_businesses(limit=10))
+
+    assert [b.id for b in second] == [b.id for b in first]
+    assert len(mgets) == 1 and len(mgets[0]) == 3
+    assert service.collection.finds == []
+
+
+def test_partial_miss_loads_the_rest_with_one_query(service):
+    """Test that entities missing from the cache are loaded with one $in."""
+    page = asyncio.run(service.list_businesses(limit=10))
+    evicted = page[1].id
+    _redis().delete(business_service.cache_key('business', evicted))
+    service.collection.finds.clear()
+
+    again = asyncio.run(service.list_businesses(limit=10))
+
+    assert [b.id for b in again] == [b.id for b in page]
+    assert service.collection.finds == [{'_id': {'$in': [ObjectId(evicted)]}}]
+    assert _redis().exists(business_service.cache_key('business', evicted))
+
+
+def test_deleted_business_is_skipped_and_lists_are_invalidated(service):
+    """Test that deletes drop cached lists and a stale ID is skipped on hydration."""
+    page = asyncio.run(service.list_businesses(limit=10))
+    asyncio.run(service.search_businesses('Acme'))
+    gone = page[0].id
+
+    # Removed behind the cache's back: the cached ID list still names it
+    service.collection._collection.delete_one({'_id': ObjectId(gone)})
+    _redis().delete(business_service.cache_key('business', gone))
+    assert [b.id for b in asyncio.run(service.list_businesses(limit=10))] == [
+        b.id for b in page[1:]
+    ]
+
+    assert _redis().keys('list_businesses:*') and _redis().keys('search_businesses:*')
+    assert asyncio.run(service.delete_business(page[1].id))
+    assert _redis().keys('list_businesses:*') == []
+    assert _redis().keys('search_businesses:*') == []
+
+
+def test_create_invalidates_cached_lists(service):
+    """Test that creating a business drops cached list and search pages."""
+    asyncio.run(service.list_businesses(limit=10))
+    asyncio.run(service.search_businesses('Acme'))
+
+    data = {k: v for k, v in _business('Acme 9').items() if k != '_id'}
+    assert _redis().keys('list_businesses:*') and _redis().keys('search_businesses:*')
+    asyncio.run(service.create_business(business_service.BusinessCreate(**data)))
+
+    assert _redis().keys('list_businesses:*') == []
+    assert _redis().keys('search_businesses:*') == []
+    assert len(asyncio.run(service.list_businesses(limit=10))) == 4
@@ -0,0 +1,315 @@
+"""
+Tests for the BizFindr Redis cache utilities.
+"""
+
+from datetime import datetime, date
+
+import pytest
+from bson import ObjectId
+
+from backend.app.core.cache_keys import function_key, make_key
+from backend.app.core.cache_stats import HIT, MISS, CacheStats, key_prefix
+from backend.app.core.circuit_breaker import CircuitBreaker
+from backend.app.core.codecs import MISSING, CodecError, ValueSerializer
+from backend.app.core.disk_cache import DiskCache
+
+SAMPLE_VALUE = {
+    'registration_id': 'CT12345678',
+    'date_registration': datetime(2025, 6, 1, 12, 30, 0),
+    'filing_date': date(2025, 6, 1),
+    '_id': ObjectId('507f1f77bcf86cd799439011'),
+    'tags': ['retail', 'b2b'],
+    'notes': None,
+}
+
+
+@pytest.mark.parametrize('codec', ['json', 'msgpack', 'orjson'])
+def test_codec_round_trip(codec):
+    """Test that extension types survive a round trip through each codec."""
+    serializer = ValueSerializer(codec=codec, compression='none')
+
+    data = serializer.dumps(SAMPLE_VALUE)
+
+    assert data[0] & 0x80
+    assert serializer.loads(data) == SAMPLE_VALUE
+
+
+def test_compression_threshold():
+    """Test that only payloads above the threshold are compressed."""
+    serializer = ValueSerializer(codec='msgpack', compression='zlib', threshold=1024)
+
+    small = serializer.dumps({'name': 'Acme'})
+    large = serializer.dumps({'names': ['Acme Corporation'] * 500})
+
+    assert (small[0] >> 4) & 0x07 == 0
+    assert (large[0] >> 4) & 0x07 == 1
+    assert serializer.loads(large) == {'names': ['Acme Corporation'] * 500}
+
+
+def test_codec_migration():
+    """Test that values written by another codec are still readable."""
+    old = ValueSerializer(codec='json', compression='none')
+    new = ValueSerializer(codec='msgpack', compression='zlib')
+
+    assert new.loads(old.dumps(SAMPLE_VALUE)) == SAMPLE_VALUE
+    # Values cached before the header byte was introduced
+    assert new.loads(b'{"count": 3}') == {'count': 3}
+
+
+def test_missing_sentinel_round_trip():
+    """Test that negative cache entries decode to the MISSING sentinel."""
+    serializer = ValueSerializer(codec='msgpack')
+
+    data = serializer.dumps(MISSING)
+
+    assert serializer.loads(data) is MISSING
+    assert serializer.loads(serializer.dumps(None)) is None
+
+
+def test_unserializable_value():
+    """Test that unsupported types raise a CodecError."""
+    serializer = ValueSerializer(codec='msgpack')
+
+    with pytest.raises(CodecError):
+        serializer.dumps({'value': object()})
+
+
+class _Service:
+    def get_business(self, business_id):
+        pass
+
+    def list_businesses(self, skip=0, limit=100, filters=None):
+        pass
+
+
+def test_function_key_skips_self():
+    """Test that method keys do not depend on the instance."""
+    first = function_key('business', _Service.get_business, (_Service(), 'abc'), {})
+    second = function_key(
+        'business', _Service.get_business, (_Service(),), {'business_id': 'abc'}
+    )
+
+    assert first == second == 'business:abc'
+
+
+def test_function_key_canonical_arguments():
+    """Test that equivalent arguments produce the same key."""
+    method = _Service.list_businesses
+    positional = function_key(
+        'list',
+        method,
+        (_Service(), 0, 20, {'status': 'active', 'city': 'Hartford'}),
+        {},
+    )
+    keyword = function_key(
+        'list',
+        method,
+        (_Service(),),
+        {
+            'filters': {'city': 'Hartford', 'status': 'active'},
+            'limit': '20',
+        },
+    )
+
+    assert positional == keyword
+
+
+def test_distinct_arguments_never_share_a_key():
+    """Test that separators, escapes and types in arguments cannot collide."""
+    method = _Service.list_businesses
+    keys = [
+        function_key('s', method, (_Service(), 'a:', 'b'), {}),
+        function_key('s', method, (_Service(), 'a', ':b'), {}),
+        function_key('s', method, (_Service(), 'a\\', ':b'), {}),
+        function_key('s', method, (_Service(), 'a\\:', 'b'), {}),
+        make_key('s', True),
+        make_key('s', 'true'),
+        make_key('s', '\\true'),
+        make_key('s', {'a': True}),
+        make_key('s', {'a': 'true'}),
+        make_key('s', '{"a":"true"}'),
+        make_key('s', ['a', 'b']),
+        make_key('s', 'a', 'b'),
+        make_key('s', None),
+        make_key('s', ''),
+        make_key('s', {'a': 1}),
+        make_key('s', a=1),
+    ]
+
+    assert len(set(keys)) == len(keys)
+    assert make_key('s', 'a:b') == 's:a\\:b'
+
+
+def test_long_keys_are_hashed():
+    """Test that keys over the length limit are hashed but keep their prefix."""
+    key = make_key('search_businesses', 'acme ' * 100)
+
+    assert key.hashed
+    assert key.startswith('search_businesses:#')
+    assert key.raw.startswith('search_businesses:acme')
+    assert len(key) < len(key.raw)
+
+
+def test_circuit_breaker_trips_and_recovers(monkeypatch):
+    """Test that the breaker opens after repeated failures and probes once."""
+    now = [1000.0]
+    monkeypatch.setattr(
+        'backend.app.core.circuit_breaker.time.monotonic', lambda: now[0]
+    )
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=10)
+
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    # After the cool-down a single probe is allowed through
+    now[0] += 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+
+def test_circuit_breaker_failed_probe_reopens(monkeypatch):
+    """Test that a failed half-open probe opens the breaker again."""
+    now = [1000.0]
+    monkeypatch.setattr(
+        'backend.app.core.circuit_breaker.time.monotonic', lambda: now[0]
+    )
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=5)
+
+    breaker.record_failure()
+    now[0] += 5
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+
+def test_disk_cache_expiry(tmp_path, monkeypatch):
+    """Test that disk cache entries expire after their timeout."""
+    now = [1000.0]
+    monkeypatch.setattr('backend.app.core.disk_cache.time.time', lambda: now[0])
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'), max_bytes=1024)
+
+    disk.set('dashboard_stats', b'value', 60)
+    assert disk.get('dashboard_stats') == b'value'
+
+    now[0] += 60
+    assert disk.get('dashboard_stats') is None
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    """Test that the disk cache stays under its size limit, evicting by last access."""
+    now = [1000.0]
+    monkeypatch.setattr('backend.app.core.disk_cache.time.time', lambda: now[0])
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'), max_bytes=300)
+
+    for key in ('a', 'b', 'c'):
+        disk.set(key, b'x' * 100, 3600)
+        now[0] += 100
+    # Reading 'a' makes 'b' the least recently used entry
+    assert disk.get('a') is not None
+
+    disk.set('d', b'x' * 100, 3600)
+
+    assert disk.get('b') is None
+    assert disk.get('a') is not None
+    assert disk.get('d') is not None
+
+
+def test_persisted_entries_survive_redis_loss(tmp_path, monkeypatch):
+    """Test that versioned disk entries are served after Redis is flushed or down."""
+    mongomock = pytest.importorskip('mongomock')
+    fakeredis = pytest.importorskip('fakeredis')
+    from flask import Flask
+    from backend.app.core import cache
+
+    app = Flask(__name__)
+    app.db = mongomock.MongoClient().db
+    app.extensions['redis'] = fakeredis.FakeRedis()
+    disk = DiskCache(str(tmp_path / 'cache.sqlite3'), max_bytes=1024 * 1024)
+    monkeypatch.setattr(cache, 'get_disk_cache', lambda: disk)
+    monkeypatch.setattr(cache, '_data_versions', {})
+    monkeypatch.setattr(cache.settings, 'CACHE_VERSION_CHECK_INTERVAL', 0)
+
+    calls = []
+
+    @cache.cached(key_prefix='stats', versioned='registrations', persist=True)
+    def get_stats():
+        calls.append(1)
+        return {'total': len(calls)}
+
+    with app.app_context():
+        assert get_stats() == {'total': 1}
+
+        # A Redis restart loses the counter and every entry
+        app.extensions['redis'].flushall()
+        assert get_stats() == {'total': 1}
+
+        app.extensions['redis'] = None
+        assert get_stats() == {'total': 1}
+
+        # Ingestion while Redis is down still invalidates the disk entry
+        cache.bump_data_version('registrations')
+        assert get_stats() == {'total': 2}
+
+    assert len(calls) == 2
+
+
+def test_bump_while_redis_is_down_reaches_other_processes(monkeypatch):
+    """Test that a bump made only in Mongo is picked up by every process's next read."""
+    mongomock = pytest.importorskip('mongomock')
+    fakeredis = pytest.importorskip('fakeredis')
+    from flask import Flask
+    from backend.app.core import cache
+
+    app = Flask(__name__)
+    app.db = mongomock.MongoClient().db
+    redis_conn = app.extensions['redis'] = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, '_data_versions', {})
+    monkeypatch.setattr(cache.settings, 'CACHE_VERSION_CHECK_INTERVAL', 0)
+
+    with app.app_context():
+        version = cache.get_data_version('registrations')
+        reader_memo = dict(cache._data_versions)
+
+        # Another process bumps while Redis is unreachable
+        cache._data_versions.clear()
+        app.extensions['redis'] = None
+        assert cache.bump_data_version('registrations') == version + 1
+
+        # The reader only knows the old version, as does Redis
+        app.extensions['redis'] = redis_conn
+        cache._data_versions.clear()
+        cache._data_versions.update(reader_memo)
+        assert cache.get_data_version('registrations') == version + 1
+
+        # A process starting afresh sees it too, and later bumps continue from it
+        cache._data_versions.clear()
+        assert cache.get_data_version('registrations') == version + 1
+        assert int(redis_conn.get('data_version:registrations')) == version + 1
+        assert cache.bump_data_version('registrations') == version + 2
+
+
+def test_cache_stats_per_prefix():
+    """Test that cache statistics are grouped by key prefix."""
+    stats = CacheStats()
+    stats.record_get(key_prefix(make_key('registration', 'CT1')), HIT, 0.001)
+    stats.record_get(key_prefix(make_key('registration', 'CT2')), MISS, 0.003)
+    stats.record_set(key_prefix(make_key('registration', 'CT2')), 2048, 0.002)
+    stats.record_get(key_prefix('search_businesses:acme'), MISS, 0.001)
+
+    snapshot = stats.snapshot()
+
+    assert set(snapshot) == {'registration', 'search_businesses'}
+    assert snapshot['registration']['hit_ratio'] == 0.5
+    assert snapshot['registration']['avg_get_ms'] == 2.0
+    assert snapshot['registration']['max_value_bytes'] == 2048
+    assert snapshot['search_businesses']['hits'] == 0
@@ -0,0 +1,143 @@
+"""
+Tests for the index advisor.
+
+The end-to-end test records query shapes in fakeredis and reads indexes
+from mongomock; it is skipped when either is not installed.
+"""
+
+import pytest
+from flask import Flask
+
+from backend.app.core.counts import count_matching
+from backend.app.core.index_advisor import advise, index_serves, recommend_index
+from backend.app.core.indexes import REGISTRATION_INDEXES
+from backend.app.core.pagination import paginate
+from backend.app.core.query_profiler import get_query_shape_stats, query_shape
+
+DATE_SORT = [('date_registration', -1), ('registration_id', -1)]
+
+
+def test_recommendation_puts_equality_then_sort_then_range():
+    """Test that recommended keys follow the equality, sort, range rule."""
+    shape = query_shape(
+        {
+            'status': 'Active',
+            'business_name': {'$regex': '^Acme'},
+            'business_type': 'LLC',
+            'date_registration': {'$gte': 1},
+        },
+        DATE_SORT,
+    )
+
+    assert recommend_index(shape) == {
+        'keys': [
+            ('business_type', 1),
+            ('status', 1),
+            ('date_registration', -1),
+            ('registration_id', -1),
+            ('business_name', 1),
+        ],
+        'equality': 2,
+        'sort': 2,
+    }
+
+    # A cursor page adds a range on the sort fields, which changes nothing
+    cursor_page = query_shape(
+        {
+            '$and': [
+                {'status': 'Active'},
+                {
+                    '$or': [
+                        {'date_registration': {'$lt': 1}},
+                        {'date_registration': 1, 'registration_id': {'$lt': 'R1'}},
+                    ]
+                },
+            ]
+        },
+        DATE_SORT,
+    )
+    assert recommend_index(cursor_page)['keys'] == [
+        ('status', 1),
+        ('date_registration', -1),
+        ('registration_id', -1),
+    ]
+    assert recommend_index(query_shape({'$text': {'$search': 'x'}}, DATE_SORT)) is None
+
+
+def test_index_serves_reversed_sorts_and_prefixes():
+    """Test that an index serves shapes on its prefix, scanned in either direction."""
+    index = [('status', 1), ('date_registration', -1), ('registration_id', -1)]
+    wanted = recommend_index(
+        query_shape({'status': 'x'}, [('date_registration', 1), ('registration_id', 1)])
+    )
+    assert index_serves(index, wanted)
+    assert index_serves(index, recommend_index(query_shape({'status': 'x'})))
+
+    mixed = recommend_index(
+        query_shape(
+            {'status': 'x'}, [('date_registration', 1), ('registration_id', -1)]
+        )
+    )
+    assert not index_serves(index, mixed)
+    assert not index_serves(
+        index, recommend_index(query_shape({'business_type': 'x'}, DATE_SORT))
+    )
+
+
+def test_advisor_uses_recorded_shapes(monkeypatch):
+    """Test that recorded traffic is split into served shapes and suggested indexes."""
+    mongomock = pytest.importorskip('mongomock')
+    fakeredis = pytest.importorskip('fakeredis')
+    redis_conn = fakeredis.FakeRedis()
+    # paginate records through app.core, the test reads through backend.app.core
+    monkeypatch.setattr('app.core.query_profiler.get_cache', lambda: redis_conn)
+    monkeypatch.setattr('backend.app.core.query_profiler.get_cache', lambda: redis_conn)
+    monkeypatch.setattr(
+        'backend.app.core.query_profiler.settings.QUERY_PROFILING', True
+    )
+    monkeypatch.setattr(
+        'backend.app.core.query_profiler.settings.SLOW_QUERY_MS', 10**6
+    )
+
+    db = mongomock.MongoClient().db
+    db.registrations.create_indexes(REGISTRATION_INDEXES)
+    db.registrations.insert_many(
+        [{'registration_id': f'R{i}', 'status': 'Active'} for i in range(3)]
+    )
+
+    with Flask(__name__).app_context():
+        for status in ('Active', 'Closed'):
+            paginate(
+                db.registrations, {'status': status}, 'date_registration', 'desc', 2
+            )
+        count_matching(db.registrations, {'address.city': 'Hartford'})
+        paginate(
+            db.registrations,
+            {'address.city': 'Hartford', 'status': 'Active'},
+            'business_name',
+            'asc',
+            2,
+        )
+        stats = get_query_shape_stats(days=1)
+
+    assert {(stat['count'], tuple(stat['shape']['filter'])) for stat in stats} == {
+        (2, ('status',)),
+        (1, ('address.city',)),
+        (1, ('address.city', 'status')),
+    }
+
+    report = advise(db.registrations, stats)
+    assert [entry['count'] for entry in report['served']] == [2]
+    # The city-only count folds into the index suggested for city and status
+    assert [(entry['keys'], entry['count']) for entry in report['suggested']] == [
+        (
+            [
+                ('address.city', 1),
+                ('status', 1),
+                ('business_name', 1),
+                ('registration_id', 1),
+            ],
+            2,
+        ),
+    ]
+    assert advise(db.registrations, stats, min_count=2)['suggested'] == []
@@ -0,0 +1,131 @@
+"""
+Tests for keyset (cursor) pagination.
+
+These page through a mongomock collection and are skipped when it is not
+installed.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app.core import counts
+from backend.app.core.pagination import InvalidCursor, encode_cursor, paginate
+
+mongomock = pytest.importorskip('mongomock')
+
+
+@pytest.fixture
+def registrations():
+    collection = mongomock.MongoClient().db.registrations
+    start = datetime(2024, 1, 1)
+    # Several rows share each date so the registration_id tie-breaker matters
+    collection.insert_many(
+        [
+            {
+                'registration_id': f'R{i:03d}',
+                'date_registration': start + timedelta(days=i // 3),
+            }
+            for i in range(25)
+        ]
+    )
+    collection.insert_one({'registration_id': 'R999', 'date_registration': None})
+    return collection
+
+
+def _walk(collection, order, per_page=4):
+    ids, cursor, pages = [], None, []
+    while True:
+        page = paginate(
+            collection, {}, 'date_registration', order, per_page, cursor=cursor
+        )
+        ids.extend(row['registration_id'] for row in page['data'])
+        pages.append(page)
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_cursor_walk_matches_offset_order(registrations, order):
+    """Test that following next_cursor visits every row once, in sort order."""
+    ids, _ = _walk(registrations, order)
+
+    direction = 1 if order == 'asc' else -1
+    expected = [
+        row['registration_id']
+        for row in registrations.find({}, {'_id': 0}).sort(
+            [('date_registration', direction), ('registration_id', direction)]
+        )
+    ]
+    assert ids == expected
+
+
+def test_prev_cursor_returns_the_previous_page(registrations):
+    """Test that prev_cursor goes back to exactly the page before."""
+    _, pages = _walk(registrations, 'desc')
+    assert pages[0]['prev_cursor'] is None
+
+    back = paginate(
+        registrations,
+        {},
+        'date_registration',
+        'desc',
+        4,
+        cursor=pages[3]['prev_cursor'],
+    )
+    assert back['data'] == pages[2]['data']
+    assert back['next_cursor'] and back['prev_cursor']
+
+
+def test_cursor_is_tied_to_its_sort(registrations):
+    """Test that cursors for another sort, garbage and deep pages are rejected."""
+    token = encode_cursor(
+        {'registration_id': 'R001', 'date_registration': None},
+        'date_registration',
+        'asc',
+    )
+    with pytest.raises(InvalidCursor):
+        paginate(registrations, {}, 'date_registration', 'desc', 4, cursor=token)
+    with pytest.raises(InvalidCursor):
+        paginate(
+            registrations, {}, 'date_registration', 'desc', 4, cursor='not-a-cursor'
+        )
+    with pytest.raises(InvalidCursor):
+        paginate(
+            registrations, {}, 'date_registration', 'desc', 4, page=10, max_skip=20
+        )
+
+
+def test_count_strategies(registrations, monkeypatch):
+    """Test that counts use metadata, the cache or nothing, and say which."""
+    store = {}
+    monkeypatch.setattr(counts, 'get_cache', object)
+    monkeypatch.setattr(counts, 'get_data_version', lambda namespace: 7)
+    monkeypatch.setattr(counts, 'cache_get', store.get)
+    monkeypatch.setattr(
+        counts, 'cache_set', lambda key, value, timeout: store.__setitem__(key, value)
+    )
+
+    assert counts.count_matching(registrations, {}) == (26, counts.ESTIMATED)
+    assert counts.count_matching(registrations, {'date_registration': None}) == (
+        1,
+        counts.EXACT,
+    )
+
+    query = {'registration_id': {'$gte': 'R020'}}
+    assert counts.count_matching(registrations, query, namespace='registrations') == (
+        6,
+        counts.CACHED,
+    )
+    registrations.delete_many(query)
+    # Same data version, so the cached total is reused
+    assert counts.count_matching(registrations, query, namespace='registrations') == (
+        6,
+        counts.CACHED,
+    )
+
+    assert counts.count_matching(registrations, query, mode=counts.HAS_MORE) == (
+        None,
+        counts.HAS_MORE,
+    )
@@ -0,0 +1,89 @@
+"""
+Tests for the search query compiler.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from backend.app.core.query import (
+    ValidationError,
+    compile_business_query,
+    compile_registration_query,
+)
+
+
+def test_registration_filters_compile_to_typed_predicates():
+    """Test that dates, status, type and name become typed, anchored predicates."""
+    compiled = compile_registration_query(
+        q=' acme ',
+        business_type='LLC',
+        status='active',
+        date_from='2024-01-01',
+        date_to='2024-01-31',
+        name='A.B (',
+        max_time_ms=250,
+    )
+
+    assert compiled.filter == {
+        '$text': {'$search': 'acme'},
+        'business_type': 'LLC',
+        'status': 'Active',
+        'business_name': {'$regex': r'^A\.B\ \('},
+        'date_registration': {
+            '$gte': datetime(2024, 1, 1),
+            '$lt': datetime(2024, 2, 1),
+        },
+    }
+    assert compiled.max_time_ms == 250
+    assert compile_registration_query(status='', name=None).filter == {}
+
+
+def test_invalid_filters_are_reported_per_parameter():
+    """Test that every invalid parameter is listed in the ValidationError."""
+    with pytest.raises(ValidationError) as info:
+        compile_registration_query(date_from='2024-02-01', date_to='2024-01-01')
+    assert set(info.value.errors) == {'date_to'}
+
+    with pytest.raises(ValidationError) as info:
+        compile_registration_query(date_from='01/02/2024', name='x' * 201)
+    assert set(info.value.errors) == {'date_from', 'name'}
+
+    with pytest.raises(ValidationError) as info:
+        compile_business_query(status='open', category='retail')
+    assert set(info.value.errors) == {'status'}
+
+
+def test_business_search_text_is_matched_literally():
+    """Test that business search text cannot inject a regex."""
+    compiled = compile_business_query(q='a+b', category='Retail')
+
+    assert compiled.filter['$or'][0] == {'name': {'$regex': r'a\+b', '$options': 'i'}}
+    assert compiled.filter['category'] == 'retail'
+
+
+def test_date_bounds_match_stored_datetimes():
+    """Test that the compiled date range selects whole days of datetime values."""
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().db.registrations
+    collection.insert_many(
+        [
+            {
+                'registration_id': 'R1',
+                'date_registration': datetime(2023, 12, 31, 23, 59),
+            },
+            {'registration_id': 'R2', 'date_registration': datetime(2024, 1, 1)},
+            {
+                'registration_id': 'R3',
+                'date_registration': datetime(2024, 1, 31, 18, 30, 0, 500),
+            },
+            {'registration_id': 'R4', 'date_registration': datetime(2024, 2, 1)},
+        ]
+    )
+
+    compiled = compile_registration_query(date_from='2024-01-01', date_to='2024-01-31')
+    found = compiled.find(collection, {'_id': 0, 'registration_id': 1}).sort(
+        'registration_id', 1
+    )
+
+    assert [row['registration_id'] for row in found] == ['R2', 'R3']
@@ -0,0 +1,153 @@
+"""
+Tests for query profiling and the slow query log.
+
+The logging tests run against mongomock and are skipped when it is not
+installed.
+"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.core import query_profiler
+from backend.app.core.pagination import paginate
+
+
+def test_query_shape_drops_values():
+    """Test that shapes keep fields, operators and sort but not values."""
+    first = query_profiler.query_shape(
+        {
+            'status': 'Active',
+            'date_registration': {
+                '$lt': datetime(2024, 1, 1),
+                '$gte': datetime(2023, 1, 1),
+            },
+            'registration_id': {'$in': ['R1', 'R2', 'R3']},
+        },
+        [('date_registration', -1), ('registration_id', -1)],
+    )
+    second = query_profiler.query_shape(
+        {
+            'registration_id': {'$in': ['R9']},
+            'date_registration': {
+                '$gte': datetime(2020, 5, 1),
+                '$lt': datetime(2021, 1, 1),
+            },
+            'status': 'Closed',
+        },
+        [('date_registration', -1), ('registration_id', -1)],
+    )
+
+    assert first == second
+    assert first['filter'] == {
+        'date_registration': {'$gte': '?', '$lt': '?'},
+        'registration_id': {'$in': ['?']},
+        'status': '?',
+    }
+    assert query_profiler.shape_key(first) == query_profiler.shape_key(second)
+
+
+def test_explain_summarizes_execution_stats():
+    """Test that explain output is reduced to examined counts and plan stages."""
+    commands = []
+    result = {
+        'queryPlanner': {
+            'winningPlan': {
+                'stage': 'LIMIT',
+                'inputStage': {
+                    'stage': 'FETCH',
+                    'inputStage': {'stage': 'IXSCAN', 'indexName': 'status_1'},
+                },
+            }
+        },
+        'executionStats': {
+            'totalDocsExamined': 21,
+            'totalKeysExamined': 21,
+            'nReturned': 21,
+            'executionTimeMillis': 3,
+        },
+    }
+    database = SimpleNamespace(
+        command=lambda *args, **kwargs: commands.append((args, kwargs)) or result
+    )
+    collection = SimpleNamespace(name='registrations', database=database)
+
+    summary = query_profiler.explain(
+        collection,
+        query_profiler.FIND,
+        {'status': 'Active'},
+        [('date_registration', -1)],
+        limit=21,
+    )
+
+    assert summary == {
+        'docs_examined': 21,
+        'keys_examined': 21,
+        'returned': 21,
+        'execution_ms': 3,
+        'plan': ['LIMIT', 'FETCH', 'IXSCAN(status_1)'],
+    }
+    assert commands == [
+        (
+            (
+                'explain',
+                {
+                    'find': 'registrations',
+                    'filter': {'status': 'Active'},
+                    'sort': {'date_registration': -1},
+                    'limit': 21,
+                },
+            ),
+            {'verbosity': 'executionStats'},
+        )
+    ]
+
+
+def test_slow_queries_are_logged_and_grouped_by_shape(monkeypatch):
+    """Test that queries over the threshold are logged and grouped by shape."""
+    mongomock = pytest.importorskip('mongomock')
+    db = mongomock.MongoClient().db
+    db.registrations.insert_many(
+        [
+            {
+                'registration_id': f'R{i}',
+                'status': 'Active',
+                'date_registration': datetime(2024, 1, 1),
+            }
+            for i in range(5)
+        ]
+    )
+
+    # mongomock cannot create capped collections
+    monkeypatch.setattr(
+        'app.core.query_profiler.ensure_slow_query_log', lambda db: None
+    )
+
+    # Nothing is recorded unless profiling is enabled
+    monkeypatch.setattr('backend.app.core.query_profiler.settings.SLOW_QUERY_MS', 0)
+    paginate(db.registrations, {'status': 'Active'}, 'date_registration', 'desc', 2)
+    assert db.slow_queries.count_documents({}) == 0
+
+    monkeypatch.setattr(
+        'backend.app.core.query_profiler.settings.QUERY_PROFILING', True
+    )
+    for status in ('Active', 'Closed'):
+        paginate(db.registrations, {'status': status}, 'date_registration', 'desc', 2)
+    paginate(db.registrations, {}, 'date_registration', 'desc', 2)
+
+    entry = db.slow_queries.find_one({'query': {'$regex': 'Closed'}})
+    assert (entry['collection'], entry['operation']) == (
+        'registrations',
+        query_profiler.FIND,
+    )
+    assert entry['limit'] == 3
+
+    shapes = query_profiler.worst_query_shapes(db)
+    assert sorted(shape['count'] for shape in shapes) == [1, 2]
+    by_count = {shape['count']: shape for shape in shapes}
+    assert by_count[2]['shape']['filter'] == {'status': '?'}
+    assert by_count[2]['shape']['sort'] == [
+        ['date_registration', -1],
+        ['registration_id', -1],
+    ]
@@ -0,0 +1,173 @@
+"""
+Tests for the Redis rate limiter.
+
+These run the Lua scripts against fakeredis and are skipped when it is not
+installed.
+"""
+
+import threading
+import time
+
+import pytest
+
+from backend.app.core.local_rate_limiting import LocalRateLimiter
+from backend.app.core.rate_limiting import (
+    GCRA,
+    QUOTA_USAGE_KEY,
+    SLIDING_WINDOW,
+    charge_quota,
+    get_policy_for_endpoint,
+    is_rate_limited,
+    parse_rate_limit,
+)
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def redis_conn():
+    return fakeredis.FakeRedis()
+
+
+@pytest.mark.parametrize('algorithm', [SLIDING_WINDOW, GCRA])
+def test_limit_allows_burst_then_rejects(redis_conn, algorithm):
+    """Test that exactly `limit` requests are allowed in a burst."""
+    results = [
+        is_rate_limited(
+            'rate_limit:test',
+            limit=5,
+            period=60,
+            redis_conn=redis_conn,
+            algorithm=algorithm,
+        )
+        for _ in range(7)
+    ]
+
+    limited = [is_limited for is_limited, _ in results]
+    assert limited == [False] * 5 + [True] * 2
+
+    remaining = [int(headers['X-RateLimit-Remaining']) for _, headers in results]
+    assert remaining[:5] == [4, 3, 2, 1, 0]
+
+    _, headers = results[-1]
+    assert headers['X-RateLimit-Limit'] == '5'
+    assert 0 < int(headers['Retry-After']) <= 60
+    assert 'Retry-After' not in results[0][1]
+
+
+def test_sliding_window_counts_requests_in_the_same_millisecond(redis_conn):
+    """Test that concurrent requests get distinct members instead of collapsing."""
+    for _ in range(3):
+        is_rate_limited(
+            'rate_limit:burst',
+            limit=10,
+            period=60,
+            redis_conn=redis_conn,
+            algorithm=SLIDING_WINDOW,
+        )
+
+    assert redis_conn.zcard('rate_limit:burst') == 3
+
+
+def test_gcra_stores_constant_state(redis_conn):
+    """Test that GCRA keeps a single value per key."""
+    for _ in range(20):
+        is_rate_limited(
+            'rate_limit:gcra',
+            limit=100,
+            period=60,
+            redis_conn=redis_conn,
+            algorithm=GCRA,
+        )
+
+    assert redis_conn.type('rate_limit:gcra') == b'string'
+    assert 0 < redis_conn.pttl('rate_limit:gcra') <= 60000
+
+
+def test_local_buckets_never_exceed_the_global_limit(redis_conn):
+    """Test that workers leasing from one counter admit at most `limit` in total."""
+    workers = [
+        LocalRateLimiter(lambda: redis_conn, sync_interval=3600) for _ in range(3)
+    ]
+
+    allowed = 0
+    for i in range(150):
+        worker = workers[i % len(workers)]
+        is_limited, _ = worker.check('rate_limit:shared', limit=100, period=60)
+        allowed += not is_limited
+        if i % 10 == 0:
+            worker.sync()
+
+    assert 90 <= allowed <= 100
+    assert int(redis_conn.get('rate_limit:shared:lease')) <= 100
+
+
+def test_local_bucket_rejects_from_memory_once_exhausted(redis_conn):
+    """Test that an exhausted bucket does not go back to Redis until it resets."""
+    worker = LocalRateLimiter(lambda: redis_conn, sync_interval=3600)
+    for _ in range(2):
+        worker.check('rate_limit:small', limit=2, period=60)
+
+    is_limited, headers = worker.check('rate_limit:small', limit=2, period=60)
+    assert is_limited
+    assert 0 < int(headers['Retry-After']) <= 60
+
+    redis_conn.delete('rate_limit:small:lease')
+    assert worker.check('rate_limit:small', limit=2, period=60)[0]
+
+
+def test_concurrent_first_requests_share_one_bucket(redis_conn, monkeypatch):
+    """Test that tokens leased while others wait all land in the surviving bucket."""
+    worker = LocalRateLimiter(lambda: redis_conn, sync_interval=3600)
+    run_lease = worker._run_lease
+
+    def slow_lease(*args):
+        time.sleep(0.05)
+        return run_lease(*args)
+
+    monkeypatch.setattr(worker, '_run_lease', slow_lease)
+
+    def first_request():
+        results.append(worker.check('rate_limit:race', limit=100, period=60)[0])
+        worker.sync()
+
+    results = []
+    threads = [threading.Thread(target=first_request) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [False] * 10
+    bucket = worker._buckets['rate_limit:race']
+    assert int(redis_conn.get('rate_limit:race:lease')) == bucket.tokens + 10
+
+
+def test_policies_are_resolved_from_one_table():
+    """Test that endpoints map to the declared policies and limit strings parse."""
+    assert get_policy_for_endpoint('api.v1_registration_search').name == 'search'
+    assert get_policy_for_endpoint('auth.login').strict
+    assert get_policy_for_endpoint('main.index').name == 'public'
+
+    assert parse_rate_limit('100 per day') == (100, 86400)
+    assert parse_rate_limit('200/hour') == (200, 3600)
+    with pytest.raises(ValueError):
+        parse_rate_limit('lots')
+
+
+def test_quota_charges_by_cost_and_records_usage(redis_conn, monkeypatch):
+    """Test that expensive requests use up an API key's quota faster."""
+    monkeypatch.setattr(
+        'backend.app.core.rate_limiting.settings.API_KEY_QUOTA', '25 per minute'
+    )
+
+    results = [charge_quota('key1', 10, redis_conn=redis_conn)[0] for _ in range(3)]
+    assert results == [False, False, True]
+
+    # A cheap request still fits in what is left
+    is_limited, headers = charge_quota('key1', 1, redis_conn=redis_conn)
+    assert not is_limited
+    assert headers['X-RateLimit-Cost'] == '1'
+
+    usage = redis_conn.hgetall(QUOTA_USAGE_KEY.format(key_id='key1'))
+    assert sum(int(v) for v in usage.values()) == 21
@@ -0,0 +1,200 @@
+"""
+Tests for the registration service.
+
+These run against mongomock and fakeredis and are skipped when either is
+not installed.
+"""
+
+import json
+
+import pytest
+from flask import Flask
+
+from backend.app.services.cache_warmer import _warm_tasks
+from backend.app.services.export_service import (
+    CSV_COLUMNS,
+    export_registrations,
+    prepare_resume,
+)
+from backend.app.api import fields_mask, parse_fields
+from backend.app.core.indexes import REGISTRATION_INDEXES, SORT_OPTIONS
+from backend.app.services.registration_service import (
+    build_projection,
+    get_registration,
+    get_registrations,
+    list_registrations,
+    search_registrations,
+)
+
+mongomock = pytest.importorskip('mongomock')
+fakeredis = pytest.importorskip('fakeredis')
+
+
+@pytest.fixture
+def app(monkeypatch):
+    redis_conn = fakeredis.FakeRedis()
+    monkeypatch.setattr('app.core.cache.get_cache', lambda: redis_conn)
+
+    app = Flask(__name__)
+    app.extensions['redis'] = redis_conn
+    app.db = mongomock.MongoClient().db
+    app.db.registrations.insert_many(
+        [
+            {'registration_id': f'R{i}', 'business_name': f'Business {i}'}
+            for i in range(5)
+        ]
+    )
+    with app.app_context():
+        yield app
+
+
+def test_batch_lookup_uses_the_cache_then_one_query(app, monkeypatch):
+    """Test that batch lookups share per-ID cache entries and report misses."""
+    get_registration('R1')
+
+    queries = []
+    find = app.db.registrations.find
+    monkeypatch.setattr(
+        app.db.registrations,
+        'find',
+        lambda *args, **kwargs: queries.append(args[0]) or find(*args, **kwargs),
+    )
+
+    result = get_registrations(['R2', 'R1', 'unknown', 'R2'])
+
+    assert list(result) == ['R2', 'R1', 'unknown']
+    assert result['R1']['business_name'] == 'Business 1'
+    assert result['unknown'] is None
+    assert queries == [{'registration_id': {'$in': ['R2', 'unknown']}}]
+
+    # Everything, including the miss, is now cached
+    assert (
+        get_registrations(['R1', 'R2', 'unknown'])['R2']['business_name']
+        == 'Business 2'
+    )
+    assert len(queries) == 1
+
+
+def test_export_streams_in_batches_and_resumes(app, tmp_path, monkeypatch):
+    """Test that exports are chunked per batch and resume after the last full row."""
+    monkeypatch.setattr(
+        'backend.app.services.export_service.settings.EXPORT_BATCH_SIZE', 2
+    )
+
+    chunks = list(export_registrations('ndjson'))
+    assert [chunk.count('\n') for chunk in chunks] == [2, 2, 1]
+
+    partial = tmp_path / 'registrations.ndjson'
+    partial.write_text(''.join(chunks[:1]) + '{"registration_id": "R2", "busi')
+    cursor = prepare_resume(str(partial), 'ndjson')
+    assert partial.read_text() == chunks[0]
+
+    rest = ''.join(export_registrations('ndjson', cursor=cursor))
+    assert [json.loads(line)['registration_id'] for line in rest.splitlines()] == [
+        'R2',
+        'R3',
+        'R4',
+    ]
+
+    csv_rows = ''.join(export_registrations('csv', business_type='none')).splitlines()
+    assert csv_rows == [','.join(CSV_COLUMNS)]
+
+    # Quoted newlines in CSV are not row boundaries, including in the cut-off row
+    app.db.registrations.update_one(
+        {'registration_id': 'R1'},
+        {'$set': {'address': {'street': '1 Main St\nSuite 2'}}},
+    )
+    chunks = list(export_registrations('csv'))
+    partial = tmp_path / 'registrations.csv'
+    with open(partial, 'w', newline='') as f:
+        f.write(chunks[0] + 'R2,Business 2,,,,"2 Main St\nSuite')
+    cursor = prepare_resume(str(partial), 'csv')
+    assert partial.read_bytes().decode('utf-8') == chunks[0]
+
+    rest = ''.join(export_registrations('csv', cursor=cursor, header=False))
+    assert [row.split(',')[0] for row in rest.splitlines()] == ['R2', 'R3', 'R4']
+
+
+def test_sparse_fieldsets_are_validated_and_projected(app):
+    """Test that ?fields= is checked against the model and read as a projection."""
+    fields = parse_fields('business_name, address.city,address,registration_id')
+    assert fields == ['address', 'business_name', 'registration_id']
+    assert (
+        fields_mask(['address.city', 'business_name'])
+        == 'data{address{city},business_name},*'
+    )
+    with pytest.raises(ValueError):
+        parse_fields('business_name,_id')
+
+    projection = build_projection(['business_name'], 'date_registration')
+    assert projection == {
+        '_id': 0,
+        'business_name': 1,
+        'date_registration': 1,
+        'registration_id': 1,
+    }
+
+    page = list_registrations(per_page=2, fields=['business_name'])
+    assert all(set(row) == {'business_name', 'registration_id'} for row in page['data'])
+
+
+def test_sorts_are_whitelisted_and_indexed(app):
+    """Test that each allowed sort has an index per filter set; others are rejected."""
+    app.db.registrations.create_indexes(REGISTRATION_INDEXES)
+    keys = [
+        list(info['key']) for info in app.db.registrations.index_information().values()
+    ]
+    for sort, direction in SORT_OPTIONS.items():
+        for prefix in ([], ['business_type'], ['status'], ['business_type', 'status']):
+            expected = [(field, 1) for field in prefix] + [
+                (sort, direction),
+                ('registration_id', direction),
+            ]
+            assert any(key[: len(expected)] == expected for key in keys)
+
+    page = search_registrations(sort='business_name', order='asc', per_page=2)
+    assert page['data'][0]['registration_id'] == 'R0'
+    with pytest.raises(ValueError):
+        search_registrations(sort='status')
+
+
+def test_warmed_entries_are_hit_by_requests(app, monkeypatch):
+    """Test that the warmer fills the keys the list and search endpoints read."""
+    from app.core.cache import bump_data_version
+
+    monkeypatch.setattr(
+        'backend.app.services.cache_warmer.settings.CACHE_WARM_PAGES', 1
+    )
+    # Arguments as the API passes them, unset filters included
+    search_args = {
+        'q': '',
+        'business_type': None,
+        'status': None,
+        'date_from': None,
+        'date_to': None,
+        'name': 'Business',
+        'sort': 'date_registration',
+        'order': 'desc',
+        'page': 1,
+        'per_page': 20,
+        'cursor': None,
+        'count': 'auto',
+        'fields': parse_fields('registration_id,business_name'),
+    }
+    expected = search_registrations(**search_args)
+
+    # Ingestion makes every versioned entry unreachable, then warms
+    bump_data_version('registrations')
+    for _, func, kwargs in _warm_tasks():
+        func(**kwargs)
+
+    def no_queries(*args, **kwargs):
+        raise AssertionError('request missed the warmed cache')
+
+    monkeypatch.setattr(
+        'backend.app.services.registration_service.paginate', no_queries
+    )
+    assert search_registrations(**search_args) == expected
+    assert list_registrations(
+        page=1, per_page=20, cursor=None, count='auto', fields=None
+    )['data']
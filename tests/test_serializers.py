@@ -0,0 +1,68 @@
+"""
+Tests for the precompiled response serializers.
+"""
+
+from datetime import datetime
+
+import orjson
+import pytest
+from flask import Flask
+from flask_restx import marshal
+
+from backend.app.api import fields_mask, registration_list_model, search_results_model
+from backend.app.api.serializers import compile_serializer, json_response, serialize
+
+ROWS = [
+    {
+        'registration_id': 'R1',
+        'business_name': 'Acme',
+        'business_type': 'LLC',
+        'date_registration': datetime(2024, 5, 1, 12, 30),
+        'status': 'Active',
+        'address': {'street': '1 Main St', 'city': 'Hartford', 'zip': 6103},
+        'created_at': '2024-05-02T08:00:00',
+        'extra': 'not in the model',
+    },
+    {'registration_id': 'R2', 'business_name': None, 'address': None},
+    {'registration_id': 'R3'},
+]
+
+PAGE = {
+    'data': ROWS,
+    'pagination': {
+        'page': 1,
+        'per_page': 3,
+        'total_items': None,
+        'has_more': True,
+        'next_cursor': 'abc',
+    },
+    'meta': {'query': {'q': 'acme'}, 'total': 3},
+}
+
+
+@pytest.mark.parametrize('model', [registration_list_model, search_results_model])
+@pytest.mark.parametrize(
+    'fields', [None, ['business_name'], ['address.city', 'date_registration']]
+)
+def test_serializer_matches_marshal(model, fields):
+    """Test that compiled serializers return exactly what marshal does."""
+    mask = fields_mask(fields)
+    expected = marshal(PAGE, model, mask=mask)
+
+    assert serialize(PAGE, model, mask) == expected
+    assert list(serialize(PAGE, model, mask)['data'][0]) == list(expected['data'][0])
+    assert serialize([PAGE, {}], model, mask) == [
+        expected,
+        marshal({}, model, mask=mask),
+    ]
+    assert compile_serializer(model, mask) is compile_serializer(model, mask)
+
+
+def test_json_response_encodes_with_orjson():
+    """Test that responses carry the orjson encoding of the marshalled data."""
+    data = serialize(PAGE, registration_list_model)
+    with Flask(__name__).app_context():
+        response = json_response(data)
+
+    assert response.mimetype == 'application/json'
+    assert orjson.loads(response.get_data()) == data
@@ -0,0 +1,199 @@
+"""
+Tests for consistent-hash sharding of the Redis cache.
+
+The ``ShardedRedis`` tests start local ``redis-server`` processes and are
+skipped when it is not installed.
+"""
+
+import shutil
+import socket
+import subprocess
+import time
+
+import pytest
+import redis
+
+from backend.app.core.sharding import HashRing, ShardedRedis, ShardUnavailable
+
+KEYS = [f'registration:CT{i:08d}' for i in range(5000)]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope='module')
+def redis_nodes():
+    """Start three throwaway redis-server processes."""
+    if shutil.which('redis-server') is None:
+        pytest.skip('redis-server is not installed')
+
+    processes = []
+    urls = []
+    for _ in range(3):
+        port = _free_port()
+        processes.append(
+            subprocess.Popen(
+                [
+                    'redis-server',
+                    '--port',
+                    str(port),
+                    '--save',
+                    '',
+                    '--appendonly',
+                    'no',
+                ],
+                stdout=subprocess.DEVNULL,
+            )
+        )
+        urls.append(f'redis://127.0.0.1:{port}/0')
+
+    for url in urls:
+        client = redis.Redis.from_url(url)
+        for _ in range(50):
+            try:
+                client.ping()
+                break
+            except redis.ConnectionError:
+                time.sleep(0.1)
+
+    yield urls
+
+    for process in processes:
+        process.terminate()
+        process.wait()
+
+
+@pytest.fixture
+def sharded(redis_nodes):
+    client = ShardedRedis.from_urls(redis_nodes)
+    client.flushdb()
+    return client
+
+
+def test_hash_ring_spreads_keys_evenly():
+    """Test that virtual nodes give each node a similar share of keys."""
+    ring = HashRing(['a', 'b', 'c', 'd'])
+    counts = {}
+    for key in KEYS:
+        node = ring.get_node(key)
+        counts[node] = counts.get(node, 0) + 1
+
+    assert set(counts) == {'a', 'b', 'c', 'd'}
+    assert max(counts.values()) < 1.3 * len(KEYS) / 4
+
+
+def test_hash_ring_moves_few_keys_when_a_node_is_added():
+    """Test that adding a node only moves keys onto the new node."""
+    ring = HashRing(['a', 'b', 'c'])
+    before = {key: ring.get_node(key) for key in KEYS}
+
+    ring.add_node('d')
+    moved = [key for key in KEYS if ring.get_node(key) != before[key]]
+
+    assert all(ring.get_node(key) == 'd' for key in moved)
+    assert len(moved) < 0.35 * len(KEYS)
+
+    ring.remove_node('d')
+    assert all(ring.get_node(key) == before[key] for key in KEYS)
+
+
+def test_sharded_mget_and_pipeline(sharded):
+    """Test that MGET and pipelines are split per shard and keep key order."""
+    keys = KEYS[:50]
+    pipe = sharded.pipeline(transaction=False)
+    for index, key in enumerate(keys):
+        pipe.setex(key, 60, str(index))
+    assert pipe.execute() == [True] * len(keys)
+
+    values = sharded.mget(keys + ['registration:missing'])
+    assert values[:-1] == [str(i).encode() for i in range(len(keys))]
+    assert values[-1] is None
+
+    # Keys really are spread over the nodes
+    assert all(client.dbsize() > 0 for client in sharded.clients.values())
+    assert sharded.delete(*keys) == len(keys)
+
+
+def test_sharded_scripts_run_on_the_owning_node(sharded):
+    """Test that Lua scripts are routed by their key, directly and in pipelines."""
+    incr = sharded.register_script("return redis.call('INCRBY', KEYS[1], ARGV[1])")
+
+    assert incr(keys=['counter:a'], args=[2]) == 2
+
+    pipe = sharded.pipeline(transaction=False)
+    incr(keys=['counter:a'], args=[3], client=pipe)
+    incr(keys=['counter:b'], args=[1], client=pipe)
+    assert pipe.execute() == [5, 1]
+    assert sharded.get_client('counter:a').get('counter:a') == b'5'
+
+
+def test_hash_tags_keep_related_keys_together():
+    """Test that keys sharing a {hash tag} map to the same node."""
+    ring = HashRing(['a', 'b', 'c', 'd'])
+    for key_id in ('k1', 'k2', 'k3', 'k4', 'k5'):
+        assert ring.get_node(f'quota:{{{key_id}}}') == ring.get_node(
+            f'quota_usage:{{{key_id}}}'
+        )
+
+
+def test_failing_node_is_bypassed_alone(monkeypatch):
+    """Test that each node has its own breaker and only the failing one is skipped."""
+    fakeredis = pytest.importorskip('fakeredis')
+    monkeypatch.setattr(
+        'backend.app.core.sharding.settings.REDIS_BREAKER_FAILURE_THRESHOLD', 2
+    )
+    servers = {name: fakeredis.FakeServer() for name in ('a', 'b')}
+    sharded = ShardedRedis(
+        {name: fakeredis.FakeRedis(server=server) for name, server in servers.items()}
+    )
+    keys = KEYS[:20]
+    for key in keys:
+        sharded.set(key, key)
+    down = [key for key in keys if sharded.ring.get_node(key) == 'a']
+    up = [key for key in keys if sharded.ring.get_node(key) == 'b']
+    assert down and up
+
+    servers['a'].connected = False
+    for _ in range(2):
+        with pytest.raises(redis.ConnectionError):
+            sharded.get(down[0])
+    assert sharded.breakers['a'].state == 'open'
+
+    # The open node fails fast and its keys read as misses
+    calls = []
+    monkeypatch.setattr(sharded.clients['a'], 'mget', lambda *args: calls.append(args))
+    with pytest.raises(ShardUnavailable):
+        sharded.get(down[0])
+    values = sharded.mget(keys)
+    assert calls == []
+    assert [values[keys.index(key)] for key in down] == [None] * len(down)
+    assert [values[keys.index(key)] for key in up] == [key.encode() for key in up]
+
+    # Writes still reach the healthy node before the failure is reported
+    with pytest.raises(ShardUnavailable):
+        sharded.delete(*keys)
+    assert sharded.clients['b'].exists(*up) == 0
+    assert sharded.breakers['b'].state == 'closed'
+
+
+def test_cache_skips_the_shared_breaker_for_sharded_clients():
+    """Test that an open shared breaker does not bypass a sharded cache."""
+    fakeredis = pytest.importorskip('fakeredis')
+    from flask import Flask
+    from backend.app.core import cache
+
+    app = Flask(__name__)
+    sharded = ShardedRedis({'a': fakeredis.FakeRedis()})
+    for _ in range(cache.redis_breaker.failure_threshold):
+        cache.redis_breaker.record_failure()
+    try:
+        with app.app_context():
+            app.extensions['redis'] = fakeredis.FakeRedis()
+            assert cache.get_cache() is None
+            app.extensions['redis'] = sharded
+            assert cache.get_cache() is sharded
+    finally:
+        cache.redis_breaker.reset()